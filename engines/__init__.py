@@ -9,6 +9,13 @@ This package contains the three core detection engines:
 
 from engines.statistical.engine import StatisticalEngine
 from engines.narrative.engine import NarrativeEngine
-from engines.expert.agent import ExpertAgent
 
 __all__ = ["StatisticalEngine", "NarrativeEngine", "ExpertAgent"]
+
+
+def __getattr__(name: str):
+    # ExpertAgent pulls in the LLM and MongoDB stacks; load it only when asked for
+    if name == "ExpertAgent":
+        from engines.expert.agent import ExpertAgent
+        return ExpertAgent
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
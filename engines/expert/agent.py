@@ -104,8 +104,35 @@ class ExpertAgent:
     """
 
     def __init__(self):
-        self.db = get_db()
-        self.clients = get_clients()
+        # Database and API clients are created on first use (see properties)
+        self._db = None
+        self._clients = None
+
+    @property
+    def db(self):
+        """MongoDB connection, created on first use."""
+        if self._db is None:
+            self._db = get_db()
+        return self._db
+
+    @property
+    def clients(self):
+        """OpenAI/Anthropic clients, created on first use."""
+        if self._clients is None:
+            self._clients = get_clients()
+        return self._clients
+
+    def ready(self, timeout: Optional[float] = None) -> bool:
+        """
+        Readiness probe, separate from construction.
+
+        Args:
+            timeout: Seconds to wait for MongoDB
+
+        Returns:
+            True if MongoDB answers and the Anthropic API key is configured
+        """
+        return bool(config.anthropic_api_key) and self.db.ping(timeout=timeout)
 
     # =========================================================================
     # TRIBUNAL MODE - Layer 3 Decision Making
@@ -4,8 +4,9 @@ RAG (Retrieval-Augmented Generation) for Expert Agent
 Provides vector search over regulatory knowledge base.
 """
 
+import asyncio
 from typing import List, Dict, Any, Optional
-from shared.db import get_db
+from shared.storage import MongoStorage, get_storage
 from shared.clients import get_clients
 
 
@@ -26,37 +27,38 @@ def vector_search(
         List of matching documents with metadata and relevance scores
     """
     clients = get_clients()
-    db = get_db()
 
     # Generate embedding for query
     query_embedding = clients.get_embedding(query)
 
-    # Build aggregation pipeline
-    pipeline = [
-        {
-            "$vectorSearch": {
-                "index": "vector_index",
-                "path": "embedding",
-                "queryVector": query_embedding,
-                "numCandidates": 100,
-                "limit": limit,
-            }
-        },
-        {
-            "$project": {
-                "text": 1,
-                "metadata": 1,
-                "score": {"$meta": "vectorSearchScore"},
-            }
-        },
-    ]
+    return get_storage().vector_search(query_embedding, limit=limit, source_filter=source_filter)
 
-    # Add source filter if specified
-    if source_filter:
-        pipeline[0]["$vectorSearch"]["filter"] = {"metadata.source": source_filter}
 
-    results = list(db.regulatory_docs.aggregate(pipeline))
-    return results
+async def vector_search_async(
+    query: str,
+    limit: int = 8,
+    source_filter: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Awaitable version of vector_search.
+
+    The embedding call runs in a worker thread (sync OpenAI client). The
+    vector search uses the configured storage backend: the async MongoDB
+    client for MongoStorage, a worker thread for any other backend.
+    """
+    query_embedding = await asyncio.to_thread(get_clients().get_embedding, query)
+
+    storage = get_storage()
+    if not isinstance(storage, MongoStorage):
+        return await asyncio.to_thread(
+            storage.vector_search, query_embedding, limit=limit, source_filter=source_filter
+        )
+
+    from shared.async_db import get_async_db, search_regulatory_docs
+
+    return await search_regulatory_docs(
+        get_async_db(), query_embedding, limit=limit, source_filter=source_filter
+    )
 
 
 def format_context(results: List[Dict[str, Any]], max_chars: int = 1500) -> str:
@@ -78,9 +80,17 @@ def format_context(results: List[Dict[str, Any]], max_chars: int = 1500) -> str:
         text = r["text"][:max_chars]
         score = r["score"]
 
+        # Collapsed near-duplicates list every document containing the passage
+        also_in = [
+            f"[{s['source']}] {s['filename']}"
+            for s in r.get("sources", [])
+            if s["file_path"] != r["metadata"].get("file_path")
+        ]
+        also = f"\nALSO IN: {'; '.join(also_in)}" if also_in else ""
+
         context_parts.append(
             f"---\n"
-            f"SOURCE {i}: [{source}] {filename} (relevance: {score:.2f})\n"
+            f"SOURCE {i}: [{source}] {filename} (relevance: {score:.2f}){also}\n"
             f"{text}\n"
             f"---"
         )
@@ -88,38 +98,51 @@ def format_context(results: List[Dict[str, Any]], max_chars: int = 1500) -> str:
     return "\n".join(context_parts)
 
 
-def search_typology_guidance(typology: str) -> str:
-    """
-    Search for regulatory guidance specific to a typology.
-
-    Args:
-        typology: Name of the typology (e.g., "Structuring", "Smurfing")
-
-    Returns:
-        Formatted context about the typology
-    """
-    # Search for typology-specific guidance
-    queries = [
+def typology_queries(typology: str) -> List[str]:
+    """Search queries for regulatory guidance on a typology."""
+    return [
         f"{typology} money laundering typology red flags",
         f"{typology} suspicious activity indicators",
         f"{typology} detection methods AML",
     ]
 
-    all_results = []
-    for query in queries:
-        results = vector_search(query, limit=3)
-        all_results.extend(results)
 
-    # Deduplicate by text
+def format_guidance(results: List[Dict[str, Any]], max_results: int = 6) -> str:
+    """Deduplicate results by text and format the first `max_results` as context."""
     seen_texts = set()
     unique_results = []
-    for r in all_results:
+    for r in results:
         text_hash = hash(r["text"][:100])
         if text_hash not in seen_texts:
             seen_texts.add(text_hash)
             unique_results.append(r)
 
-    return format_context(unique_results[:6])
+    return format_context(unique_results[:max_results])
+
+
+def search_typology_guidance(typology: str) -> str:
+    """
+    Search for regulatory guidance specific to a typology.
+
+    Args:
+        typology: Name of the typology (e.g., "Structuring", "Smurfing")
+
+    Returns:
+        Formatted context about the typology
+    """
+    all_results = []
+    for query in typology_queries(typology):
+        all_results.extend(vector_search(query, limit=3))
+
+    return format_guidance(all_results)
+
+
+async def search_typology_guidance_async(typology: str) -> str:
+    """Awaitable version of search_typology_guidance (queries run concurrently)."""
+    batches = await asyncio.gather(
+        *(vector_search_async(q, limit=3) for q in typology_queries(typology))
+    )
+    return format_guidance([r for results in batches for r in results])
 
 
 def search_sar_requirements() -> str:
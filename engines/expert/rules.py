@@ -0,0 +1,490 @@
+"""
+Typology Rules for Expert Agent
+
+Typology detection expressed as data: each typology is a list of weighted
+signals, each signal a conjunction of predicates over named features. The
+rules compile into a vectorized evaluator that scores every typology for
+a whole batch of TribunalInputs at once, returning an (N x typology)
+confidence matrix. That makes typology detection cheap enough to run as a
+Layer 1.5 over every transaction, not only over escalations.
+
+Rules are plain JSON-compatible data. Setting AML_TYPOLOGY_RULES_PATH to a
+JSON file (a list in the DEFAULT_RULES format) replaces the built-in rules;
+the file is re-read whenever its modification time changes.
+
+Usage:
+    scores = score_typologies(inputs)
+    scores.confidence            # (N, 5) float64, 0 where a typology did not match
+    scores.column("structuring") # (N,) confidences of one typology
+"""
+
+import json
+import logging
+import operator
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from shared.config import TYPOLOGIES, TYPOLOGY_RULES_PATH
+from shared.models import GraphFeatures, TribunalInput, WindowFeatures
+
+
+logger = logging.getLogger(__name__)
+
+Features = Dict[str, np.ndarray]
+
+
+# =============================================================================
+# FEATURES
+# =============================================================================
+
+NUMERIC_FEATURES: Dict[str, Callable[[TribunalInput], float]] = {
+    "amount": lambda x: x.transaction.amount_sent,
+    "statistical_score": lambda x: x.statistical_score,
+    "narrative_score": lambda x: x.narrative_score,
+    "total_transactions": lambda x: x.account_history.stats.total_transactions,
+    "total_sent": lambda x: x.account_history.stats.total_sent,
+    "total_received": lambda x: x.account_history.stats.total_received,
+    "avg_transaction_amount": lambda x: x.account_history.stats.avg_transaction_amount,
+    "std_transaction_amount": lambda x: x.account_history.stats.std_transaction_amount,
+    "unique_counterparties": lambda x: x.account_history.stats.unique_counterparties,
+    "transaction_frequency_per_day": lambda x: x.account_history.stats.transaction_frequency_per_day,
+}
+
+
+def _optional(attribute: str, name: str) -> Callable[[TribunalInput], float]:
+    """Getter for a field of optional input context (NaN when absent, so no rule fires)."""
+    def get(x: TribunalInput) -> float:
+        context = getattr(x, attribute)
+        value = getattr(context, name) if context is not None else None
+        return np.nan if value is None else value
+    return get
+
+
+NUMERIC_FEATURES.update({
+    name: _optional("window_features", name)
+    for name in WindowFeatures.model_fields
+})
+NUMERIC_FEATURES.update({
+    name: _optional("graph_features", name)
+    for name in GraphFeatures.model_fields
+})
+
+CATEGORICAL_FEATURES: Dict[str, Callable[[TribunalInput], str]] = {
+    "payment_format": lambda x: x.transaction.payment_format,
+}
+
+# Computed from other features by derive_features
+DERIVED_FEATURES = ("sent_received_ratio",)
+
+FEATURE_NAMES = frozenset(NUMERIC_FEATURES) | frozenset(CATEGORICAL_FEATURES) | frozenset(DERIVED_FEATURES)
+
+
+def derive_features(features: Features) -> Features:
+    """Add derived columns (sent/received ratio is NaN unless both totals are positive)."""
+    sent, received = features["total_sent"], features["total_received"]
+    ratio = np.full(len(sent), np.nan)
+    np.divide(sent, received, out=ratio, where=(sent > 0) & (received > 0))
+    features["sent_received_ratio"] = ratio
+    return features
+
+
+def extract_features(inputs: Sequence[TribunalInput]) -> Features:
+    """
+    Columnar features of a batch of TribunalInputs.
+
+    Args:
+        inputs: Transactions under review
+
+    Returns:
+        Feature name -> (N,) array (float64, or object for categorical features)
+    """
+    n = len(inputs)
+    features: Features = {
+        name: np.fromiter((get(x) for x in inputs), dtype=np.float64, count=n)
+        for name, get in NUMERIC_FEATURES.items()
+    }
+    for name, get in CATEGORICAL_FEATURES.items():
+        features[name] = np.array([get(x) for x in inputs], dtype=object)
+    return derive_features(features)
+
+
+# =============================================================================
+# RULES
+# =============================================================================
+
+# Predicates are [feature, op, value]. A value may reference another feature
+# as {"feature": name}. "between" is inclusive, "in_range" excludes the upper bound.
+# Window signals (*_24h, *_7d) only fire when the input carries window_features,
+# graph signals (cycles, fan-out, pass-through) only with graph_features.
+DEFAULT_RULES: List[Dict[str, Any]] = [
+    {
+        # Transactions just below reporting thresholds to avoid CTRs
+        "typology": "structuring",
+        "name": "Structuring",
+        "min_confidence": 0.4,
+        "signals": [
+            {"name": "amount_near_10k_threshold", "weight": 0.4,
+             "when": [["amount", "in_range", [9000, 10000]]]},
+            {"name": "amount_near_3k_threshold", "weight": 0.3,
+             "when": [["amount", "in_range", [2700, 3000]]]},
+            {"name": "high_statistical_anomaly", "weight": 0.2,
+             "when": [["statistical_score", ">", 5.0]]},
+            {"name": "low_narrative_coherence", "weight": 0.2,
+             "when": [["narrative_score", "<", 0.4]]},
+            {"name": "round_number_amount", "weight": 0.1,
+             "when": [["amount", "multiple_of", 100], ["amount", ">", 1000]]},
+            {"name": "high_transaction_frequency", "weight": 0.15,
+             "when": [["transaction_frequency_per_day", ">", 3]]},
+            {"name": "repeated_sub_threshold_24h", "weight": 0.3,
+             "when": [["sub_threshold_count_24h", ">=", 3]]},
+            {"name": "sub_threshold_volume_7d", "weight": 0.2,
+             "when": [["sub_threshold_sum_7d", ">=", 30000]]},
+        ],
+    },
+    {
+        # Many small deposits, often across accounts or individuals
+        "typology": "smurfing",
+        "name": "Smurfing",
+        "min_confidence": 0.4,
+        "signals": [
+            {"name": "small_amount_high_frequency", "weight": 0.35,
+             "when": [["amount", "<", 5000], ["transaction_frequency_per_day", ">", 2]]},
+            {"name": "many_counterparties", "weight": 0.25,
+             "when": [["unique_counterparties", ">", 20]]},
+            {"name": "statistical_anomaly", "weight": 0.15,
+             "when": [["statistical_score", ">", 4.0]]},
+            {"name": "narrative_break", "weight": 0.15,
+             "when": [["narrative_score", "<", 0.5]]},
+            {"name": "balanced_in_out", "weight": 0.1,
+             "when": [["sent_received_ratio", "between", [0.8, 1.2]]]},
+            {"name": "small_amounts_burst_24h", "weight": 0.2,
+             "when": [["txn_count_24h", ">=", 10], ["amount", "<", 5000]]},
+            {"name": "many_counterparties_24h", "weight": 0.2,
+             "when": [["distinct_counterparties_24h", ">=", 10]]},
+            {"name": "balanced_in_out_7d", "weight": 0.1,
+             "when": [["in_out_ratio_7d", "between", [0.9, 1.1]]]},
+        ],
+    },
+    {
+        # Rapid movement of funds through accounts to obscure the trail
+        "typology": "layering",
+        "name": "Layering",
+        "min_confidence": 0.5,
+        "signals": [
+            {"name": "very_high_frequency", "weight": 0.3,
+             "when": [["transaction_frequency_per_day", ">", 5]]},
+            {"name": "high_transaction_count", "weight": 0.2,
+             "when": [["total_transactions", ">", 100]]},
+            {"name": "in_equals_out", "weight": 0.25,
+             "when": [["sent_received_ratio", "between", [0.9, 1.1]]]},
+            {"name": "high_statistical_anomaly", "weight": 0.15,
+             "when": [["statistical_score", ">", 6.0]]},
+            {"name": "very_low_coherence", "weight": 0.2,
+             "when": [["narrative_score", "<", 0.3]]},
+            {"name": "circular_flows", "weight": 0.3,
+             "when": [["cycle_count", ">=", 1]]},
+            {"name": "rapid_movement", "weight": 0.2,
+             "when": [["fan_out_2hop", ">=", 10]]},
+        ],
+    },
+    {
+        # Entities with no real business activity used as passthroughs
+        "typology": "shell_company",
+        "name": "Shell Company Activity",
+        "min_confidence": 0.4,
+        "signals": [
+            {"name": "exact_passthrough", "weight": 0.35,
+             "when": [["sent_received_ratio", "between", [0.95, 1.05]]]},
+            {"name": "limited_counterparties", "weight": 0.2,
+             "when": [["unique_counterparties", "<", 5], ["total_transactions", ">", 20]]},
+            {"name": "high_value_low_frequency", "weight": 0.25,
+             "when": [["avg_transaction_amount", ">", 50000], ["transaction_frequency_per_day", "<", 1]]},
+            {"name": "statistical_anomaly", "weight": 0.15,
+             "when": [["statistical_score", ">", 5.0]]},
+            {"name": "in_approx_out", "weight": 0.25,
+             "when": [["pass_through_ratio", "between", [0.95, 1.05]]]},
+        ],
+    },
+    {
+        # Over/under invoicing or phantom shipments
+        "typology": "tbml",
+        "name": "Trade-Based Money Laundering",
+        "min_confidence": 0.5,
+        "signals": [
+            {"name": "high_value_transaction", "weight": 0.2,
+             "when": [["amount", ">", 100000]]},
+            {"name": "high_amount_variance", "weight": 0.25,
+             "when": [["std_transaction_amount", ">", {"feature": "avg_transaction_amount"}]]},
+            {"name": "wire_transfer", "weight": 0.1,
+             "when": [["payment_format", "==", "Wire"]]},
+            {"name": "extreme_statistical_anomaly", "weight": 0.25,
+             "when": [["statistical_score", ">", 7.0]]},
+            {"name": "narrative_break", "weight": 0.2,
+             "when": [["narrative_score", "<", 0.4]]},
+        ],
+    },
+]
+
+
+@dataclass(frozen=True)
+class Signal:
+    """A weighted conjunction of predicates."""
+    name: str
+    weight: float
+    when: Tuple[Tuple[str, str, Any], ...]
+
+
+@dataclass(frozen=True)
+class TypologyRule:
+    """Signals of one typology; it matches when their weights reach min_confidence."""
+    typology: str
+    name: str
+    min_confidence: float
+    signals: Tuple[Signal, ...]
+    description: str = ""
+
+
+def parse_rules(data: List[Dict[str, Any]]) -> List[TypologyRule]:
+    """
+    Build TypologyRules from JSON-compatible data (the DEFAULT_RULES format).
+
+    Raises:
+        ValueError: If a rule is malformed
+    """
+    if not isinstance(data, list):
+        raise ValueError("Typology rules must be a list")
+    rules = []
+    for entry in data:
+        typology = entry["typology"]
+        signals = tuple(
+            Signal(
+                name=s["name"],
+                weight=float(s["weight"]),
+                when=tuple(tuple(p) for p in s["when"]),
+            )
+            for s in entry["signals"]
+        )
+        rules.append(TypologyRule(
+            typology=typology,
+            name=entry.get("name", TYPOLOGIES.get(typology, {}).get("name", typology)),
+            min_confidence=float(entry["min_confidence"]),
+            signals=signals,
+            description=entry.get("description", TYPOLOGIES.get(typology, {}).get("description", "")),
+        ))
+    return rules
+
+
+# =============================================================================
+# COMPILATION
+# =============================================================================
+
+_COMPARISONS = {
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "==": operator.eq,
+    "!=": operator.ne,
+}
+
+
+def _compile_predicate(predicate: Tuple[str, str, Any]) -> Callable[[Features], np.ndarray]:
+    """Vectorized boolean mask for one [feature, op, value] predicate."""
+    if len(predicate) != 3:
+        raise ValueError(f"Predicate must be [feature, op, value]: {predicate!r}")
+    feature, op, value = predicate
+    if feature not in FEATURE_NAMES:
+        raise ValueError(f"Unknown feature {feature!r}")
+
+    if op in _COMPARISONS:
+        compare = _COMPARISONS[op]
+        if isinstance(value, dict):
+            other = value["feature"]
+            if other not in FEATURE_NAMES:
+                raise ValueError(f"Unknown feature {other!r}")
+            mask = lambda f: compare(f[feature], f[other])
+            operands = (feature, other)
+        else:
+            mask = lambda f: compare(f[feature], value)
+            operands = (feature,)
+
+        # NaN != x is True: keep absent numeric features from firing
+        numeric = [name for name in operands if name not in CATEGORICAL_FEATURES]
+        if op == "!=" and numeric:
+            return lambda f: mask(f) & ~np.any([np.isnan(f[name]) for name in numeric], axis=0)
+        return mask
+
+    if op in ("between", "in_range"):
+        low, high = value
+        upper = operator.le if op == "between" else operator.lt
+        return lambda f: (f[feature] >= low) & upper(f[feature], high)
+
+    if op == "multiple_of":
+        return lambda f: np.mod(f[feature], value) == 0
+
+    raise ValueError(f"Unknown operator {op!r}")
+
+
+@dataclass
+class TypologyScores:
+    """Typology results for a batch; column t of every matrix is typologies[t]."""
+    typologies: List[str]
+    names: List[str]
+    descriptions: List[str]
+    confidence: np.ndarray          # (N, T) float64, capped at 1.0; 0 where not matched
+    matched: np.ndarray             # (N, T) bool
+    signals: List[np.ndarray]       # per typology, (N, S_t) bool
+    signal_names: List[List[str]]
+
+    def __len__(self) -> int:
+        return self.confidence.shape[0]
+
+    def column(self, typology: str) -> np.ndarray:
+        """Confidences of one typology."""
+        return self.confidence[:, self.typologies.index(typology)]
+
+    def signals_matched(self, row: int, column: int) -> List[str]:
+        """Names of the signals that fired for one transaction and typology."""
+        return [n for n, hit in zip(self.signal_names[column], self.signals[column][row]) if hit]
+
+
+class CompiledRules:
+    """TypologyRules compiled into vectorized predicate functions."""
+
+    def __init__(self, rules: List[TypologyRule]):
+        self.rules = rules
+        self._signals = [
+            [[_compile_predicate(p) for p in signal.when] for signal in rule.signals]
+            for rule in rules
+        ]
+
+    def evaluate(self, features: Features) -> TypologyScores:
+        """
+        Score every typology for every row of a feature batch.
+
+        Confidence accumulates signal weights in rule order, so results are
+        identical to adding them one signal at a time.
+        """
+        n = len(next(iter(features.values()))) if features else 0
+        confidence = np.zeros((n, len(self.rules)))
+        matched = np.zeros((n, len(self.rules)), dtype=bool)
+        signals = []
+
+        for t, (rule, compiled) in enumerate(zip(self.rules, self._signals)):
+            hits = np.ones((n, len(rule.signals)), dtype=bool)
+            total = np.zeros(n)
+            for s, (signal, predicates) in enumerate(zip(rule.signals, compiled)):
+                for predicate in predicates:
+                    hits[:, s] &= predicate(features)
+                total = total + signal.weight * hits[:, s]
+
+            matched[:, t] = (total >= rule.min_confidence) & hits.any(axis=1)
+            confidence[:, t] = np.where(matched[:, t], np.minimum(total, 1.0), 0.0)
+            signals.append(hits)
+
+        return TypologyScores(
+            typologies=[r.typology for r in self.rules],
+            names=[r.name for r in self.rules],
+            descriptions=[r.description for r in self.rules],
+            confidence=confidence,
+            matched=matched,
+            signals=signals,
+            signal_names=[[s.name for s in r.signals] for r in self.rules],
+        )
+
+
+# =============================================================================
+# HOT-RELOADING ENGINE
+# =============================================================================
+
+class TypologyRuleEngine:
+    """
+    Compiled typology rules, optionally loaded from a JSON file.
+
+    The file's modification time is checked on every use; a changed file is
+    recompiled, a deleted one reverts to DEFAULT_RULES, and an invalid one is
+    logged and ignored (the previous rules stay active).
+    """
+
+    def __init__(self, path: Optional[Union[str, Path]] = None):
+        self.path = Path(path) if path else None
+        self._lock = threading.Lock()
+        self._defaults = CompiledRules(parse_rules(DEFAULT_RULES))
+        self._compiled = self._defaults
+        self._mtime: Optional[int] = None
+        self.reload_if_changed()
+
+    @property
+    def rules(self) -> CompiledRules:
+        """Current rules (reloaded first if the file changed)."""
+        self.reload_if_changed()
+        return self._compiled
+
+    def reload_if_changed(self) -> bool:
+        """Recompile the rules file if it changed; True if the rules were replaced."""
+        if self.path is None:
+            return False
+        try:
+            mtime = self.path.stat().st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+        if mtime == self._mtime:
+            return False
+
+        with self._lock:
+            if mtime == self._mtime:
+                return False
+            self._mtime = mtime
+            if mtime is None:
+                self._compiled = self._defaults
+                return True
+            try:
+                self._compiled = CompiledRules(parse_rules(json.loads(self.path.read_text())))
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                logger.warning(f"Ignoring typology rules in {self.path}: {e}")
+                return False
+            logger.info(f"Loaded {len(self._compiled.rules)} typology rules from {self.path}")
+            return True
+
+    def score(self, inputs: Sequence[TribunalInput]) -> TypologyScores:
+        """Score every typology for a batch of TribunalInputs."""
+        return self.rules.evaluate(extract_features(inputs))
+
+    def score_features(self, features: Features) -> TypologyScores:
+        """Score a columnar batch (e.g. built from a TransactionBatch) without model objects."""
+        return self.rules.evaluate(derive_features(dict(features)))
+
+
+# =============================================================================
+# CONVENIENCE FUNCTIONS
+# =============================================================================
+
+_engine: Optional[TypologyRuleEngine] = None
+_engine_lock = threading.Lock()
+
+
+def get_rule_engine() -> TypologyRuleEngine:
+    """Get the process-wide rule engine (rules from AML_TYPOLOGY_RULES_PATH, if set)."""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = TypologyRuleEngine(TYPOLOGY_RULES_PATH or None)
+    return _engine
+
+
+def score_typologies(inputs: Sequence[TribunalInput]) -> TypologyScores:
+    """
+    Score all typologies for a batch of TribunalInputs at once.
+
+    Args:
+        inputs: Transactions under review
+
+    Returns:
+        TypologyScores with an (N x typology) confidence matrix
+    """
+    return get_rule_engine().score(inputs)
@@ -2,13 +2,17 @@
 Typology Detection for Expert Agent
 
 Detects money laundering typologies based on statistical and narrative signals.
+The signals and weights live in engines/expert/rules.py as data; the
+functions here turn its vectorized scores into TypologyMatches.
 """
 
-from typing import Optional, List, Tuple
+from typing import Optional, List, Sequence
 from dataclasses import dataclass
 
-from shared.config import TYPOLOGIES
+import numpy as np
+
 from shared.models import TribunalInput, RiskFactor
+from engines.expert.rules import TypologyScores, score_typologies
 
 
 @dataclass
@@ -20,6 +24,26 @@ class TypologyMatch:
     description: str
 
 
+def _match(scores: TypologyScores, row: int, column: int) -> TypologyMatch:
+    """TypologyMatch for one row and typology column of a batch."""
+    return TypologyMatch(
+        name=scores.names[column],
+        confidence=float(scores.confidence[row, column]),
+        signals_matched=scores.signals_matched(row, column),
+        description=scores.descriptions[column],
+    )
+
+
+def _detect(typology: str, input_data: TribunalInput) -> Optional[TypologyMatch]:
+    """Evaluate the rules for one input and return one typology's match."""
+    scores = score_typologies([input_data])
+    if typology in scores.typologies:
+        column = scores.typologies.index(typology)
+        if scores.matched[0, column]:
+            return _match(scores, 0, column)
+    return None
+
+
 def detect_structuring(input_data: TribunalInput) -> Optional[TypologyMatch]:
     """
     Detect Structuring typology.
@@ -27,49 +51,7 @@ def detect_structuring(input_data: TribunalInput) -> Optional[TypologyMatch]:
     Structuring: Transactions just below reporting thresholds ($10K in US)
     to avoid Currency Transaction Reports (CTRs).
     """
-    signals = []
-    confidence = 0.0
-
-    amount = input_data.transaction.amount_sent
-
-    # Check if amount is just below $10K threshold
-    if 9000 <= amount < 10000:
-        signals.append("amount_near_10k_threshold")
-        confidence += 0.4
-
-    # Check if amount is just below $3K threshold (some jurisdictions)
-    if 2700 <= amount < 3000:
-        signals.append("amount_near_3k_threshold")
-        confidence += 0.3
-
-    # High statistical anomaly suggests unusual pattern
-    if input_data.statistical_score > 5.0:
-        signals.append("high_statistical_anomaly")
-        confidence += 0.2
-
-    # Low narrative coherence suggests breaking from normal behavior
-    if input_data.narrative_score < 0.4:
-        signals.append("low_narrative_coherence")
-        confidence += 0.2
-
-    # Check for round numbers (common in structuring)
-    if amount % 100 == 0 and amount > 1000:
-        signals.append("round_number_amount")
-        confidence += 0.1
-
-    # Check transaction frequency
-    if input_data.account_history.stats.transaction_frequency_per_day > 3:
-        signals.append("high_transaction_frequency")
-        confidence += 0.15
-
-    if confidence >= 0.4 and signals:
-        return TypologyMatch(
-            name="Structuring",
-            confidence=min(confidence, 1.0),
-            signals_matched=signals,
-            description=TYPOLOGIES["structuring"]["description"],
-        )
-    return None
+    return _detect("structuring", input_data)
 
 
 def detect_smurfing(input_data: TribunalInput) -> Optional[TypologyMatch]:
@@ -79,47 +61,7 @@ def detect_smurfing(input_data: TribunalInput) -> Optional[TypologyMatch]:
     Smurfing: Breaking large amounts into many smaller deposits,
     often using multiple accounts or individuals.
     """
-    signals = []
-    confidence = 0.0
-
-    amount = input_data.transaction.amount_sent
-    stats = input_data.account_history.stats
-
-    # Small amounts with high frequency
-    if amount < 5000 and stats.transaction_frequency_per_day > 2:
-        signals.append("small_amount_high_frequency")
-        confidence += 0.35
-
-    # Many unique counterparties
-    if stats.unique_counterparties > 20:
-        signals.append("many_counterparties")
-        confidence += 0.25
-
-    # High statistical anomaly
-    if input_data.statistical_score > 4.0:
-        signals.append("statistical_anomaly")
-        confidence += 0.15
-
-    # Low narrative coherence
-    if input_data.narrative_score < 0.5:
-        signals.append("narrative_break")
-        confidence += 0.15
-
-    # Check if sent ≈ received (passthrough)
-    if stats.total_sent > 0 and stats.total_received > 0:
-        ratio = stats.total_sent / stats.total_received
-        if 0.8 <= ratio <= 1.2:
-            signals.append("balanced_in_out")
-            confidence += 0.1
-
-    if confidence >= 0.4 and signals:
-        return TypologyMatch(
-            name="Smurfing",
-            confidence=min(confidence, 1.0),
-            signals_matched=signals,
-            description=TYPOLOGIES["smurfing"]["description"],
-        )
-    return None
+    return _detect("smurfing", input_data)
 
 
 def detect_layering(input_data: TribunalInput) -> Optional[TypologyMatch]:
@@ -129,46 +71,7 @@ def detect_layering(input_data: TribunalInput) -> Optional[TypologyMatch]:
     Layering: Rapid movement of funds through multiple accounts
     to obscure the audit trail.
     """
-    signals = []
-    confidence = 0.0
-
-    stats = input_data.account_history.stats
-
-    # Very high transaction frequency
-    if stats.transaction_frequency_per_day > 5:
-        signals.append("very_high_frequency")
-        confidence += 0.3
-
-    # Many transactions in short time
-    if stats.total_transactions > 100:
-        signals.append("high_transaction_count")
-        confidence += 0.2
-
-    # In ≈ Out (passthrough behavior)
-    if stats.total_sent > 0 and stats.total_received > 0:
-        ratio = stats.total_sent / stats.total_received
-        if 0.9 <= ratio <= 1.1:
-            signals.append("in_equals_out")
-            confidence += 0.25
-
-    # High statistical anomaly
-    if input_data.statistical_score > 6.0:
-        signals.append("high_statistical_anomaly")
-        confidence += 0.15
-
-    # Very low narrative coherence
-    if input_data.narrative_score < 0.3:
-        signals.append("very_low_coherence")
-        confidence += 0.2
-
-    if confidence >= 0.5 and signals:
-        return TypologyMatch(
-            name="Layering",
-            confidence=min(confidence, 1.0),
-            signals_matched=signals,
-            description=TYPOLOGIES["layering"]["description"],
-        )
-    return None
+    return _detect("layering", input_data)
 
 
 def detect_shell_company(input_data: TribunalInput) -> Optional[TypologyMatch]:
@@ -178,41 +81,7 @@ def detect_shell_company(input_data: TribunalInput) -> Optional[TypologyMatch]:
     Shell Company: Using entities with no real business activity
     as passthrough vehicles.
     """
-    signals = []
-    confidence = 0.0
-
-    stats = input_data.account_history.stats
-
-    # In ≈ Out (no value retention)
-    if stats.total_sent > 0 and stats.total_received > 0:
-        ratio = stats.total_sent / stats.total_received
-        if 0.95 <= ratio <= 1.05:
-            signals.append("exact_passthrough")
-            confidence += 0.35
-
-    # Low counterparty diversity (few trading partners)
-    if stats.unique_counterparties < 5 and stats.total_transactions > 20:
-        signals.append("limited_counterparties")
-        confidence += 0.2
-
-    # High amounts, low frequency (typical shell pattern)
-    if stats.avg_transaction_amount > 50000 and stats.transaction_frequency_per_day < 1:
-        signals.append("high_value_low_frequency")
-        confidence += 0.25
-
-    # Statistical anomaly
-    if input_data.statistical_score > 5.0:
-        signals.append("statistical_anomaly")
-        confidence += 0.15
-
-    if confidence >= 0.4 and signals:
-        return TypologyMatch(
-            name="Shell Company Activity",
-            confidence=min(confidence, 1.0),
-            signals_matched=signals,
-            description=TYPOLOGIES["shell_company"]["description"],
-        )
-    return None
+    return _detect("shell_company", input_data)
 
 
 def detect_tbml(input_data: TribunalInput) -> Optional[TypologyMatch]:
@@ -222,50 +91,31 @@ def detect_tbml(input_data: TribunalInput) -> Optional[TypologyMatch]:
     TBML: Using trade transactions to move value through
     over/under invoicing or phantom shipments.
     """
-    signals = []
-    confidence = 0.0
-
-    amount = input_data.transaction.amount_sent
-    stats = input_data.account_history.stats
+    return _detect("tbml", input_data)
 
-    # Very high amounts (trade transactions tend to be large)
-    if amount > 100000:
-        signals.append("high_value_transaction")
-        confidence += 0.2
 
-    # High variance in amounts (price manipulation)
-    if stats.std_transaction_amount > stats.avg_transaction_amount:
-        signals.append("high_amount_variance")
-        confidence += 0.25
+def detect_typologies_batch(inputs: Sequence[TribunalInput]) -> List[List[TypologyMatch]]:
+    """
+    Detect typologies for many transactions with one vectorized evaluation.
 
-    # Specific payment format (Wire transfers common in trade)
-    if input_data.transaction.payment_format == "Wire":
-        signals.append("wire_transfer")
-        confidence += 0.1
+    Args:
+        inputs: TribunalInputs to screen
 
-    # High statistical anomaly (unusual pricing)
-    if input_data.statistical_score > 7.0:
-        signals.append("extreme_statistical_anomaly")
-        confidence += 0.25
-
-    # Low narrative coherence (breaks from normal trade)
-    if input_data.narrative_score < 0.4:
-        signals.append("narrative_break")
-        confidence += 0.2
-
-    if confidence >= 0.5 and signals:
-        return TypologyMatch(
-            name="Trade-Based Money Laundering",
-            confidence=min(confidence, 1.0),
-            signals_matched=signals,
-            description=TYPOLOGIES["tbml"]["description"],
-        )
-    return None
+    Returns:
+        Per input, detected typologies sorted by confidence (highest first)
+    """
+    scores = score_typologies(inputs)
+    results = []
+    for row in range(len(scores)):
+        matches = [_match(scores, row, t) for t in np.flatnonzero(scores.matched[row])]
+        matches.sort(key=lambda m: m.confidence, reverse=True)
+        results.append(matches)
+    return results
 
 
 def detect_all_typologies(input_data: TribunalInput) -> List[TypologyMatch]:
     """
-    Run all typology detectors and return matches sorted by confidence.
+    Run all typology rules and return matches sorted by confidence.
 
     Args:
         input_data: TribunalInput with transaction and scores
@@ -273,24 +123,7 @@ def detect_all_typologies(input_data: TribunalInput) -> List[TypologyMatch]:
     Returns:
         List of detected typologies, sorted by confidence (highest first)
     """
-    detectors = [
-        detect_structuring,
-        detect_smurfing,
-        detect_layering,
-        detect_shell_company,
-        detect_tbml,
-    ]
-
-    matches = []
-    for detector in detectors:
-        match = detector(input_data)
-        if match:
-            matches.append(match)
-
-    # Sort by confidence, highest first
-    matches.sort(key=lambda m: m.confidence, reverse=True)
-
-    return matches
+    return detect_typologies_batch([input_data])[0]
 
 
 def get_risk_factors(input_data: TribunalInput, typology_match: Optional[TypologyMatch]) -> List[RiskFactor]:
@@ -348,6 +181,31 @@ def get_risk_factors(input_data: TribunalInput, typology_match: Optional[Typolog
             evidence=typology_match.signals_matched,
         ))
 
+    # Repeated near-threshold amounts within a day (rolling window)
+    windows = input_data.window_features
+    if windows is not None and windows.sub_threshold_count_24h >= 3:
+        factors.append(RiskFactor(
+            factor="Repeated Near-Threshold Amounts",
+            severity="high",
+            description="Several transfers just below the $10,000 reporting threshold within 24 hours",
+            evidence=[
+                f"{windows.sub_threshold_count_24h} transfers totalling "
+                f"${windows.sub_threshold_sum_24h:,.2f} in 24h"
+            ],
+        ))
+
+    # Funds returning to the sender through other accounts (transaction graph)
+    graph = input_data.graph_features
+    if graph is not None and graph.cycle_count:
+        factors.append(RiskFactor(
+            factor="Circular Fund Flow",
+            severity="high",
+            description="Funds sent by this account came back to it through other accounts",
+            evidence=[
+                f"{graph.cycle_count} cycle(s), shortest {graph.shortest_cycle} transfers"
+            ],
+        ))
+
     # Amount-based risks
     amount = input_data.transaction.amount_sent
     if 9000 <= amount < 10000:
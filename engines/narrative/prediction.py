@@ -0,0 +1,262 @@
+"""
+Vectorized Narrative Prediction for the Narrative Engine
+
+Array implementation of the next-transaction prediction experiment
+(scripts/narrative_prediction_experiment.py). For every sender account the
+chronologically first TRAIN_RATIO of its transactions build a statistical
+narrative (amount and interval statistics, known counterparties, payment
+format mix); each later transaction is scored by how far it departs from
+that narrative.
+
+All accounts are handled at once: rows are sorted by (account, time), the
+group boundaries give per-account offsets, and every statistic is a
+bincount over those groups. Cost is O(n log n) in the number of
+transactions, independent of the number of accounts.
+
+Usage:
+    batch = TransactionBatch.from_documents(db.transactions.find({}, projection))
+    scores = score_batch(batch.filter(batch.rows_for_accounts(account_ids)))
+    scores.total_error[scores.is_laundering].mean()
+"""
+
+from dataclasses import dataclass, fields
+from typing import Optional, Sequence
+
+import numpy as np
+
+from shared.batch import TransactionBatch
+
+
+# Same defaults as the experiment script
+MIN_HISTORY_FOR_NARRATIVE = 10
+MIN_TEST_TRANSACTIONS = 5
+TRAIN_RATIO = 0.7
+
+SECONDS_PER_DAY = 86400
+AMOUNT_Z_CAP = 5.0
+INTERVAL_Z_CAP = 5.0
+DEFAULT_INTERVAL_MEAN = 7.0  # days, when the training window has no intervals
+DEFAULT_INTERVAL_STD = 3.0
+
+
+@dataclass
+class PredictionScores:
+    """
+    Prediction errors for every test transaction, one array entry per row.
+
+    Rows are ordered by (sender account, timestamp). `rows` indexes into the
+    scored batch, so `batch.take(scores.rows)` recovers the transactions.
+    """
+    rows: np.ndarray                        # int64 positions in the input batch
+    account: np.ndarray                     # int32 sender account codes
+    txn_ids: np.ndarray                     # object
+    predicted_amount: np.ndarray            # float64
+    actual_amount: np.ndarray               # float64
+    predicted_interval: np.ndarray          # float64 days
+    actual_interval: np.ndarray             # float64 days
+    predicted_known_counterparty: np.ndarray  # bool
+    actual_known_counterparty: np.ndarray   # bool
+    amount_z_score: np.ndarray              # float64
+    interval_z_score: np.ndarray            # float64
+    counterparty_error: np.ndarray          # float64
+    format_error: np.ndarray                # float64
+    total_error: np.ndarray                 # float64
+    is_laundering: np.ndarray               # bool
+    accounts_scored: int = 0
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    @classmethod
+    def concat(cls, parts: Sequence["PredictionScores"]) -> "PredictionScores":
+        """
+        Combine scores of separately scored batches (e.g. experiment shards).
+
+        rows and account stay relative to each part's own batch; use txn_ids
+        to identify transactions across parts.
+        """
+        arrays = {
+            f.name: np.concatenate([getattr(p, f.name) for p in parts])
+            for f in fields(cls)
+            if f.name != "accounts_scored"
+        }
+        return cls(**arrays, accounts_scored=sum(p.accounts_scored for p in parts))
+
+
+def _group_mean_std(groups: np.ndarray, values: np.ndarray, size: int):
+    """Per-group count, mean and population std (two-pass, like np.std)."""
+    counts = np.bincount(groups, minlength=size)
+    safe = np.maximum(counts, 1)
+    means = np.bincount(groups, weights=values, minlength=size) / safe
+    variance = np.bincount(groups, weights=(values - means[groups]) ** 2, minlength=size) / safe
+    return counts, np.where(counts > 0, means, 0.0), np.sqrt(variance)
+
+
+def score_batch(
+    batch: TransactionBatch,
+    train_ratio: float = TRAIN_RATIO,
+    min_history: int = MIN_HISTORY_FOR_NARRATIVE,
+    min_test: int = MIN_TEST_TRANSACTIONS,
+) -> PredictionScores:
+    """
+    Build narratives and score next-transaction predictions for all accounts.
+
+    Matches NarrativeBuilder / NarrativePredictor in the experiment script:
+    the narrative is frozen after the training split except for known
+    counterparties, which grow as test transactions are seen.
+
+    Args:
+        batch: Transactions of the accounts to score (any order)
+        train_ratio: Fraction of each account's history used for training
+        min_history: Minimum training transactions per account
+        min_test: Minimum test transactions per account
+
+    Returns:
+        PredictionScores for every test transaction of eligible accounts
+    """
+    # Order by (account, time); stable so equal timestamps keep input order
+    order = np.lexsort((batch.timestamp, batch.sender_account))
+    account = batch.sender_account[order]
+    timestamp = batch.timestamp[order]
+    receiver = batch.receiver_account[order]
+    payment_format = batch.payment_format[order]
+    amount = np.where(batch.amount_sent != 0, batch.amount_sent, batch.amount_received)[order]
+
+    n = len(order)
+    starts = np.flatnonzero(np.r_[True, account[1:] != account[:-1]]) if n else np.empty(0, dtype=np.int64)
+    num_groups = len(starts)
+    counts = np.diff(np.r_[starts, n])
+    group = np.repeat(np.arange(num_groups), counts)
+    position = np.arange(n) - starts[group]
+
+    split = (counts * train_ratio).astype(np.int64)
+    eligible = (
+        (counts >= min_history + min_test)
+        & (split >= min_history)
+        & (counts - split >= min_test)
+    )
+    split_of_row = split[group]
+    is_train = position < split_of_row
+
+    # --- Amount statistics over positive training amounts ---
+    positive = is_train & (amount > 0)
+    amount_count, amount_mean, amount_std = _group_mean_std(group[positive], amount[positive], num_groups)
+    amount_std = np.where(amount_count > 1, amount_std, amount_mean * 0.5)
+
+    # --- Interval statistics (days) over positive training gaps ---
+    gap = np.zeros(n)
+    gap[1:] = (timestamp[1:] - timestamp[:-1]) / SECONDS_PER_DAY
+    has_previous = position > 0
+    interval_rows = is_train & has_previous & (gap > 0)
+    interval_count, interval_mean, interval_std = _group_mean_std(
+        group[interval_rows], gap[interval_rows], num_groups
+    )
+    interval_mean = np.where(interval_count > 0, interval_mean, DEFAULT_INTERVAL_MEAN)
+    interval_std = np.where(interval_count > 1, interval_std, DEFAULT_INTERVAL_STD)
+
+    # --- First appearance of each (account, receiver) pair ---
+    by_pair = np.lexsort((position, receiver, group))
+    pair_start = np.r_[True, (group[by_pair][1:] != group[by_pair][:-1])
+                       | (receiver[by_pair][1:] != receiver[by_pair][:-1])] if n else np.empty(0, dtype=bool)
+    first_position = np.empty(n, dtype=np.int64)
+    first_position[by_pair] = np.repeat(
+        position[by_pair][pair_start], np.diff(np.r_[np.flatnonzero(pair_start), n])
+    )
+    first_seen = first_position == position
+    new_counterparty_rate = (
+        np.bincount(group[first_seen & is_train], minlength=num_groups) / np.maximum(split, 1)
+    )
+
+    # --- Payment format mix of the training window ---
+    num_formats = int(payment_format.max()) + 1 if n else 1
+    format_counts = np.bincount(
+        group[is_train] * num_formats + payment_format[is_train], minlength=num_groups * num_formats
+    )
+
+    # --- Predictions ---
+    predicted_amount_std = np.where(amount_std > 0, amount_std, amount_mean * 0.5)
+    predicted_days_std = np.where(interval_std > 0, interval_std, DEFAULT_INTERVAL_STD)
+    likely_known = new_counterparty_rate < 0.5
+
+    # --- Score test rows ---
+    test = ~is_train & eligible[group]
+    g = group[test]
+
+    actual_amount = amount[test]
+    actual_interval = gap[test]
+    actual_known = first_position[test] < position[test]
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        amount_z = np.where(
+            predicted_amount_std[g] > 0,
+            np.abs(actual_amount - amount_mean[g]) / predicted_amount_std[g],
+            np.where(actual_amount == amount_mean[g], 0.0, 2.0),
+        )
+    interval_z = np.abs(actual_interval - interval_mean[g]) / predicted_days_std[g]
+
+    rate = new_counterparty_rate[g]
+    counterparty_error = np.select(
+        [likely_known[g] & ~actual_known, ~likely_known[g] & actual_known],
+        [1.0 - rate, rate],
+        default=0.0,
+    )
+    format_error = 1.0 - format_counts[g * num_formats + payment_format[test]] / split[g]
+
+    total_error = (
+        0.40 * np.minimum(amount_z, AMOUNT_Z_CAP)
+        + 0.25 * counterparty_error * 3
+        + 0.20 * np.minimum(interval_z, INTERVAL_Z_CAP)
+        + 0.15 * format_error * 3
+    )
+
+    rows = order[test]
+    return PredictionScores(
+        rows=rows,
+        account=account[test],
+        txn_ids=batch.txn_ids[rows],
+        predicted_amount=amount_mean[g],
+        actual_amount=actual_amount,
+        predicted_interval=interval_mean[g],
+        actual_interval=actual_interval,
+        predicted_known_counterparty=likely_known[g],
+        actual_known_counterparty=actual_known,
+        amount_z_score=amount_z,
+        interval_z_score=interval_z,
+        counterparty_error=counterparty_error,
+        format_error=format_error,
+        total_error=total_error,
+        is_laundering=batch.is_laundering[rows],
+        accounts_scored=int(eligible.sum()),
+    )
+
+
+def select_accounts(
+    batch: TransactionBatch,
+    max_accounts: Optional[int] = None,
+    min_transactions: int = MIN_HISTORY_FOR_NARRATIVE + MIN_TEST_TRANSACTIONS,
+) -> np.ndarray:
+    """
+    Pick experiment accounts from one batch instead of two aggregations.
+
+    Half are senders of at least one laundering transaction, half are
+    clean senders with at least `min_transactions` transactions.
+
+    Args:
+        batch: Transactions to choose from
+        max_accounts: Total accounts (None = every qualifying account)
+        min_transactions: Minimum history for clean accounts
+
+    Returns:
+        Sender account codes (laundering accounts first)
+    """
+    size = len(batch.dictionaries.accounts)
+    sent = np.bincount(batch.sender_account, minlength=size)
+    laundering = np.bincount(batch.sender_account[batch.is_laundering], minlength=size)
+
+    laundering_accounts = np.flatnonzero(laundering > 0)
+    clean_accounts = np.flatnonzero((laundering == 0) & (sent >= min_transactions))
+
+    if max_accounts is not None:
+        laundering_accounts = laundering_accounts[:max_accounts // 2]
+        clean_accounts = clean_accounts[:max_accounts // 2]
+    return np.concatenate([laundering_accounts, clean_accounts]).astype(np.int32)
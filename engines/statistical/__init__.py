@@ -7,5 +7,6 @@ Output: statistical_anomaly_score (0.0 - 10.0)
 """
 
 from .engine import StatisticalEngine
+from .windows import WindowEngine
 
-__all__ = ["StatisticalEngine"]
+__all__ = ["StatisticalEngine", "WindowEngine"]
@@ -0,0 +1,254 @@
+"""
+Rolling-Window Account Aggregates for the Statistical Engine
+
+Sliding 24h and 7d windows per account over the transaction stream.
+Every window keeps a ring buffer of its transactions plus running totals:
+an update appends the new transaction and expires the oldest ones,
+adjusting the totals as they leave. Updates are amortized O(1), reading
+an account's windowed features is O(1), and history is never rescanned.
+
+Structuring and smurfing show up as many sub-threshold transfers or many
+counterparties within a short window, which neither a single transaction
+amount nor lifetime AccountStats reveal.
+
+Transactions are expected in chronological order per account; one older
+than the newest already seen for an account is counted as if it happened
+at that newest time. A self-transfer counts once, as outgoing, with no
+counterparty.
+
+Windows start empty; `seed` fills an account's windows from history it
+already has (e.g. AccountHistory.recent_transactions) the first time the
+account is seen, so features are meaningful before a full window of
+stream has passed.
+
+Usage:
+    windows = WindowEngine()
+    for txn, history in stream:
+        windows.seed(history.account_id, history.recent_transactions)
+        features = windows.observe(txn)  # sender's WindowFeatures, including txn
+"""
+
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from shared.models import Transaction, WindowFeatures
+
+
+# Window label -> length in seconds (labels match the WindowFeatures fields)
+WINDOWS = {
+    "24h": 24 * 3600,
+    "7d": 7 * 24 * 3600,
+}
+
+# Outgoing amounts in [low, high) count as sub-threshold (just below the $10K CTR threshold)
+SUB_THRESHOLD_RANGE = (9000.0, 10000.0)
+
+
+class _Window:
+    """Ring buffer and running totals of one account over one window length."""
+
+    __slots__ = ("length", "events", "count", "incoming", "sent", "received",
+                 "sub_threshold_count", "sub_threshold_sum", "counterparties")
+
+    def __init__(self, length: float):
+        self.length = length
+        self.events: deque = deque()  # (timestamp, amount, outgoing, counterparty or None)
+        self.count = 0
+        self.incoming = 0
+        self.sent = 0.0
+        self.received = 0.0
+        self.sub_threshold_count = 0
+        self.sub_threshold_sum = 0.0
+        self.counterparties: Dict[str, int] = {}  # counterparty -> transactions in window
+
+    def add(self, timestamp: float, amount: float, outgoing: bool, counterparty: Optional[str]) -> None:
+        self.events.append((timestamp, amount, outgoing, counterparty))
+        self._apply(amount, outgoing, counterparty, 1)
+
+    def expire(self, now: float) -> None:
+        """Drop transactions at or before now - length."""
+        cutoff = now - self.length
+        events = self.events
+        while events and events[0][0] <= cutoff:
+            _, amount, outgoing, counterparty = events.popleft()
+            self._apply(amount, outgoing, counterparty, -1)
+
+        # Clear rounding residue of running sums whose transactions all expired
+        if self.count == self.incoming:
+            self.sent = 0.0
+        if not self.incoming:
+            self.received = 0.0
+        if not self.sub_threshold_count:
+            self.sub_threshold_sum = 0.0
+
+    def _apply(self, amount: float, outgoing: bool, counterparty: Optional[str], sign: int) -> None:
+        self.count += sign
+        if outgoing:
+            self.sent += sign * amount
+            if SUB_THRESHOLD_RANGE[0] <= amount < SUB_THRESHOLD_RANGE[1]:
+                self.sub_threshold_count += sign
+                self.sub_threshold_sum += sign * amount
+        else:
+            self.incoming += sign
+            self.received += sign * amount
+
+        if counterparty is None:
+            return
+        remaining = self.counterparties.get(counterparty, 0) + sign
+        if remaining:
+            self.counterparties[counterparty] = remaining
+        else:
+            del self.counterparties[counterparty]
+
+
+class WindowEngine:
+    """
+    Incrementally maintained window aggregates for every account seen.
+
+    Each transaction updates the sender's windows (outgoing) and the
+    receiver's windows (incoming). Thread-safe.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._accounts: Dict[str, List[_Window]] = {}
+        self._latest: Dict[str, float] = {}
+        self._seeded: Set[str] = set()
+
+    def __len__(self) -> int:
+        return len(self._accounts)
+
+    def _add(self, account_id: str, timestamp: float, amount: float,
+             outgoing: bool, counterparty: Optional[str]) -> None:
+        windows = self._accounts.get(account_id)
+        if windows is None:
+            windows = self._accounts[account_id] = [_Window(length) for length in WINDOWS.values()]
+        timestamp = max(timestamp, self._latest.get(account_id, timestamp))
+        self._latest[account_id] = timestamp
+        for window in windows:
+            window.add(timestamp, amount, outgoing, counterparty)
+            window.expire(timestamp)
+
+    @staticmethod
+    def _event(account_id: str, transaction: Transaction) -> Optional[Tuple[float, float, bool, Optional[str]]]:
+        """Window event of a transaction from one account's side (None if not a party)."""
+        timestamp = transaction.timestamp.timestamp()
+        sender = transaction.sender.account_id
+        receiver = transaction.receiver.account_id
+        if sender == account_id:
+            return timestamp, transaction.amount.sent, True, None if receiver == account_id else receiver
+        if receiver == account_id:
+            return timestamp, transaction.amount.received, False, sender
+        return None
+
+    def seed(self, account_id: str, transactions: Iterable[Transaction]) -> bool:
+        """
+        Add an account's earlier transactions, once per account.
+
+        Only the account's own side of each transaction is added, and only
+        transactions older than any the engine already holds for it, so
+        nothing is counted twice.
+
+        Args:
+            account_id: Account to seed
+            transactions: Its history (e.g. AccountHistory.recent_transactions)
+
+        Returns:
+            True if the account had not been seeded before
+        """
+        with self._lock:
+            if account_id in self._seeded:
+                return False
+            self._seeded.add(account_id)
+
+            windows = self._accounts.get(account_id)
+            current = list(max(windows, key=lambda w: w.length).events) if windows else []
+            oldest = current[0][0] if current else float("inf")
+            events = sorted(
+                (e for e in (self._event(account_id, t) for t in transactions) if e and e[0] < oldest),
+                key=lambda e: e[0],
+            )
+            if not events:
+                return True
+
+            windows = self._accounts[account_id] = [_Window(length) for length in WINDOWS.values()]
+            for event in events + current:
+                for window in windows:
+                    window.add(*event)
+                    window.expire(event[0])
+            self._latest[account_id] = max(self._latest.get(account_id, events[-1][0]), events[-1][0])
+            return True
+
+    def update(self, transaction: Transaction) -> None:
+        """Add a transaction to the sender's and receiver's windows (once for a self-transfer)."""
+        timestamp = transaction.timestamp.timestamp()
+        sender = transaction.sender.account_id
+        receiver = transaction.receiver.account_id
+        with self._lock:
+            if sender == receiver:
+                self._add(sender, timestamp, transaction.amount.sent, True, None)
+                return
+            self._add(sender, timestamp, transaction.amount.sent, True, receiver)
+            self._add(receiver, timestamp, transaction.amount.received, False, sender)
+
+    def features(self, account_id: str, now: Optional[datetime] = None) -> WindowFeatures:
+        """
+        Window aggregates of an account.
+
+        Args:
+            account_id: Account to read
+            now: Evaluation time (defaults to the account's latest transaction)
+
+        Returns:
+            WindowFeatures (all zero for an unseen account)
+        """
+        with self._lock:
+            windows = self._accounts.get(account_id)
+            if windows is None:
+                return WindowFeatures()
+            if now is not None:
+                for window in windows:
+                    window.expire(now.timestamp())
+
+            values = {}
+            for label, window in zip(WINDOWS, windows):
+                values[f"txn_count_{label}"] = window.count
+                values[f"sub_threshold_count_{label}"] = window.sub_threshold_count
+                values[f"sub_threshold_sum_{label}"] = window.sub_threshold_sum
+                values[f"distinct_counterparties_{label}"] = len(window.counterparties)
+                values[f"sent_{label}"] = window.sent
+                values[f"received_{label}"] = window.received
+                values[f"in_out_ratio_{label}"] = (
+                    window.sent / window.received if window.received > 0 else None
+                )
+            return WindowFeatures(**values)
+
+    def observe(self, transaction: Transaction) -> WindowFeatures:
+        """Add a transaction and return the sender's features including it."""
+        self.update(transaction)
+        return self.features(transaction.sender.account_id)
+
+    def prune(self, now: datetime) -> int:
+        """
+        Forget accounts with no transaction inside the longest window.
+
+        Args:
+            now: Current stream time
+
+        Returns:
+            Number of accounts removed
+        """
+        with self._lock:
+            idle = []
+            for account_id, windows in self._accounts.items():
+                for window in windows:
+                    window.expire(now.timestamp())
+                if not any(window.events for window in windows):
+                    idle.append(account_id)
+            for account_id in idle:
+                del self._accounts[account_id]
+                del self._latest[account_id]
+                self._seeded.discard(account_id)
+            return len(idle)
@@ -11,6 +11,7 @@ TODO: Implement in Phase D
 
 from typing import Optional
 from dataclasses import dataclass
+from datetime import timedelta
 import time
 
 from shared.config import THRESHOLDS
@@ -24,7 +25,12 @@ from shared.models import (
 )
 from engines.statistical.engine import StatisticalEngine
 from engines.narrative.engine import NarrativeEngine
-from engines.expert.agent import ExpertAgent
+from engines.statistical.windows import WindowEngine
+from shared.graph import GRAPH_WINDOW, TransactionGraph
+
+
+# Stream time between sweeps that forget idle accounts' window state
+WINDOW_PRUNE_INTERVAL = timedelta(hours=1)
 
 
 class Pipeline:
@@ -33,12 +39,62 @@ class Pipeline:
 
     Orchestrates the flow of transactions through all three layers,
     with early exit for transactions that pass statistical and narrative checks.
+
+    The Expert Agent (and with it the LLM SDKs and MongoDB client) is only
+    loaded when a transaction first reaches Layer 3, so workers that stop
+    at Layers 1/2 start without touching external services.
+
+    Every transaction is added to the transaction graph; graph features
+    (cycles, fan-out, pass-through) are only computed for escalations.
     """
 
-    def __init__(self):
+    def __init__(self, graph: Optional[TransactionGraph] = None):
+        """
+        Args:
+            graph: Transaction graph preloaded with history (e.g.
+                TransactionGraph.from_parquet). Give it a retention period
+                or rebuild it on a schedule, or it grows with the stream.
+                Defaults to an empty graph keeping GRAPH_WINDOW of edges.
+        """
         self.statistical = StatisticalEngine()
         self.narrative = NarrativeEngine()
-        self.expert = ExpertAgent()
+        self.windows = WindowEngine()
+        self.graph = graph if graph is not None else TransactionGraph(retention=GRAPH_WINDOW)
+        self._last_prune = None
+        self._expert = None
+
+    @property
+    def expert(self):
+        """Layer 3 Expert Agent, loaded on first use."""
+        if self._expert is None:
+            from engines.expert.agent import ExpertAgent
+            self._expert = ExpertAgent()
+        return self._expert
+
+    def ready(self, expert: bool = True, timeout: Optional[float] = None) -> bool:
+        """
+        Readiness probe, separate from construction.
+
+        Layers 1 and 2 have no external dependencies; Layer 3 needs MongoDB
+        and the Anthropic API.
+
+        Args:
+            expert: Whether this worker must be able to reach Layer 3
+            timeout: Seconds to wait for MongoDB
+
+        Returns:
+            True if every required layer is ready
+        """
+        return not expert or self.expert.ready(timeout=timeout)
+
+    def _prune(self, transaction: Transaction) -> None:
+        """Forget idle accounts' windows every WINDOW_PRUNE_INTERVAL of stream time."""
+        now = transaction.timestamp
+        if self._last_prune is None:
+            self._last_prune = now
+        elif now - self._last_prune >= WINDOW_PRUNE_INTERVAL:
+            self.windows.prune(now)
+            self._last_prune = now
 
     def process(self, transaction: Transaction, history: AccountHistory) -> PipelineResult:
         """
@@ -54,6 +110,17 @@ class Pipeline:
         start_time = time.time()
         layers_invoked = []
 
+        # Rolling-window aggregates see every transaction, not only escalations.
+        # A sender's windows start from its known history the first time it is seen.
+        self.windows.seed(history.account_id, [
+            t for t in history.recent_transactions
+            if t.timestamp <= transaction.timestamp
+            and (t.txn_id is None or t.txn_id != transaction.txn_id)
+        ])
+        window_features = self.windows.observe(transaction)
+        self._prune(transaction)
+        self.graph.add_transaction(transaction)
+
         # Layer 1: Statistical Engine
         layers_invoked.append("statistical")
         stat_start = time.time()
@@ -125,6 +192,8 @@ class Pipeline:
             narrative_score=narr_result.score,
             account_history=history,
             triggered_by=triggered_by,
+            window_features=window_features,
+            graph_features=self.graph.graph_features(transaction.sender.account_id),
         )
 
         verdict = self.expert.analyze(tribunal_input)
@@ -146,6 +215,12 @@ class Pipeline:
 # =============================================================================
 
 def process_transaction(transaction: Transaction, history: AccountHistory) -> PipelineResult:
-    """Process a single transaction through the tribunal."""
+    """
+    Process a single transaction through a fresh tribunal.
+
+    The pipeline (and with it all stream state) is discarded afterwards:
+    window features only reflect the transaction and `history`, and graph
+    features only the transaction itself. Streams should reuse one Pipeline.
+    """
     pipeline = Pipeline()
     return pipeline.process(transaction, history)
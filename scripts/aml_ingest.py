@@ -12,9 +12,14 @@ Requirements:
 
 import argparse
 import hashlib
+import io
 import logging
+import queue
 import sys
+import threading
+from dataclasses import dataclass
 from datetime import datetime
+from itertools import count, islice
 from pathlib import Path
 from typing import Generator, Dict, Any, List, Optional
 
@@ -24,6 +29,11 @@ from pymongo import MongoClient, UpdateOne, InsertOne
 from pymongo.errors import BulkWriteError, ConnectionFailure
 from tqdm import tqdm
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from shared.batch import resolve_column
+from shared.db import ensure_history_index
+
 # ============================================================
 # CONFIGURATION
 # ============================================================
@@ -40,7 +50,11 @@ INGESTION_LOG_COLLECTION = "ingestion_log"
 # Processing settings
 DEFAULT_BATCH_SIZE = 5000      # Records per batch (memory-safe)
 MAX_MEMORY_MB = 800            # Target max memory usage
-CHUNK_SIZE = 10000             # CSV read chunk size
+DEFAULT_WRITERS = 4            # Concurrent bulk writer threads
+QUEUE_BATCHES_PER_WRITER = 2   # Parsed batches buffered per writer
+SOURCE_KEY_BYTES = 1 << 20     # Leading bytes that identify a source CSV
+
+DUPLICATE_KEY_ERROR = 11000
 
 # Logging setup
 logging.basicConfig(
@@ -58,7 +72,7 @@ logger = logging.getLogger(__name__)
 # DATABASE CONNECTION
 # ============================================================
 
-def get_mongo_client() -> MongoClient:
+def get_mongo_client(max_pool_size: int = 10) -> MongoClient:
     """Create MongoDB client with connection validation."""
     try:
         client = MongoClient(
@@ -66,7 +80,7 @@ def get_mongo_client() -> MongoClient:
             serverSelectionTimeoutMS=5000,
             connectTimeoutMS=10000,
             socketTimeoutMS=30000,
-            maxPoolSize=10,
+            maxPoolSize=max_pool_size,
             tlsCAFile=certifi.where()
         )
         # Validate connection
@@ -88,8 +102,10 @@ def setup_collections(db) -> None:
     db[TRANSACTIONS_COLLECTION].create_index("receiver.account_id")
     db[TRANSACTIONS_COLLECTION].create_index("is_laundering")
     db[TRANSACTIONS_COLLECTION].create_index("amount.received")
+    db[TRANSACTIONS_COLLECTION].create_index("batch_id")  # Incremental entity extraction
     db[TRANSACTIONS_COLLECTION].create_index([("sender.account_id", 1), ("timestamp", -1)])
     db[TRANSACTIONS_COLLECTION].create_index([("is_laundering", 1), ("amount.received", -1)])
+    ensure_history_index(db[TRANSACTIONS_COLLECTION])  # Covering index for bulk history fetches
 
     # Accounts indexes
     db[ACCOUNTS_COLLECTION].create_index("account_id")
@@ -106,126 +122,267 @@ def setup_collections(db) -> None:
 # DATA TRANSFORMATION
 # ============================================================
 
-def generate_txn_id(row_index: int, timestamp: str, sender: str, receiver: str) -> str:
-    """Generate deterministic transaction ID for idempotency."""
-    # Create hash from unique combination
-    unique_str = f"{row_index}_{timestamp}_{sender}_{receiver}"
-    hash_suffix = hashlib.md5(unique_str.encode()).hexdigest()[:8]
-    return f"TXN_{row_index:010d}_{hash_suffix}"
+def generate_txn_ids(start_index: int, timestamps: List[str],
+                     senders: List[str], receivers: List[str]) -> List[str]:
+    """
+    Generate deterministic transaction IDs for consecutive CSV rows.
 
+    ID for row i: TXN_<i:010d>_<md5("{i}_{timestamp}_{sender}_{receiver}")[:8]>
+    """
+    md5 = hashlib.md5
+    return [
+        f"TXN_{row_index:010d}_{md5(f'{row_index}_{ts}_{sender}_{receiver}'.encode()).hexdigest()[:8]}"
+        for row_index, ts, sender, receiver in zip(count(start_index), timestamps, senders, receivers)
+    ]
 
-def transform_row(row: pd.Series, row_index: int, batch_id: str) -> Dict[str, Any]:
-    """Transform a CSV row into MongoDB document format."""
 
-    # Parse timestamp
-    try:
-        timestamp = pd.to_datetime(row.get('Timestamp', row.get('timestamp', '')))
-    except:
-        timestamp = datetime.utcnow()
-
-    # Extract fields with fallbacks for different column naming conventions
-    sender_account = str(row.get('Account', row.get('From Account', row.get('account', '')))).strip()
-    sender_bank = str(row.get('From Bank', row.get('from_bank', ''))).strip()
-    receiver_account = str(row.get('Account.1', row.get('To Account', row.get('account_1', '')))).strip()
-    receiver_bank = str(row.get('To Bank', row.get('to_bank', ''))).strip()
-
-    # Amounts
-    amount_sent = float(row.get('Amount Paid', row.get('amount_paid', 0)) or 0)
-    amount_received = float(row.get('Amount Received', row.get('amount_received', 0)) or 0)
-
-    # If amount_sent is 0, use amount_received
-    if amount_sent == 0:
-        amount_sent = amount_received
-
-    # Currencies
-    currency_sent = str(row.get('Payment Currency', row.get('payment_currency', 'USD'))).strip()
-    currency_received = str(row.get('Receiving Currency', row.get('receiving_currency', 'USD'))).strip()
-
-    # Payment format
-    payment_format = str(row.get('Payment Format', row.get('payment_format', 'Unknown'))).strip()
-
-    # Laundering flag
-    is_laundering = bool(int(row.get('Is Laundering', row.get('is_laundering', 0)) or 0))
-
-    # Generate deterministic ID
-    txn_id = generate_txn_id(row_index, str(timestamp), sender_account, receiver_account)
-
-    return {
-        "txn_id": txn_id,
-        "timestamp": timestamp,
-        "sender": {
-            "account_id": sender_account,
-            "bank_id": sender_bank
-        },
-        "receiver": {
-            "account_id": receiver_account,
-            "bank_id": receiver_bank
-        },
-        "amount": {
-            "sent": amount_sent,
-            "received": amount_received,
-            "currency_sent": currency_sent,
-            "currency_received": currency_received
-        },
-        "payment_format": payment_format,
-        "is_laundering": is_laundering,
-        "batch_id": batch_id,
-        "ingested_at": datetime.utcnow()
-    }
+def transform_chunk(chunk: pd.DataFrame, start_index: int, batch_id: str) -> List[Dict[str, Any]]:
+    """
+    Transform a CSV chunk into MongoDB documents, column by column.
+
+    Column-name fallbacks are resolved once per chunk (shared.batch.CSV_COLUMNS)
+    and every field is parsed as a whole column before documents are emitted.
+
+    Args:
+        chunk: DataFrame of consecutive CSV rows
+        start_index: CSV row index of the first row in the chunk
+        batch_id: Batch the documents belong to
+
+    Returns:
+        One document per row, in CSV order
+    """
+    size = len(chunk)
+
+    def column(field_name: str, default: Any) -> pd.Series:
+        name = resolve_column(chunk.columns, field_name)
+        if name is None:
+            return pd.Series([default] * size, index=chunk.index)
+        return chunk[name]
+
+    def strings(field_name: str, default: str) -> List[str]:
+        return column(field_name, default).astype(str).str.strip().tolist()
+
+    # Timestamps (unparseable values fall back to ingestion time)
+    timestamps = pd.to_datetime(column("timestamp", None), errors="coerce")
+    timestamps = timestamps.fillna(pd.Timestamp(datetime.utcnow()))
+
+    # Account / bank identifiers
+    sender_accounts = strings("sender_account", "")
+    sender_banks = strings("sender_bank", "")
+    receiver_accounts = strings("receiver_account", "")
+    receiver_banks = strings("receiver_bank", "")
+
+    # Amounts (if amount_sent is 0, use amount_received)
+    amount_received = pd.to_numeric(column("amount_received", 0), errors="coerce").astype(float)
+    amount_sent = pd.to_numeric(column("amount_sent", 0), errors="coerce").astype(float)
+    amount_sent = amount_sent.where(amount_sent != 0, amount_received)
+
+    # Currencies, payment format, laundering flag
+    currencies_sent = strings("currency_sent", "USD")
+    currencies_received = strings("currency_received", "USD")
+    payment_formats = strings("payment_format", "Unknown")
+    is_laundering = pd.to_numeric(column("is_laundering", 0), errors="coerce").fillna(0).astype(int) != 0
+
+    # Format every timestamp like str(pd.Timestamp): Series.astype(str) drops
+    # the time of day when a whole chunk falls on midnight, changing the IDs
+    txn_ids = generate_txn_ids(
+        start_index, timestamps.dt.strftime("%Y-%m-%d %H:%M:%S").tolist(),
+        sender_accounts, receiver_accounts
+    )
+    ingested_at = datetime.utcnow()
+
+    return [
+        {
+            "txn_id": txn_id,
+            "timestamp": timestamp,
+            "sender": {
+                "account_id": sender_account,
+                "bank_id": sender_bank
+            },
+            "receiver": {
+                "account_id": receiver_account,
+                "bank_id": receiver_bank
+            },
+            "amount": {
+                "sent": sent,
+                "received": received,
+                "currency_sent": currency_sent,
+                "currency_received": currency_received
+            },
+            "payment_format": payment_format,
+            "is_laundering": laundering,
+            "batch_id": batch_id,
+            "ingested_at": ingested_at
+        }
+        for (txn_id, timestamp, sender_account, sender_bank, receiver_account, receiver_bank,
+             sent, received, currency_sent, currency_received, payment_format, laundering)
+        in zip(txn_ids, timestamps.tolist(), sender_accounts, sender_banks,
+               receiver_accounts, receiver_banks, amount_sent.tolist(), amount_received.tolist(),
+               currencies_sent, currencies_received, payment_formats, is_laundering.tolist())
+    ]
 
 
 # ============================================================
 # BATCH PROCESSING
 # ============================================================
 
-def read_csv_in_chunks(csv_path: str, chunk_size: int) -> Generator[pd.DataFrame, None, None]:
-    """Read CSV file in memory-efficient chunks."""
+@dataclass
+class ResumePoint:
+    """Where the next run starts: first batch number, CSV row and byte offset."""
+    batch_number: int = 0
+    row_index: int = 0
+    offset: Optional[int] = None  # None = right after the header
+
+
+def read_csv_header(csv_path: str) -> tuple:
+    """
+    Read the CSV header.
+
+    Returns:
+        (column names as pandas names them, byte offset of the first data row).
+        Duplicate names are mangled the same way pd.read_csv does
+        ("Account", "Account.1").
+    """
+    with open(csv_path, 'rb') as f:
+        header = f.readline()
+        columns = list(pd.read_csv(io.BytesIO(header), nrows=0).columns)
+        return columns, f.tell()
+
+
+def skip_csv_rows(csv_path: str, rows: int) -> int:
+    """Byte offset of data row `rows` (legacy resume without stored offsets)."""
+    _, offset = read_csv_header(csv_path)
+    with open(csv_path, 'rb') as f:
+        f.seek(offset)
+        for _ in range(rows):
+            if not f.readline():
+                break
+        return f.tell()
+
 
+def read_csv_batches(csv_path: str, batch_size: int,
+                     start_offset: Optional[int] = None) -> Generator[tuple, None, None]:
+    """
+    Read the CSV in batch-sized blocks of raw lines, starting at a byte offset.
+
+    Each block is parsed on its own (same per-chunk type inference as
+    pd.read_csv(chunksize=...)), so a resumed run seeks straight to its
+    offset instead of re-parsing everything before it. Assumes one record
+    per line, which holds for the IBM AML CSVs.
+
+    Yields:
+        (chunk DataFrame, byte offset just past the chunk)
+    """
+
+    columns, data_offset = read_csv_header(csv_path)
     logger.info(f"Reading CSV: {csv_path}")
 
-    # Get total rows for progress tracking
-    total_rows = sum(1 for _ in open(csv_path, 'r')) - 1  # Subtract header
-    logger.info(f"Total rows in CSV: {total_rows:,}")
+    with open(csv_path, 'rb') as f:
+        f.seek(data_offset if start_offset is None else start_offset)
+        while True:
+            lines = list(islice(f, batch_size))
+            if not lines:
+                return
+            chunk = pd.read_csv(io.BytesIO(b"".join(lines)), header=None, names=columns)
+            yield chunk, f.tell()
+
 
-    # Read in chunks
-    for chunk in pd.read_csv(csv_path, chunksize=chunk_size, low_memory=True):
-        yield chunk
+def source_key(csv_path: str) -> str:
+    """
+    Identify a source CSV by its content (keys its resume state and batch IDs).
 
+    Hashes the complete lines within the first SOURCE_KEY_BYTES (header
+    included), so the key survives moving, renaming, re-downloading and
+    appending to the file. Files shorter than that are keyed on all of
+    their lines.
+    """
+    with open(csv_path, 'rb') as f:
+        prefix = f.read(SOURCE_KEY_BYTES)
+    prefix = prefix[:prefix.rfind(b"\n") + 1] or prefix
+    return hashlib.md5(prefix).hexdigest()[:12]
 
-def get_last_processed_batch(db) -> int:
-    """Get the last successfully processed batch number for resume capability."""
 
-    last_log = db[INGESTION_LOG_COLLECTION].find_one(
-        {"status": "completed"},
+def offset_at_line_start(csv_path: str, offset: int) -> bool:
+    """Whether a stored byte offset still falls on a line boundary of the file."""
+    with open(csv_path, 'rb') as f:
+        if offset > f.seek(0, io.SEEK_END):
+            return False
+        f.seek(offset - 1)
+        return f.read(1) == b"\n"
+
+
+def get_resume_point(db, csv_path: str) -> ResumePoint:
+    """
+    Get the resume point after the last successfully processed batch of this file.
+
+    Batches of other files are ignored. Logs written before batches recorded
+    their source only resume by row count, as their byte offsets may belong
+    to another file; so does a stored offset that no longer falls on a line
+    boundary (the file changed past the keyed prefix).
+    """
+
+    log = db[INGESTION_LOG_COLLECTION]
+    last_log = log.find_one(
+        {"status": "completed", "source": source_key(csv_path)},
         sort=[("batch_number", -1)]
     )
-
-    if last_log:
-        return last_log["batch_number"]
-    return 0
+    if not last_log:
+        last_log = log.find_one(
+            {"status": "completed", "source": {"$exists": False}},
+            sort=[("batch_number", -1)]
+        )
+        if last_log:
+            last_log = {**last_log, "csv_end_offset": None}
+
+    if not last_log:
+        return ResumePoint()
+
+    row_index = last_log["csv_end_row"] + 1
+    offset = last_log.get("csv_end_offset")
+    if offset is not None and not offset_at_line_start(csv_path, offset):
+        logger.warning(f"Stored offset {offset:,} no longer lines up with {csv_path}; resuming by row")
+        offset = None
+    if offset is None:
+        # No offset recorded for this file: skip raw lines, no parsing
+        offset = skip_csv_rows(csv_path, row_index)
+
+    return ResumePoint(
+        batch_number=last_log["batch_number"] + 1,
+        row_index=row_index,
+        offset=offset
+    )
 
 
 def log_batch(db, batch_id: str, batch_number: int, stats: Dict, status: str,
-              error_msg: Optional[str] = None, start_row: int = 0, end_row: int = 0) -> None:
-    """Log batch processing results."""
-
-    db[INGESTION_LOG_COLLECTION].update_one(
-        {"_id": batch_id},
-        {"$set": {
-            "batch_number": batch_number,
-            "records_processed": stats.get("processed", 0),
-            "records_inserted": stats.get("inserted", 0),
-            "records_skipped": stats.get("skipped", 0),
-            "start_time": stats.get("start_time"),
-            "end_time": datetime.utcnow(),
-            "duration_seconds": stats.get("duration", 0),
-            "status": status,
-            "error_message": error_msg,
-            "csv_start_row": start_row,
-            "csv_end_row": end_row
-        }},
-        upsert=True
-    )
+              error_msg: Optional[str] = None, start_row: int = 0, end_row: int = 0,
+              end_offset: Optional[int] = None, source: Optional[str] = None) -> None:
+    """
+    Log batch processing results.
+
+    A batch that inserted new transactions is (again) pending entity
+    extraction; one that only found existing transactions keeps its flag,
+    as they were already merged into accounts and banks.
+    """
+
+    entry = {
+        "source": source,
+        "batch_number": batch_number,
+        "records_processed": stats.get("processed", 0),
+        "records_inserted": stats.get("inserted", 0),
+        "records_skipped": stats.get("skipped", 0),
+        "start_time": stats.get("start_time"),
+        "end_time": datetime.utcnow(),
+        "duration_seconds": stats.get("duration", 0),
+        "status": status,
+        "error_message": error_msg,
+        "csv_start_row": start_row,
+        "csv_end_row": end_row,
+        "csv_end_offset": end_offset
+    }
+    if stats.get("inserted", 0):
+        entry["entities_extracted"] = False
+
+    db[INGESTION_LOG_COLLECTION].update_one({"_id": batch_id}, {"$set": entry}, upsert=True)
 
 
 def process_batch(db, documents: List[Dict], batch_id: str) -> Dict[str, int]:
@@ -266,16 +423,216 @@ def process_batch(db, documents: List[Dict], batch_id: str) -> Dict[str, int]:
         }
 
 
+def insert_batch(db, documents: List[Dict], batch_id: str) -> Dict[str, int]:
+    """
+    Fast path for fresh loads: plain unordered insert_many.
+
+    Documents rejected with a duplicate-key error (txn_id already loaded,
+    e.g. a re-run batch) fall back to the idempotent upsert path; any other
+    write error is counted as an error.
+    """
+
+    if not documents:
+        return {"inserted": 0, "skipped": 0, "errors": 0}
+
+    try:
+        result = db[TRANSACTIONS_COLLECTION].insert_many(documents, ordered=False)
+        return {"inserted": len(result.inserted_ids), "skipped": 0, "errors": 0}
+    except BulkWriteError as e:
+        write_errors = e.details.get('writeErrors', [])
+        duplicates = [documents[err['index']] for err in write_errors
+                      if err.get('code') == DUPLICATE_KEY_ERROR]
+        fallback = process_batch(db, duplicates, batch_id)
+        return {
+            "inserted": e.details.get('nInserted', 0) + fallback["inserted"],
+            "skipped": fallback["skipped"],
+            "errors": len(write_errors) - len(duplicates) + fallback["errors"]
+        }
+
+
+# ============================================================
+# PIPELINED WRITERS
+# ============================================================
+
+@dataclass
+class ParsedBatch:
+    """A transformed batch waiting to be written."""
+    batch_number: int
+    batch_id: str
+    start_row: int
+    end_row: int
+    end_offset: int
+    documents: List[Dict[str, Any]]
+
+
+class BatchWriterPool:
+    """
+    Producer/consumer stage between the CSV parser and MongoDB.
+
+    The parser submits batches into a bounded queue; `writers` threads drain
+    it concurrently over the shared client's connection pool. Batches may
+    finish out of order, but they are logged to ingestion_log strictly in
+    batch order, so the last completed batch is always a safe resume point.
+    """
+
+    def __init__(self, db, total_stats: Dict[str, Any], first_batch: int = 0,
+                 writers: int = DEFAULT_WRITERS, fresh: bool = False,
+                 parquet_dir: Optional[str] = None, source: Optional[str] = None):
+        self.db = db
+        self.source = source
+        self.total_stats = total_stats
+        self.write = insert_batch if fresh else process_batch
+
+        # Optional columnar staging (pyarrow is only needed when enabled)
+        self.parquet_dir = parquet_dir
+        if parquet_dir:
+            from shared.columnar import write_transactions
+            self.stage = write_transactions
+
+        self._queue: "queue.Queue[Optional[ParsedBatch]]" = queue.Queue(
+            maxsize=writers * QUEUE_BATCHES_PER_WRITER
+        )
+        self._lock = threading.Lock()
+        self._finished: Dict[int, tuple] = {}
+        self._next_to_log = first_batch
+        self._error: Optional[BaseException] = None
+
+        self._threads = [
+            threading.Thread(target=self._run, name=f"writer-{i}", daemon=True)
+            for i in range(writers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, batch: ParsedBatch) -> None:
+        """Queue a batch for writing (blocks while the queue is full)."""
+        self._put(batch)
+
+    def close(self) -> None:
+        """Wait for all queued batches to be written and logged."""
+        for _ in self._threads:
+            self._put(None, check_error=False)
+        for thread in self._threads:
+            thread.join()
+        if self._error is not None:
+            raise self._error
+
+    def _put(self, item: Optional[ParsedBatch], check_error: bool = True) -> None:
+        while True:
+            if check_error and self._error is not None:
+                raise self._error
+            try:
+                self._queue.put(item, timeout=1)
+                return
+            except queue.Full:
+                if not any(thread.is_alive() for thread in self._threads):
+                    return
+
+    def _run(self) -> None:
+        while True:
+            batch = self._queue.get()
+            if batch is None:
+                return
+            if self._error is not None:
+                continue  # Drain without writing after a failure
+
+            try:
+                start_time = datetime.utcnow()
+                if self.parquet_dir:
+                    self.stage(batch.documents, self.parquet_dir, batch.batch_id)
+                batch_stats = self.write(self.db, batch.documents, batch.batch_id)
+                duration = (datetime.utcnow() - start_time).total_seconds()
+            except Exception as e:
+                logger.error(f"Batch {batch.batch_number} failed: {e}")
+                with self._lock:
+                    self._error = self._error or e
+                continue
+
+            with self._lock:
+                self._finished[batch.batch_number] = (batch, batch_stats, start_time, duration)
+                self._log_completed()
+
+    def _log_completed(self) -> None:
+        """Log the contiguous run of finished batches (caller holds the lock)."""
+        while self._next_to_log in self._finished:
+            batch, batch_stats, start_time, duration = self._finished.pop(self._next_to_log)
+            processed = len(batch.documents)
+
+            log_batch(
+                self.db, batch.batch_id, batch.batch_number,
+                {
+                    "processed": processed,
+                    "inserted": batch_stats["inserted"],
+                    "skipped": batch_stats["skipped"],
+                    "start_time": start_time,
+                    "duration": duration
+                },
+                status="completed",
+                start_row=batch.start_row,
+                end_row=batch.end_row,
+                end_offset=batch.end_offset,
+                source=self.source
+            )
+
+            self.total_stats["total_processed"] += processed
+            self.total_stats["total_inserted"] += batch_stats["inserted"]
+            self.total_stats["total_skipped"] += batch_stats["skipped"]
+            self.total_stats["total_errors"] += batch_stats["errors"]
+            self.total_stats["batches_completed"] += 1
+
+            logger.info(
+                f"Batch {batch.batch_number}: {batch_stats['inserted']} inserted, "
+                f"{batch_stats['skipped']} skipped, {duration:.1f}s"
+            )
+            self._next_to_log += 1
+
+
 # ============================================================
 # ENTITY EXTRACTION
 # ============================================================
 
-def extract_accounts(db) -> int:
-    """Extract unique accounts from transactions using aggregation."""
+# Merge semantics for incremental extraction: counters and totals add up,
+# first/last seen widen. Missing fields (accounts created elsewhere) count as 0.
+def _accumulate(field: str) -> Dict[str, Any]:
+    return {"$add": [{"$ifNull": [f"${field}", 0]}, f"$$new.{field}"]}
+
+
+ACCOUNT_INCREMENTAL_MERGE = [{"$set": {
+    "first_seen": {"$min": ["$first_seen", "$$new.first_seen"]},
+    "last_seen": {"$max": ["$last_seen", "$$new.last_seen"]},
+    "transaction_count": _accumulate("transaction_count"),
+    "total_sent": _accumulate("total_sent"),
+    "total_received": _accumulate("total_received"),
+    "suspicious_count": _accumulate("suspicious_count")
+}}]
+
+BANK_INCREMENTAL_MERGE = [{"$set": {
+    "transaction_count": _accumulate("transaction_count")
+}}]
+
+
+def _batch_match(batch_ids: Optional[List[str]]) -> List[Dict[str, Any]]:
+    """Leading $match restricting an extraction to the given batches."""
+    if batch_ids is None:
+        return []
+    return [{"$match": {"batch_id": {"$in": batch_ids}}}]
+
+
+def extract_accounts(db, batch_ids: Optional[List[str]] = None) -> int:
+    """
+    Extract accounts from transactions using aggregation.
+
+    Args:
+        db: Database
+        batch_ids: Only aggregate these batches and merge the results into
+            existing accounts (counts and totals add up, first/last seen
+            widen). None rebuilds every account from all transactions.
+    """
 
-    logger.info("Extracting accounts from transactions...")
+    scope = "all transactions" if batch_ids is None else f"{len(batch_ids)} new batches"
+    logger.info(f"Extracting accounts from {scope}...")
 
-    pipeline = [
+    pipeline = _batch_match(batch_ids) + [
         # Unwind to get both sender and receiver
         {"$project": {
             "accounts": [
@@ -326,23 +683,31 @@ def extract_accounts(db) -> int:
         # Output to accounts collection
         {"$merge": {
             "into": ACCOUNTS_COLLECTION,
-            "whenMatched": "replace",
+            "whenMatched": "replace" if batch_ids is None else ACCOUNT_INCREMENTAL_MERGE,
             "whenNotMatched": "insert"
         }}
     ]
 
     db[TRANSACTIONS_COLLECTION].aggregate(pipeline, allowDiskUse=True)
     count = db[ACCOUNTS_COLLECTION].count_documents({})
-    logger.info(f"Extracted {count:,} unique accounts")
+    logger.info(f"Accounts collection now has {count:,} unique accounts")
     return count
 
 
-def extract_banks(db) -> int:
-    """Extract unique banks from transactions."""
+def extract_banks(db, batch_ids: Optional[List[str]] = None) -> int:
+    """
+    Extract banks from transactions.
+
+    Args:
+        db: Database
+        batch_ids: Only aggregate these batches and add their counts to
+            existing banks. None rebuilds every bank from all transactions.
+    """
 
-    logger.info("Extracting banks from transactions...")
+    scope = "all transactions" if batch_ids is None else f"{len(batch_ids)} new batches"
+    logger.info(f"Extracting banks from {scope}...")
 
-    pipeline = [
+    pipeline = _batch_match(batch_ids) + [
         {"$project": {"banks": ["$sender.bank_id", "$receiver.bank_id"]}},
         {"$unwind": "$banks"},
         {"$group": {
@@ -357,23 +722,67 @@ def extract_banks(db) -> int:
         {"$merge": {
             "into": BANKS_COLLECTION,
             "on": "bank_id",
-            "whenMatched": "replace",
+            "whenMatched": "replace" if batch_ids is None else BANK_INCREMENTAL_MERGE,
             "whenNotMatched": "insert"
         }}
     ]
 
     db[TRANSACTIONS_COLLECTION].aggregate(pipeline, allowDiskUse=True)
     count = db[BANKS_COLLECTION].count_documents({})
-    logger.info(f"Extracted {count:,} unique banks")
+    logger.info(f"Banks collection now has {count:,} unique banks")
     return count
 
 
+def extract_entities(db, rebuild: bool = False) -> None:
+    """
+    Bring accounts and banks up to date with ingested transactions.
+
+    Only completed batches not yet marked `entities_extracted` in
+    ingestion_log are aggregated, then marked. Accounts built before this
+    bookkeeping existed trigger a one-off full rebuild, so their batches
+    are not counted twice.
+
+    Args:
+        db: Database
+        rebuild: If True, rebuild all entities from every transaction
+    """
+
+    log = db[INGESTION_LOG_COLLECTION]
+
+    if (not rebuild
+            and db[ACCOUNTS_COLLECTION].estimated_document_count() > 0
+            and log.count_documents({"entities_extracted": True}, limit=1) == 0):
+        logger.info("Existing accounts predate incremental extraction, rebuilding once")
+        rebuild = True
+
+    if rebuild:
+        batch_ids = None
+        done_filter = {"status": "completed"}
+    else:
+        batch_ids = [
+            entry["_id"] for entry in log.find(
+                {"status": "completed", "entities_extracted": {"$ne": True}}, {"_id": 1}
+            )
+        ]
+        if not batch_ids:
+            logger.info("Entities already up to date")
+            return
+        done_filter = {"_id": {"$in": batch_ids}}
+
+    extract_accounts(db, batch_ids)
+    extract_banks(db, batch_ids)
+    log.update_many(done_filter, {"$set": {"entities_extracted": True}})
+
+
 # ============================================================
 # MAIN INGESTION FUNCTION
 # ============================================================
 
 def ingest_data(csv_path: str, batch_size: int = DEFAULT_BATCH_SIZE,
-                resume: bool = True, skip_entities: bool = False) -> Dict[str, Any]:
+                resume: bool = True, skip_entities: bool = False,
+                writers: int = DEFAULT_WRITERS, fresh: bool = False,
+                rebuild_entities: bool = False,
+                parquet_dir: Optional[str] = None) -> Dict[str, Any]:
     """
     Main ingestion function.
 
@@ -382,6 +791,12 @@ def ingest_data(csv_path: str, batch_size: int = DEFAULT_BATCH_SIZE,
         batch_size: Number of records per batch
         resume: If True, resume from last successful batch
         skip_entities: If True, skip account/bank extraction
+        writers: Number of concurrent bulk writer threads
+        fresh: If True, use insert_many instead of upserts (fresh loads)
+        rebuild_entities: If True, rebuild accounts/banks from all transactions
+            instead of only the newly ingested batches
+        parquet_dir: If set, also stage every batch into a partitioned
+            Parquet dataset at this path (see shared/columnar.py)
 
     Returns:
         Dictionary with ingestion statistics
@@ -392,18 +807,22 @@ def ingest_data(csv_path: str, batch_size: int = DEFAULT_BATCH_SIZE,
         raise FileNotFoundError(f"CSV file not found: {csv_path}")
 
     # Connect to MongoDB
-    client = get_mongo_client()
+    client = get_mongo_client(max_pool_size=max(10, writers + 2))
     db = client[DATABASE_NAME]
 
     # Setup indexes
     setup_collections(db)
 
-    # Check for resume point
-    start_batch = 0
+    # Check for resume point (per source file)
+    source = source_key(csv_path)
+    resume_point = ResumePoint()
     if resume:
-        start_batch = get_last_processed_batch(db)
-        if start_batch > 0:
-            logger.info(f"Resuming from batch {start_batch + 1}")
+        resume_point = get_resume_point(db, csv_path)
+        if resume_point.batch_number > 0:
+            logger.info(
+                f"Resuming from batch {resume_point.batch_number} "
+                f"(row {resume_point.row_index:,}, byte {resume_point.offset:,})"
+            )
 
     # Statistics
     total_stats = {
@@ -415,108 +834,50 @@ def ingest_data(csv_path: str, batch_size: int = DEFAULT_BATCH_SIZE,
         "start_time": datetime.utcnow()
     }
 
-    # Process CSV in chunks
-    batch_number = 0
-    row_index = 0
-    documents_buffer = []
+    # Process CSV one batch-sized block at a time
+    batch_number = resume_point.batch_number
+    row_index = resume_point.row_index
 
     logger.info(f"Starting ingestion with batch_size={batch_size}")
 
-    # Get total for progress bar
-    total_rows = sum(1 for _ in open(csv_path, 'r')) - 1
-
-    with tqdm(total=total_rows, desc="Ingesting", unit="rows") as pbar:
-        for chunk in read_csv_in_chunks(csv_path, CHUNK_SIZE):
-            for _, row in chunk.iterrows():
-                # Skip rows if resuming
-                if batch_number < start_batch:
-                    row_index += 1
-                    if row_index % batch_size == 0:
-                        batch_number += 1
-                    pbar.update(1)
-                    continue
-
-                # Transform row
-                batch_id = f"batch_{batch_number:06d}"
-                doc = transform_row(row, row_index, batch_id)
-                documents_buffer.append(doc)
-                row_index += 1
-                pbar.update(1)
-
-                # Process batch when buffer is full
-                if len(documents_buffer) >= batch_size:
-                    start_time = datetime.utcnow()
-
-                    # Process batch
-                    batch_stats = process_batch(db, documents_buffer, batch_id)
-
-                    duration = (datetime.utcnow() - start_time).total_seconds()
-
-                    # Log batch
-                    log_batch(
-                        db, batch_id, batch_number,
-                        {
-                            "processed": len(documents_buffer),
-                            "inserted": batch_stats["inserted"],
-                            "skipped": batch_stats["skipped"],
-                            "start_time": start_time,
-                            "duration": duration
-                        },
-                        status="completed",
-                        start_row=row_index - len(documents_buffer),
-                        end_row=row_index - 1
-                    )
-
-                    # Update totals
-                    total_stats["total_processed"] += len(documents_buffer)
-                    total_stats["total_inserted"] += batch_stats["inserted"]
-                    total_stats["total_skipped"] += batch_stats["skipped"]
-                    total_stats["total_errors"] += batch_stats["errors"]
-                    total_stats["batches_completed"] += 1
-
-                    # Log progress
-                    logger.info(
-                        f"Batch {batch_number}: {batch_stats['inserted']} inserted, "
-                        f"{batch_stats['skipped']} skipped, {duration:.1f}s"
-                    )
-
-                    # Clear buffer and increment batch
-                    documents_buffer = []
-                    batch_number += 1
-
-    # Process remaining documents
-    if documents_buffer:
-        batch_id = f"batch_{batch_number:06d}"
-        start_time = datetime.utcnow()
-        batch_stats = process_batch(db, documents_buffer, batch_id)
-        duration = (datetime.utcnow() - start_time).total_seconds()
-
-        log_batch(
-            db, batch_id, batch_number,
-            {
-                "processed": len(documents_buffer),
-                "inserted": batch_stats["inserted"],
-                "skipped": batch_stats["skipped"],
-                "start_time": start_time,
-                "duration": duration
-            },
-            status="completed",
-            start_row=row_index - len(documents_buffer),
-            end_row=row_index - 1
-        )
+    # Progress is tracked in bytes, so no pre-count pass is needed
+    file_size = Path(csv_path).stat().st_size
+    offset = resume_point.offset or read_csv_header(csv_path)[1]
 
-        total_stats["total_processed"] += len(documents_buffer)
-        total_stats["total_inserted"] += batch_stats["inserted"]
-        total_stats["total_skipped"] += batch_stats["skipped"]
-        total_stats["batches_completed"] += 1
+    # Parser (this thread) -> bounded queue -> writer threads
+    writer_pool = BatchWriterPool(db, total_stats, first_batch=batch_number,
+                                  writers=writers, fresh=fresh, parquet_dir=parquet_dir,
+                                  source=source)
+    logger.info(f"Writers: {writers} ({'insert_many' if fresh else 'upsert'} mode)")
 
-        logger.info(f"Final batch {batch_number}: {batch_stats['inserted']} inserted")
+    try:
+        with tqdm(total=file_size, initial=offset, desc="Ingesting",
+                  unit="B", unit_scale=True) as pbar:
+            for chunk, end_offset in read_csv_batches(csv_path, batch_size, resume_point.offset):
+                chunk_rows = len(chunk)
+
+                # Transform chunk and hand it to the writers
+                batch_id = f"batch_{source}_{batch_number:06d}"  # Stable per file content
+                writer_pool.submit(ParsedBatch(
+                    batch_number=batch_number,
+                    batch_id=batch_id,
+                    start_row=row_index,
+                    end_row=row_index + chunk_rows - 1,
+                    end_offset=end_offset,
+                    documents=transform_chunk(chunk, row_index, batch_id)
+                ))
+
+                row_index += chunk_rows
+                batch_number += 1
+                pbar.update(end_offset - offset)
+                offset = end_offset
+    finally:
+        writer_pool.close()
 
     # Extract entities
     if not skip_entities:
         logger.info("\nExtracting entities...")
-        extract_accounts(db)
-        extract_banks(db)
+        extract_entities(db, rebuild=rebuild_entities)
 
     # Final statistics
     total_stats["end_time"] = datetime.utcnow()
@@ -584,6 +945,28 @@ def main():
         action="store_true",
         help="Skip account/bank extraction"
     )
+    parser.add_argument(
+        "--rebuild-entities",
+        action="store_true",
+        help="Rebuild accounts/banks from all transactions (default: new batches only)"
+    )
+    parser.add_argument(
+        "--parquet-dir",
+        type=str,
+        default=None,
+        help="Also stage batches as partitioned Parquet in this directory (needs pyarrow)"
+    )
+    parser.add_argument(
+        "--writers", "-w",
+        type=int,
+        default=DEFAULT_WRITERS,
+        help=f"Concurrent bulk writer threads (default: {DEFAULT_WRITERS})"
+    )
+    parser.add_argument(
+        "--fresh",
+        action="store_true",
+        help="Fresh load: insert_many fast path, upserts only for duplicates"
+    )
     parser.add_argument(
         "--test",
         action="store_true",
@@ -611,7 +994,11 @@ def main():
             csv_path=args.csv,
             batch_size=args.batch_size,
             resume=not args.no_resume,
-            skip_entities=args.skip_entities
+            skip_entities=args.skip_entities,
+            writers=args.writers,
+            fresh=args.fresh,
+            rebuild_entities=args.rebuild_entities,
+            parquet_dir=args.parquet_dir
         )
         sys.exit(0)
     except FileNotFoundError as e:
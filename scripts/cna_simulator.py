@@ -7,12 +7,24 @@ transactions that break the customer's established narrative.
 """
 
 import os
+import sys
 import json
+import math
+import argparse
+import threading
 import certifi
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
 from pymongo import MongoClient
 from openai import OpenAI
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from shared.db import fetch_account_histories
+from shared.experiment import DEFAULT_SEED, stratified_sample
+
 # ============================================================
 # CONFIGURATION
 # ============================================================
@@ -25,6 +37,16 @@ OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY")
 HIGH_RISK_THRESHOLD = 70
 MEDIUM_RISK_THRESHOLD = 40
 
+# Concurrency
+ACCOUNT_WORKERS = 32     # Accounts replayed at once, each in chronological order
+LLM_IN_FLIGHT = 16       # Concurrent gpt-4o-mini requests
+PROGRESS_EVERY = 50      # Accounts between progress lines (non-verbose runs)
+
+# Statistical pre-screen: only transactions with suspicion >= threshold reach the scorer
+PRESCREEN_THRESHOLD = 0.35
+PRESCREEN_Z_CAP = 4.0    # Amount z-score at which the amount signal saturates
+PRESCREEN_WEIGHTS = {"amount": 0.5, "bank": 0.25, "format": 0.25}
+
 # ============================================================
 # CNA ANALYSIS PROMPT
 # ============================================================
@@ -81,17 +103,18 @@ def get_openai_client():
         raise ValueError("OPENAI_API_KEY not set")
     return OpenAI(api_key=OPENAI_API_KEY)
 
+def transaction_amount(transaction: dict) -> Tuple[float, str]:
+    """(amount sent, currency) of a transaction document."""
+    amt = transaction.get("amount", {})
+    if isinstance(amt, dict):
+        return amt.get("sent", 0) or 0, amt.get("currency_sent", "USD")
+    return amt or 0, "USD"
+
 def analyze_transaction_with_cna(openai_client, profile: dict, transaction: dict) -> dict:
     """Use LLM to analyze if transaction fits the customer narrative."""
 
     # Extract transaction details
-    amt = transaction.get("amount", {})
-    if isinstance(amt, dict):
-        txn_amount = amt.get("sent", 0)
-        currency = amt.get("currency_sent", "USD")
-    else:
-        txn_amount = amt
-        currency = "USD"
+    txn_amount, currency = transaction_amount(transaction)
 
     receiver = transaction.get("receiver", {})
     to_bank = receiver.get("bank_id", "Unknown") if isinstance(receiver, dict) else "Unknown"
@@ -132,105 +155,363 @@ def analyze_transaction_with_cna(openai_client, profile: dict, transaction: dict
 
     return json.loads(content)
 
+def usual_payment_methods(stats: dict) -> List[str]:
+    """Payment methods the profile was built from (most frequent first)."""
+    if stats.get("top_payment_methods"):
+        return stats["top_payment_methods"]
+    # Profiles generated before top_payment_methods was stored: "ACH (12), Wire (3)"
+    return [p.rsplit(" (", 1)[0] for p in stats.get("payment_methods", "").split(", ") if p]
+
+def score_transaction_locally(profile: dict, transaction: dict) -> dict:
+    """
+    Deterministic narrative check against the profile's behavioral statistics.
+
+    Same output shape as analyze_transaction_with_cna, without an LLM call.
+    """
+    stats = profile.get("_behavioral_stats", {})
+    txn_amount, _ = transaction_amount(transaction)
+    risk_score = 0
+    red_flags = []
+
+    max_amount = stats.get("max_amount", 0)
+    min_amount = stats.get("min_amount", 0)
+    if max_amount and txn_amount > max_amount:
+        # 40 points just above the observed maximum, up to 60 at 10x
+        risk_score += 40 + min(20, 20 * math.log10(txn_amount / max_amount))
+        red_flags.append(f"Amount above observed maximum ({max_amount:,.2f})")
+    elif min_amount and txn_amount < min_amount:
+        risk_score += 15
+        red_flags.append(f"Amount below observed minimum ({min_amount:,.2f})")
+
+    method = transaction.get("payment_format", "Unknown")
+    usual_methods = usual_payment_methods(stats)
+    if usual_methods and method not in usual_methods:
+        risk_score += 30
+        red_flags.append(f"Unusual payment method ({method})")
+
+    risk_score = int(round(min(risk_score, 100)))
+    return {
+        "fits_narrative": risk_score < MEDIUM_RISK_THRESHOLD,
+        "risk_score": risk_score,
+        "reasoning": "; ".join(red_flags) if red_flags else "Amount and payment method match the profile",
+        "red_flags": red_flags,
+        "questions_for_customer": [],
+    }
+
+def payment_format_probabilities(profile: dict) -> Dict[str, float]:
+    """Share of the profiled transactions per payment format."""
+    stats = profile.get("_behavioral_stats", {})
+    if stats.get("payment_format_probs"):
+        return stats["payment_format_probs"]
+    # Older profiles: top-3 counts in "ACH (12), Wire (3)" over the profiled transactions
+    total = profile.get("_based_on_txn_count")
+    if not total:
+        return {}
+    probabilities = {}
+    for part in stats.get("payment_methods", "").split(", "):
+        name, _, count = part.rpartition(" (")
+        if name and count.rstrip(")").isdigit():
+            probabilities[name] = int(count.rstrip(")")) / total
+    return probabilities
+
+def prescreen_transaction(profile: dict, transaction: dict) -> dict:
+    """
+    Cheap deterministic suspicion score from the profile's behavioral statistics.
+
+    Signals (each in [0, 1]):
+    - amount: z-score of the amount against the profiled mean, capped at PRESCREEN_Z_CAP
+    - bank: recipient bank never seen in the profiled transactions
+    - format: 1 - share of the profiled transactions using this payment format
+    Signals a profile has no statistics for count as 0.
+
+    Returns:
+        {"suspicion": weighted sum in [0, 1], "signals": {...}, "amount_z": ...}
+    """
+    stats = profile.get("_behavioral_stats", {})
+    txn_amount, _ = transaction_amount(transaction)
+
+    avg_amount = stats.get("avg_amount", 0)
+    amount_std = stats.get("amount_std")
+    if not amount_std:
+        # Profiles without amount_std: quarter of the observed range, else half the mean
+        spread = stats.get("max_amount", 0) - stats.get("min_amount", 0)
+        amount_std = spread / 4 if spread > 0 else avg_amount * 0.5
+    if amount_std > 0:
+        amount_z = abs(txn_amount - avg_amount) / amount_std
+    else:
+        amount_z = 0.0 if txn_amount == avg_amount else PRESCREEN_Z_CAP
+
+    receiver = transaction.get("receiver", {})
+    to_bank = receiver.get("bank_id") if isinstance(receiver, dict) else None
+    known_banks = stats.get("known_banks")
+
+    probabilities = payment_format_probabilities(profile)
+    method = transaction.get("payment_format", "Unknown")
+
+    signals = {
+        "amount": min(amount_z / PRESCREEN_Z_CAP, 1.0),
+        "bank": float(bool(known_banks) and to_bank not in known_banks),
+        "format": 1.0 - probabilities.get(method, 0.0) if probabilities else 0.0,
+    }
+    return {
+        "suspicion": sum(PRESCREEN_WEIGHTS[k] * v for k, v in signals.items()),
+        "signals": signals,
+        "amount_z": amount_z,
+    }
+
+def make_llm_scorer(openai_client, max_in_flight: int = LLM_IN_FLIGHT) -> Callable[[dict, dict], dict]:
+    """analyze_transaction_with_cna limited to `max_in_flight` concurrent requests."""
+    slots = threading.BoundedSemaphore(max_in_flight)
+
+    def score(profile: dict, transaction: dict) -> dict:
+        with slots:
+            return analyze_transaction_with_cna(openai_client, profile, transaction)
+
+    return score
+
 # ============================================================
 # SIMULATOR
 # ============================================================
 
-def run_simulation(db, openai_client, limit_accounts: int = 10, limit_txns_per_account: int = 20):
-    """Run the CNA simulation on accounts with profiles."""
+OUTCOMES = {
+    (True, True): ("true_positives", "✅ TRUE POSITIVE"),      # Correctly flagged laundering
+    (True, False): ("false_positives", "⚠️  FALSE POSITIVE"),  # Incorrectly flagged clean txn
+    (False, False): ("true_negatives", "✓  True Negative"),    # Correctly passed clean txn
+    (False, True): ("false_negatives", "❌ FALSE NEGATIVE"),   # Missed laundering
+}
+
+class SimulationSummary:
+    """
+    Confusion counts, updated as each account finishes (thread-safe).
+
+    Accounts are reported as whole blocks, so output from concurrent
+    accounts never interleaves.
+    """
+
+    def __init__(self, total_accounts: int, verbose: bool = True, prescreen_log: Optional[str] = None):
+        self.total_accounts = total_accounts
+        self.verbose = verbose
+        self.prescreen_log = prescreen_log
+        self.accounts_done = 0
+        self.errors = 0
+        # Pre-screen outcomes: escalated (sent to the scorer) vs passed, by label
+        self.prescreen = {
+            "escalated_laundering": 0,
+            "escalated_clean": 0,
+            "passed_laundering": 0,
+            "passed_clean": 0,
+        }
+        self.stats = {
+            "total_txns_analyzed": 0,
+            "true_positives": 0,
+            "false_positives": 0,
+            "true_negatives": 0,
+            "false_negatives": 0,
+            "details": []
+        }
+        self._lock = threading.Lock()
+
+    def add_account(self, account: dict, details: List[dict], errors: List[str]):
+        """Fold one account's results into the summary and report them."""
+        with self._lock:
+            for detail in details:
+                self.stats["total_txns_analyzed"] += 1
+                self.stats[OUTCOMES[(detail["flagged"], detail["is_laundering"])][0]] += 1
+                self.stats["details"].append(detail)
+                if detail["prescreen"] is not None:
+                    outcome = "escalated" if detail["escalated"] else "passed"
+                    label = "laundering" if detail["is_laundering"] else "clean"
+                    self.prescreen[f"{outcome}_{label}"] += 1
+            self.errors += len(errors)
+            self._log_prescreen(details)
+            self.accounts_done += 1
+
+            if self.verbose:
+                self._print_account(account, details, errors)
+            elif self.accounts_done % PROGRESS_EVERY == 0 or self.accounts_done == self.total_accounts:
+                s = self.stats
+                print(f"  [{self.accounts_done}/{self.total_accounts} accounts] "
+                      f"{s['total_txns_analyzed']} txns | TP {s['true_positives']} FP {s['false_positives']} "
+                      f"FN {s['false_negatives']} TN {s['true_negatives']} | errors {self.errors}")
+
+    def _log_prescreen(self, details: List[dict]):
+        """Append pre-screen outcomes (one JSON line per transaction)."""
+        if not self.prescreen_log:
+            return
+        with open(self.prescreen_log, "a") as f:
+            for detail in details:
+                if detail["prescreen"] is None:
+                    continue
+                f.write(json.dumps({
+                    "account_id": detail["account_id"],
+                    "txn_id": detail["txn_id"],
+                    "is_laundering": detail["is_laundering"],
+                    "escalated": detail["escalated"],
+                    **detail["prescreen"],
+                }, default=str) + "\n")
+
+    def print_prescreen(self):
+        """Share of transactions escalated, and laundering recall of the pre-screen."""
+        p = self.prescreen
+        screened = sum(p.values())
+        if not screened:
+            return
+        escalated = p["escalated_laundering"] + p["escalated_clean"]
+        laundering = p["escalated_laundering"] + p["passed_laundering"]
+        print(f"\nPre-screen: {escalated}/{screened} transactions escalated "
+              f"({1 - escalated / screened:.1%} of scorer calls saved)")
+        if laundering:
+            print(f"Pre-screen recall (laundering escalated): "
+                  f"{p['escalated_laundering']}/{laundering} ({p['escalated_laundering'] / laundering:.1%})")
+
+    def _print_account(self, account: dict, details: List[dict], errors: List[str]):
+        profile = account["profile"]
+        print(f"\n{'─'*70}")
+        print(f"Account: {account['account_id']}")
+        print(f"Profile: {profile.get('customer_type')} - {profile.get('likely_occupation_or_industry')}")
+        print(f"Narrative: {profile.get('narrative_summary', 'N/A')[:80]}...")
+        print(f"{'─'*70}")
+
+        for detail in details:
+            launder_marker = " [LAUNDER]" if detail["is_laundering"] else ""
+            print(f"\n  ${detail['amount']:>12,.2f}{launder_marker}")
+            print(f"  Risk Score: {detail['risk_score']}/100 | Fits Narrative: {detail['fits_narrative']}")
+            print(f"  {detail['result']}: {(detail['reasoning'] or 'N/A')[:60]}...")
+            if detail["red_flags"]:
+                print(f"  Red Flags: {', '.join(detail['red_flags'][:2])}")
+        for error in errors:
+            print(f"  Error analyzing transaction: {error}")
+
+def simulate_account(account: dict, transactions: List[dict],
+                     score_fn: Callable[[dict, dict], dict], summary: SimulationSummary,
+                     prescreen_threshold: Optional[float] = None):
+    """
+    Replay one account's transactions in chronological order (one worker thread).
+
+    With a pre-screen threshold, transactions whose suspicion is below it
+    pass without calling `score_fn`.
+    """
+    account_id = account["account_id"]
+    profile = account["profile"]
+    details, errors = [], []
+
+    for txn in transactions:
+        is_laundering = txn.get("is_laundering", False)
+
+        screen = prescreen_transaction(profile, txn) if prescreen_threshold is not None else None
+        escalated = screen is None or screen["suspicion"] >= prescreen_threshold
+
+        # Analyze with CNA
+        try:
+            if escalated:
+                analysis = score_fn(profile, txn)
+            else:
+                analysis = {
+                    "fits_narrative": True,
+                    "risk_score": 0,
+                    "reasoning": f"Passed statistical pre-screen (suspicion {screen['suspicion']:.2f})",
+                }
+        except Exception as e:
+            errors.append(str(e))
+            continue
+
+        risk_score = analysis.get("risk_score", 0)
+        fits_narrative = analysis.get("fits_narrative", True)
+
+        # Determine if flagged
+        flagged = risk_score >= MEDIUM_RISK_THRESHOLD or not fits_narrative
+
+        details.append({
+            "account_id": account_id,
+            "txn_id": txn.get("txn_id"),
+            "amount": transaction_amount(txn)[0],
+            "is_laundering": is_laundering,
+            "risk_score": risk_score,
+            "fits_narrative": fits_narrative,
+            "flagged": flagged,
+            "result": OUTCOMES[(flagged, is_laundering)][1],
+            "reasoning": analysis.get("reasoning"),
+            "red_flags": analysis.get("red_flags") or [],
+            "prescreen": screen,
+            "escalated": escalated,
+        })
+
+    summary.add_account(account, details, errors)
+
+def run_simulation(db, openai_client=None, limit_accounts: int = 10, limit_txns_per_account: int = 20,
+                   seed: int = DEFAULT_SEED, workers: int = ACCOUNT_WORKERS,
+                   max_in_flight: int = LLM_IN_FLIGHT, local_only: bool = False,
+                   verbose: bool = True, prescreen_threshold: Optional[float] = PRESCREEN_THRESHOLD,
+                   prescreen_log: Optional[str] = None):
+    """
+    Run the CNA simulation on a seeded sample of accounts with profiles.
+
+    Accounts are replayed concurrently; each account's transactions are
+    still scored one after another in chronological order.
+
+    Args:
+        db: pymongo Database
+        openai_client: OpenAI client (not needed with local_only)
+        limit_accounts: Accounts with laundering to sample
+        limit_txns_per_account: First N transactions replayed per account
+        seed: Sampling seed
+        workers: Accounts replayed at once
+        max_in_flight: Concurrent LLM requests
+        local_only: Score with score_transaction_locally, no LLM calls
+        verbose: Print every transaction (otherwise periodic progress lines)
+        prescreen_threshold: Minimum pre-screen suspicion for a transaction to
+            reach the scorer (None = score every transaction)
+        prescreen_log: JSONL file receiving every pre-screen outcome
+
+    Returns:
+        Confusion counts and per-transaction details
+    """
+    if openai_client is None and not local_only:
+        raise ValueError("openai_client is required unless local_only is set")
 
     print("\n" + "="*70)
     print("CNA DAY-BY-DAY SIMULATOR")
     print("="*70)
 
-    # Get accounts with profiles that have laundering
-    accounts_with_laundering = list(db.accounts.find({
+    # Get accounts with profiles that have laundering (seeded sample)
+    candidates = db.accounts.distinct("account_id", {
         "profile_generated": True,
         "profile._has_laundering": True
-    }).limit(limit_accounts))
+    })
+    sample = stratified_sample(candidates, [], limit_accounts, 0, seed=seed)
+    accounts_with_laundering = list(db.accounts.find({
+        "account_id": {"$in": sample.laundering}
+    }).sort("account_id", 1))
 
     print(f"\nTesting {len(accounts_with_laundering)} accounts with laundering activity")
+    if local_only:
+        print("Scorer: local profile check (no LLM calls)")
+        score_fn = score_transaction_locally
+    else:
+        print(f"Scorer: gpt-4o-mini ({max_in_flight} requests in flight, {workers} accounts at once)")
+        score_fn = make_llm_scorer(openai_client, max_in_flight)
+    if prescreen_threshold is not None:
+        print(f"Pre-screen: scoring transactions with suspicion >= {prescreen_threshold:.2f}")
 
-    # Statistics
-    stats = {
-        "total_txns_analyzed": 0,
-        "true_positives": 0,      # Correctly flagged laundering
-        "false_positives": 0,     # Incorrectly flagged clean txn
-        "true_negatives": 0,      # Correctly passed clean txn
-        "false_negatives": 0,     # Missed laundering
-        "details": []
-    }
-
-    for account in accounts_with_laundering:
-        account_id = account["account_id"]
-        profile = account["profile"]
-
-        print(f"\n{'─'*70}")
-        print(f"Account: {account_id}")
-        print(f"Profile: {profile.get('customer_type')} - {profile.get('likely_occupation_or_industry')}")
-        print(f"Narrative: {profile.get('narrative_summary', 'N/A')[:80]}...")
-        print(f"{'─'*70}")
+    # One bulk fetch for every account's chronological transactions
+    histories = fetch_account_histories(
+        db,
+        [a["account_id"] for a in accounts_with_laundering],
+        limit_per_account=limit_txns_per_account,
+    )
 
-        # Get transactions for this account (chronologically)
-        transactions = list(db.transactions.find({
-            "sender.account_id": account_id
-        }).sort("timestamp", 1).limit(limit_txns_per_account))
-
-        for txn in transactions:
-            is_laundering = txn.get("is_laundering", False)
-
-            # Analyze with CNA
-            try:
-                analysis = analyze_transaction_with_cna(openai_client, profile, txn)
-                risk_score = analysis.get("risk_score", 0)
-                fits_narrative = analysis.get("fits_narrative", True)
-
-                # Determine if flagged
-                flagged = risk_score >= MEDIUM_RISK_THRESHOLD or not fits_narrative
-
-                # Extract amount for display
-                amt = txn.get("amount", {})
-                txn_amount = amt.get("sent", 0) if isinstance(amt, dict) else 0
-
-                # Update statistics
-                stats["total_txns_analyzed"] += 1
-
-                if flagged and is_laundering:
-                    stats["true_positives"] += 1
-                    result = "✅ TRUE POSITIVE"
-                elif flagged and not is_laundering:
-                    stats["false_positives"] += 1
-                    result = "⚠️  FALSE POSITIVE"
-                elif not flagged and not is_laundering:
-                    stats["true_negatives"] += 1
-                    result = "✓  True Negative"
-                else:  # not flagged and is_laundering
-                    stats["false_negatives"] += 1
-                    result = "❌ FALSE NEGATIVE"
-
-                # Print result
-                launder_marker = " [LAUNDER]" if is_laundering else ""
-                print(f"\n  ${txn_amount:>12,.2f}{launder_marker}")
-                print(f"  Risk Score: {risk_score}/100 | Fits Narrative: {fits_narrative}")
-                print(f"  {result}: {analysis.get('reasoning', 'N/A')[:60]}...")
-
-                if analysis.get("red_flags"):
-                    print(f"  Red Flags: {', '.join(analysis['red_flags'][:2])}")
-
-                # Store details for analysis
-                stats["details"].append({
-                    "account_id": account_id,
-                    "amount": txn_amount,
-                    "is_laundering": is_laundering,
-                    "risk_score": risk_score,
-                    "flagged": flagged,
-                    "result": result,
-                    "reasoning": analysis.get("reasoning")
-                })
-
-            except Exception as e:
-                print(f"  Error analyzing transaction: {e}")
-                continue
+    summary = SimulationSummary(len(accounts_with_laundering), verbose=verbose, prescreen_log=prescreen_log)
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="cna") as pool:
+        futures = [
+            pool.submit(
+                simulate_account, account, histories[account["account_id"]],
+                score_fn, summary, prescreen_threshold
+            )
+            for account in accounts_with_laundering
+        ]
+        for future in futures:
+            future.result()
+    stats = summary.stats
 
     # Print summary
     print("\n" + "="*70)
@@ -244,6 +525,8 @@ def run_simulation(db, openai_client, limit_accounts: int = 10, limit_txns_per_a
     fn = stats["false_negatives"]
 
     print(f"\nTransactions Analyzed: {total}")
+    if summary.errors:
+        print(f"Transactions Failed: {summary.errors}")
     print(f"\nConfusion Matrix:")
     print(f"  ┌────────────────┬──────────────┬──────────────┐")
     print(f"  │                │ Actual LAUND │ Actual CLEAN │")
@@ -265,6 +548,9 @@ def run_simulation(db, openai_client, limit_accounts: int = 10, limit_txns_per_a
         f1 = 2 * (precision * recall) / (precision + recall) if (precision + recall) > 0 else 0
         print(f"F1 Score: {f1:.3f}")
 
+    summary.print_prescreen()
+    stats["prescreen"] = dict(summary.prescreen)
+
     print("\n" + "="*70)
 
     return stats
@@ -274,16 +560,82 @@ def run_simulation(db, openai_client, limit_accounts: int = 10, limit_txns_per_a
 # ============================================================
 
 def main():
+    parser = argparse.ArgumentParser(description="CNA day-by-day simulator")
+    parser.add_argument(
+        "--accounts", "-n",
+        type=int,
+        default=5,
+        help="Accounts with laundering to replay (default: 5)"
+    )
+    parser.add_argument(
+        "--txns",
+        type=int,
+        default=15,
+        help="Transactions per account (default: 15)"
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=DEFAULT_SEED,
+        help=f"Sampling seed (default: {DEFAULT_SEED})"
+    )
+    parser.add_argument(
+        "--workers", "-w",
+        type=int,
+        default=ACCOUNT_WORKERS,
+        help=f"Accounts replayed at once (default: {ACCOUNT_WORKERS})"
+    )
+    parser.add_argument(
+        "--max-in-flight",
+        type=int,
+        default=LLM_IN_FLIGHT,
+        help=f"Concurrent LLM requests (default: {LLM_IN_FLIGHT})"
+    )
+    parser.add_argument(
+        "--local",
+        action="store_true",
+        help="Score with the local profile check only (no LLM calls)"
+    )
+    parser.add_argument(
+        "--prescreen-threshold",
+        type=float,
+        default=PRESCREEN_THRESHOLD,
+        help=f"Pre-screen suspicion needed to reach the scorer, 0-1 (default: {PRESCREEN_THRESHOLD})"
+    )
+    parser.add_argument(
+        "--no-prescreen",
+        action="store_true",
+        help="Send every transaction to the scorer"
+    )
+    parser.add_argument(
+        "--prescreen-log",
+        default=None,
+        help="Append every pre-screen outcome to this JSONL file"
+    )
+    parser.add_argument(
+        "--quiet", "-q",
+        action="store_true",
+        help="Print progress lines instead of every transaction"
+    )
+    args = parser.parse_args()
+
     mongo_client = get_mongo_client()
     db = mongo_client[DATABASE_NAME]
-    openai_client = get_openai_client()
+    openai_client = None if args.local else get_openai_client()
 
     # Run simulation
     stats = run_simulation(
         db,
         openai_client,
-        limit_accounts=5,        # Test 5 accounts with laundering
-        limit_txns_per_account=15  # Up to 15 txns each
+        limit_accounts=args.accounts,
+        limit_txns_per_account=args.txns,
+        seed=args.seed,
+        workers=args.workers,
+        max_in_flight=args.max_in_flight,
+        local_only=args.local,
+        verbose=not args.quiet,
+        prescreen_threshold=None if args.no_prescreen else args.prescreen_threshold,
+        prescreen_log=args.prescreen_log,
     )
 
     print("\nSimulation complete!")
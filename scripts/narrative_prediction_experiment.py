@@ -10,15 +10,27 @@ This experiment tests whether prediction error correlates with is_laundering.
 """
 
 import os
+import sys
+import argparse
 import certifi
 import numpy as np
 from datetime import datetime, timedelta
 from collections import defaultdict
 from pymongo import MongoClient
 from dataclasses import dataclass, field
+from pathlib import Path
 from typing import Optional
 import json
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from shared.batch import TransactionBatch
+from shared.evaluation import score_curve, precision_at_k, recall_at_budget
+from shared.models import EvaluationMetrics
+from shared.db import fetch_account_histories
+from shared.experiment import DEFAULT_SEED, DEFAULT_SHARD_SIZE, run_sharded, stratified_sample
+from engines.narrative.prediction import PredictionScores, score_batch, select_accounts
+
 # ============================================================
 # CONFIGURATION
 # ============================================================
@@ -331,7 +343,63 @@ class NarrativePredictor:
 # EXPERIMENT RUNNER
 # ============================================================
 
-def run_experiment(db, max_accounts: int = 200, verbose: bool = True):
+def get_database():
+    """Connect to MongoDB (called once per process: in main and in each shard worker)."""
+    client = MongoClient(
+        MONGODB_URI,
+        serverSelectionTimeoutMS=30000,
+        tlsCAFile=certifi.where()
+    )
+    return client[DATABASE_NAME]
+
+
+_worker_db = None
+
+
+def score_account_shard(account_ids: list) -> PredictionScores:
+    """Shard worker: fetch these accounts' histories and score them."""
+    global _worker_db
+    if _worker_db is None:
+        _worker_db = get_database()
+
+    histories = fetch_account_histories(_worker_db, account_ids)
+    batch = TransactionBatch.from_documents(
+        txn for account_id in account_ids for txn in histories[account_id]
+    )
+    return score_batch(
+        batch,
+        train_ratio=TRAIN_RATIO,
+        min_history=MIN_HISTORY_FOR_NARRATIVE,
+        min_test=MIN_TEST_TRANSACTIONS,
+    )
+
+
+def load_account_population(db) -> tuple[list, list]:
+    """
+    Laundering senders, and clean senders with enough history to score.
+
+    One aggregation over all senders; sampling happens client-side so it
+    is seeded and independent of server result order.
+    """
+    laundering, clean = [], []
+    for group in db.transactions.aggregate([
+        {"$group": {
+            "_id": "$sender.account_id",
+            "count": {"$sum": 1},
+            "launder_count": {"$sum": {"$cond": ["$is_laundering", 1, 0]}},
+        }}
+    ], allowDiskUse=True):
+        if group["launder_count"] > 0:
+            laundering.append(group["_id"])
+        elif group["count"] >= MIN_HISTORY_FOR_NARRATIVE + MIN_TEST_TRANSACTIONS:
+            clean.append(group["_id"])
+    return laundering, clean
+
+
+def run_experiment(db=None, max_accounts: Optional[int] = 200, verbose: bool = True,
+                   parquet_dir: Optional[str] = None, seed: int = DEFAULT_SEED,
+                   workers: Optional[int] = None, shard_size: int = DEFAULT_SHARD_SIZE,
+                   checkpoint_dir: Optional[str] = None):
     """
     Run the prediction experiment on accounts with transaction history.
 
@@ -340,6 +408,22 @@ def run_experiment(db, max_accounts: int = 200, verbose: bool = True):
     2. Build narrative from training transactions
     3. For each test transaction, predict and measure error
     4. Compare error distributions for laundering vs clean
+
+    Accounts are a seeded, stratified sample (half laundering, half clean)
+    scored by engines.narrative.prediction (same model as NarrativeBuilder /
+    NarrativePredictor above). From MongoDB, accounts are sharded over a
+    process pool with per-shard checkpoints; a Parquet dataset is scored in
+    one pass.
+
+    Args:
+        db: MongoDB database (unused when parquet_dir is given)
+        max_accounts: Accounts to score (None = every qualifying account)
+        verbose: Print progress
+        parquet_dir: Parquet staging dataset to read instead of MongoDB
+        seed: Sampling seed
+        workers: Shard worker processes (defaults to the CPU count)
+        shard_size: Accounts per shard
+        checkpoint_dir: Directory for shard checkpoints (resumes a stopped run)
     """
 
     print("\n" + "="*70)
@@ -347,119 +431,81 @@ def run_experiment(db, max_accounts: int = 200, verbose: bool = True):
     print("Hypothesis: Prediction error correlates with laundering")
     print("="*70)
 
-    builder = NarrativeBuilder()
-    predictor = NarrativePredictor()
-
-    # Collect results
-    all_results: list[PredictionResult] = []
-    accounts_processed = 0
-
     # Find accounts with sufficient transaction history
     print("\n[1/3] Finding accounts with sufficient history...")
 
-    # Get accounts with laundering transactions (prioritize these)
-    laundering_accounts = list(db.transactions.aggregate([
-        {"$match": {"is_laundering": True}},
-        {"$group": {"_id": "$sender.account_id", "launder_count": {"$sum": 1}}},
-        {"$match": {"launder_count": {"$gte": 1}}},
-        {"$limit": max_accounts // 2}
-    ]))
-    laundering_account_ids = [a["_id"] for a in laundering_accounts]
-
-    # Get clean accounts (no laundering)
-    clean_accounts = list(db.transactions.aggregate([
-        {"$match": {"sender.account_id": {"$nin": laundering_account_ids}}},
-        {"$group": {"_id": "$sender.account_id", "count": {"$sum": 1}}},
-        {"$match": {"count": {"$gte": MIN_HISTORY_FOR_NARRATIVE + MIN_TEST_TRANSACTIONS}}},
-        {"$limit": max_accounts // 2}
-    ]))
-    clean_account_ids = [a["_id"] for a in clean_accounts]
-
-    all_account_ids = laundering_account_ids + clean_account_ids
-    print(f"    Found {len(laundering_account_ids)} accounts with laundering")
-    print(f"    Found {len(clean_account_ids)} clean accounts")
-
-    # Process each account
-    print(f"\n[2/3] Processing {len(all_account_ids)} accounts...")
-
-    for account_id in all_account_ids:
-        # Get all transactions for this account, sorted by time
-        transactions = list(db.transactions.find({
-            "sender.account_id": account_id
-        }).sort("timestamp", 1))
-
-        if len(transactions) < MIN_HISTORY_FOR_NARRATIVE + MIN_TEST_TRANSACTIONS:
-            continue
-
-        # Split into train/test
-        split_idx = int(len(transactions) * TRAIN_RATIO)
-        train_txns = transactions[:split_idx]
-        test_txns = transactions[split_idx:]
-
-        if len(train_txns) < MIN_HISTORY_FOR_NARRATIVE or len(test_txns) < MIN_TEST_TRANSACTIONS:
-            continue
-
-        # Build narrative from training data
-        narrative = builder.build_narrative(train_txns)
-
-        # Get last training timestamp
-        prev_timestamp = builder.extract_timestamp(train_txns[-1])
-
-        # Test predictions
-        account_results = []
-        for txn in test_txns:
-            prediction = predictor.predict_next(narrative)
-            result = predictor.score_transaction(prediction, narrative, txn, prev_timestamp)
-            result.account_id = account_id
-            account_results.append(result)
-
-            # Update prev_timestamp for next iteration
-            current_ts = builder.extract_timestamp(txn)
-            if current_ts:
-                prev_timestamp = current_ts
-
-            # Update narrative with this transaction (incremental learning)
-            # For simplicity, rebuild with all history up to this point
-            narrative.known_counterparties.add(builder.extract_counterparty(txn))
-            narrative.known_banks.add(builder.extract_bank(txn))
+    per_stratum = max_accounts // 2 if max_accounts else None
+    if parquet_dir:
+        from shared.columnar import read_batch
+
+        batch = read_batch(parquet_dir)
+        accounts = batch.dictionaries.accounts
+        laundering_ids = np.unique(batch.sender_account[batch.is_laundering])
+        candidates = select_accounts(batch, None, MIN_HISTORY_FOR_NARRATIVE + MIN_TEST_TRANSACTIONS)
+        sample = stratified_sample(
+            accounts.decode_many(laundering_ids),
+            accounts.decode_many(candidates),
+            per_stratum, per_stratum, seed=seed,
+        )
+    else:
+        sample = stratified_sample(*load_account_population(db), per_stratum, per_stratum, seed=seed)
 
-        all_results.extend(account_results)
-        accounts_processed += 1
+    print(f"    Found {len(sample.laundering)} accounts with laundering")
+    print(f"    Found {len(sample.clean)} clean accounts")
 
-        if verbose and accounts_processed % 20 == 0:
-            print(f"    Processed {accounts_processed} accounts, {len(all_results)} predictions...")
+    # Process each account
+    print(f"\n[2/3] Processing {len(sample.accounts)} accounts...")
+
+    if parquet_dir:
+        scores = score_batch(
+            batch.filter(batch.rows_for_accounts(sample.accounts)),
+            train_ratio=TRAIN_RATIO,
+            min_history=MIN_HISTORY_FOR_NARRATIVE,
+            min_test=MIN_TEST_TRANSACTIONS,
+        )
+    else:
+        shards = run_sharded(
+            sample.accounts,
+            score_account_shard,
+            checkpoint_dir=checkpoint_dir,
+            shard_size=shard_size,
+            workers=workers,
+            tag=f"narrative_prediction seed={seed} train={TRAIN_RATIO}",
+            verbose=verbose,
+        )
+        scores = PredictionScores.concat(shards) if shards else score_batch(TransactionBatch.empty())
 
-    print(f"\n    Total: {accounts_processed} accounts, {len(all_results)} predictions")
+    print(f"\n    Total: {scores.accounts_scored} accounts, {len(scores)} predictions")
 
     # Analyze results
     print(f"\n[3/3] Analyzing results...")
 
-    return analyze_results(all_results)
+    return analyze_results(scores)
 
 
-def analyze_results(results: list[PredictionResult]) -> dict:
+def analyze_results(results: PredictionScores) -> dict:
     """Analyze prediction results and compute statistics."""
 
-    if not results:
+    if not len(results):
         print("No results to analyze!")
         return {}
 
     # Separate by laundering status
-    laundering_results = [r for r in results if r.is_laundering]
-    clean_results = [r for r in results if not r.is_laundering]
+    laundering = results.is_laundering
+    clean = ~laundering
 
-    print(f"\n    Laundering transactions: {len(laundering_results)}")
-    print(f"    Clean transactions: {len(clean_results)}")
+    print(f"\n    Laundering transactions: {int(laundering.sum())}")
+    print(f"    Clean transactions: {int(clean.sum())}")
 
-    # Compute error statistics
-    launder_errors = [r.total_error for r in laundering_results]
-    clean_errors = [r.total_error for r in clean_results]
+    # Compute error statistics (lists are empty when a class is absent)
+    launder_errors = results.total_error[laundering].tolist()
+    clean_errors = results.total_error[clean].tolist()
 
-    launder_amount_z = [r.amount_z_score for r in laundering_results]
-    clean_amount_z = [r.amount_z_score for r in clean_results]
+    launder_amount_z = results.amount_z_score[laundering].tolist()
+    clean_amount_z = results.amount_z_score[clean].tolist()
 
-    launder_cp_err = [r.counterparty_error for r in laundering_results]
-    clean_cp_err = [r.counterparty_error for r in clean_results]
+    launder_cp_err = results.counterparty_error[laundering].tolist()
+    clean_cp_err = results.counterparty_error[clean].tolist()
 
     print("\n" + "="*70)
     print("RESULTS: ERROR DISTRIBUTION BY TRANSACTION TYPE")
@@ -524,9 +570,6 @@ def analyze_results(results: list[PredictionResult]) -> dict:
     print("="*70)
 
     if launder_errors and clean_errors:
-        all_errors = [(r.total_error, r.is_laundering) for r in results]
-        all_errors.sort(key=lambda x: x[0], reverse=True)  # Highest error first
-
         # Try different thresholds
         thresholds = [0.5, 1.0, 1.5, 2.0, 2.5, 3.0]
 
@@ -537,26 +580,32 @@ def analyze_results(results: list[PredictionResult]) -> dict:
         best_f1 = 0
         best_threshold = 0
 
-        for threshold in thresholds:
-            # Transactions with error > threshold are "flagged"
-            flagged = [r for r in results if r.total_error > threshold]
-            tp = sum(1 for r in flagged if r.is_laundering)
-            fp = sum(1 for r in flagged if not r.is_laundering)
-            fn = sum(1 for r in results if r.is_laundering and r.total_error <= threshold)
-
-            precision = tp / (tp + fp) if (tp + fp) > 0 else 0
-            recall = tp / (tp + fn) if (tp + fn) > 0 else 0
-            f1 = 2 * precision * recall / (precision + recall) if (precision + recall) > 0 else 0
+        # Transactions with error > threshold are "flagged" (one sort for all thresholds)
+        sweep = EvaluationMetrics.sweep(results.total_error, laundering, thresholds)
+        for threshold, metrics in zip(thresholds, sweep):
+            precision, recall, f1 = metrics.precision, metrics.recall, metrics.f1_score
 
             if f1 > best_f1:
                 best_f1 = f1
                 best_threshold = threshold
 
-            print(f"│   {threshold:>5.1f}   │   {precision:>5.1%}   │   {recall:>5.1%}   │   {f1:>5.3f}   │   {len(flagged):>5}   │")
+            flagged = metrics.true_positives + metrics.false_positives
+            print(f"│   {threshold:>5.1f}   │   {precision:>5.1%}   │   {recall:>5.1%}   │   {f1:>5.3f}   │   {flagged:>5}   │")
 
         print("└───────────┴───────────┴───────────┴───────────┴───────────┘")
         print(f"\n    Best F1: {best_f1:.3f} at threshold {best_threshold}")
 
+        # Threshold-free view over every distinct error value
+        curve = score_curve(results.total_error, laundering)
+        roc_auc = curve.roc_auc()
+        average_precision = curve.average_precision()
+        print(f"    ROC AUC: {roc_auc:.3f}   Average precision: {average_precision:.3f} "
+              f"(base rate {laundering.mean():.3%})")
+        for k in (100, 1000):
+            print(f"    Precision@{k}: {precision_at_k(results.total_error, laundering, k):.1%}")
+        for budget in (0.01, 0.05):
+            print(f"    Recall reviewing top {budget:.0%}: {recall_at_budget(results.total_error, laundering, budget):.1%}")
+
     # Component analysis: which error component is most predictive?
     print("\n" + "="*70)
     print("COMPONENT ANALYSIS")
@@ -564,16 +613,16 @@ def analyze_results(results: list[PredictionResult]) -> dict:
 
     print("\nWhich error component best separates laundering from clean?")
 
-    if laundering_results and clean_results:
+    if launder_errors and clean_errors:
         components = [
             ("Amount Z-score", launder_amount_z, clean_amount_z),
             ("Counterparty Error", launder_cp_err, clean_cp_err),
             ("Interval Z-score",
-             [r.interval_z_score for r in laundering_results],
-             [r.interval_z_score for r in clean_results]),
+             results.interval_z_score[laundering].tolist(),
+             results.interval_z_score[clean].tolist()),
             ("Format Error",
-             [r.format_error for r in laundering_results],
-             [r.format_error for r in clean_results])
+             results.format_error[laundering].tolist(),
+             results.format_error[clean].tolist())
         ]
 
         print("\n┌─────────────────────┬────────────┬───────────────┐")
@@ -592,21 +641,23 @@ def analyze_results(results: list[PredictionResult]) -> dict:
     # Return summary
     return {
         "total_predictions": len(results),
-        "laundering_count": len(laundering_results),
-        "clean_count": len(clean_results),
+        "laundering_count": len(launder_errors),
+        "clean_count": len(clean_errors),
         "laundering_error_mean": np.mean(launder_errors) if launder_errors else 0,
         "clean_error_mean": np.mean(clean_errors) if clean_errors else 0,
         "best_f1": best_f1 if launder_errors and clean_errors else 0,
         "best_threshold": best_threshold if launder_errors and clean_errors else 0,
+        "roc_auc": roc_auc if launder_errors and clean_errors else float("nan"),
+        "average_precision": average_precision if launder_errors and clean_errors else float("nan"),
         "all_results": results
     }
 
 
-def visualize_distribution(results: list[PredictionResult]):
+def visualize_distribution(results: PredictionScores):
     """Create ASCII histogram of error distributions."""
 
-    laundering_errors = [r.total_error for r in results if r.is_laundering]
-    clean_errors = [r.total_error for r in results if not r.is_laundering]
+    laundering_errors = results.total_error[results.is_laundering].tolist()
+    clean_errors = results.total_error[~results.is_laundering].tolist()
 
     if not laundering_errors or not clean_errors:
         return
@@ -649,19 +700,62 @@ def visualize_distribution(results: list[PredictionResult]):
 # ============================================================
 
 def main():
-    print("Connecting to MongoDB...")
-    client = MongoClient(
-        MONGODB_URI,
-        serverSelectionTimeoutMS=30000,
-        tlsCAFile=certifi.where()
+    parser = argparse.ArgumentParser(description="Narrative prediction experiment")
+    parser.add_argument(
+        "--max-accounts", "-n",
+        type=int,
+        default=200,
+        help="Accounts to sample, half laundering and half clean (0 = all; default: 200)"
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=DEFAULT_SEED,
+        help=f"Sampling seed (default: {DEFAULT_SEED})"
     )
-    db = client[DATABASE_NAME]
+    parser.add_argument(
+        "--workers", "-w",
+        type=int,
+        default=None,
+        help="Shard worker processes (default: CPU count)"
+    )
+    parser.add_argument(
+        "--shard-size",
+        type=int,
+        default=DEFAULT_SHARD_SIZE,
+        help=f"Accounts per shard (default: {DEFAULT_SHARD_SIZE})"
+    )
+    parser.add_argument(
+        "--checkpoint-dir",
+        default=None,
+        help="Save each finished shard here and resume from it on the next run"
+    )
+    parser.add_argument(
+        "--parquet-dir",
+        default=None,
+        help="Read transactions from a Parquet staging dataset instead of MongoDB"
+    )
+    args = parser.parse_args()
+
+    db = None
+    if not args.parquet_dir:
+        print("Connecting to MongoDB...")
+        db = get_database()
 
     # Run experiment
-    results = run_experiment(db, max_accounts=200, verbose=True)
+    results = run_experiment(
+        db,
+        max_accounts=args.max_accounts or None,
+        verbose=True,
+        parquet_dir=args.parquet_dir,
+        seed=args.seed,
+        workers=args.workers,
+        shard_size=args.shard_size,
+        checkpoint_dir=args.checkpoint_dir,
+    )
 
     # Visualize if we have results
-    if results.get("all_results"):
+    if results.get("all_results") is not None:
         visualize_distribution(results["all_results"])
 
     print("\n" + "="*70)
@@ -9,12 +9,27 @@ LAUNDERING transactions naturally break the narrative.
 """
 
 import os
+import sys
 import json
+import math
+import time
+import hashlib
+import threading
+import argparse
 import certifi
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 from datetime import datetime
-from pymongo import MongoClient
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+from pymongo import MongoClient, ReturnDocument
+from pymongo.operations import UpdateOne
 from openai import OpenAI
-import random
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from shared.config import COLLECTIONS
+from shared.db import fetch_account_histories, count_account_transactions, history_chunks
+from shared.experiment import DEFAULT_SEED, stratified_sample
 
 # ============================================================
 # CONFIGURATION
@@ -28,6 +43,18 @@ OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY")
 CLEAN_ACCOUNTS_SAMPLE = 50
 LAUNDERING_ACCOUNTS_SAMPLE = 50
 
+# Profiling throughput
+PROFILE_WORKERS = 16          # Concurrent gpt-4o-mini requests
+PROFILE_WRITE_BATCH = 100     # Profiles per bulk_write
+MIN_CLEAN_TRANSACTIONS = 5    # Fewer clean transactions -> no profile
+PROFILE_CHECKPOINT = "profile_generator_checkpoint.jsonl"
+
+# Behavioral fingerprint bands (accounts in the same bands share a template profile)
+AMOUNT_BANDS_PER_DECADE = 2        # avg amount: 1-3.2K, 3.2-10K, ...
+FREQUENCY_BANDS_PER_DOUBLING = 1   # txns/month: 1-2, 2-4, 4-8, ...
+COUNTERPARTY_BANDS_PER_DOUBLING = 1
+DOMESTIC_BAND_WIDTH = 25           # percent
+
 # ============================================================
 # PROFILE GENERATION PROMPT
 # ============================================================
@@ -143,12 +170,32 @@ def analyze_transactions(transactions: list) -> dict:
                 domestic_count += 1
     domestic_pct = (domestic_count / len(transactions) * 100) if transactions else 0
 
+    # Dominant currency (profile amounts are written in it)
+    currencies = {}
+    for t in transactions:
+        amt = t.get("amount", {})
+        currency = amt.get("currency_sent", "USD") if isinstance(amt, dict) else "USD"
+        currencies[currency] = currencies.get(currency, 0) + 1
+
+    # Receiving banks and payment format mix (for the CNA pre-screen)
+    known_banks = sorted({
+        t["receiver"]["bank_id"] for t in transactions
+        if isinstance(t.get("receiver"), dict) and t["receiver"].get("bank_id")
+    })
+    avg_amount = sum(amounts) / len(amounts) if amounts else 0
+    amount_std = math.sqrt(sum((a - avg_amount) ** 2 for a in amounts) / len(amounts)) if amounts else 0
+
     return {
-        "avg_amount": sum(amounts) / len(amounts) if amounts else 0,
+        "avg_amount": avg_amount,
+        "amount_std": amount_std,
+        "currency": max(currencies, key=currencies.get),
         "min_amount": min(amounts) if amounts else 0,
         "max_amount": max(amounts) if amounts else 0,
         "frequency": round(frequency, 1),
         "payment_methods": ", ".join([f"{k} ({v})" for k, v in list(payment_methods.items())[:3]]),
+        "top_payment_methods": list(payment_methods)[:2],
+        "payment_format_probs": {k: v / len(transactions) for k, v in payment_methods.items()},
+        "known_banks": known_banks,
         "domestic_pct": round(domestic_pct, 1),
         "unique_counterparties": len(counterparties),
         "time_pattern": "business hours" if len(transactions) > 5 else "insufficient data"
@@ -206,106 +253,348 @@ def generate_profile(openai_client, transactions: list, stats: dict) -> dict:
 
     return json.loads(content)
 
+# ============================================================
+# PROFILE TEMPLATES
+# ============================================================
+
+def _log_band(value: float, bands_per_step: int, base: float) -> int:
+    """Logarithmic band index of a non-negative value (0 for values below 1)."""
+    return int(math.floor(math.log(value, base) * bands_per_step)) + 1 if value >= 1 else 0
+
+def behavioral_fingerprint(stats: dict) -> dict:
+    """
+    Quantize behavioral statistics into bands.
+
+    Accounts with the same fingerprint behave alike closely enough to share
+    one LLM-generated profile. The currency is part of the key because the
+    profile's amount ranges are written in it.
+    """
+    return {
+        "currency": stats["currency"],
+        "amount_band": _log_band(stats["avg_amount"], AMOUNT_BANDS_PER_DECADE, 10),
+        "frequency_band": _log_band(stats["frequency"], FREQUENCY_BANDS_PER_DOUBLING, 2),
+        "payment_methods": sorted(stats["top_payment_methods"]),
+        "domestic_band": int(stats["domestic_pct"] // DOMESTIC_BAND_WIDTH),
+        "counterparty_band": _log_band(stats["unique_counterparties"], COUNTERPARTY_BANDS_PER_DOUBLING, 2),
+    }
+
+def fingerprint_key(fingerprint: dict) -> str:
+    """Stable ID of a fingerprint."""
+    return hashlib.sha256(json.dumps(fingerprint, sort_keys=True).encode()).hexdigest()[:24]
+
+class ProfileTemplateCache:
+    """
+    Template profiles keyed by behavioral fingerprint, persisted in MongoDB.
+
+    Only the first account with a novel fingerprint pays for an LLM call;
+    later accounts (in this run or any other) reuse its profile. Workers
+    that hit the same novel fingerprint at once wait for a single call.
+    """
+
+    def __init__(self, collection):
+        self.collection = collection
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._pending: Dict[str, threading.Event] = {}
+        self._templates: Dict[str, dict] = {
+            doc["_id"]: doc["profile"] for doc in collection.find({}, {"profile": 1})
+        }
+
+    def __len__(self) -> int:
+        return len(self._templates)
+
+    def get_or_create(self, fingerprint: dict, create, source_account: str) -> Tuple[str, dict]:
+        """
+        Template profile for a fingerprint, calling `create()` if there is none.
+
+        Args:
+            fingerprint: Output of behavioral_fingerprint
+            create: Generates a profile (one LLM call)
+            source_account: Account the template is generated from
+
+        Returns:
+            (template ID, copy of the template profile)
+        """
+        key = fingerprint_key(fingerprint)
+        while True:
+            with self._lock:
+                if key in self._templates:
+                    self.hits += 1
+                    return key, dict(self._templates[key])
+                event = self._pending.get(key)
+                if event is None:
+                    event = self._pending[key] = threading.Event()
+                    break
+            # Another worker is generating this template; retry if it fails
+            event.wait()
+
+        try:
+            # Another process may have stored one meanwhile; the first stored wins
+            profile = self.collection.find_one_and_update(
+                {"_id": key},
+                {"$setOnInsert": {
+                    "fingerprint": fingerprint,
+                    "profile": create(),
+                    "source_account": source_account,
+                    "created_at": datetime.utcnow(),
+                }},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )["profile"]
+            with self._lock:
+                self._templates.setdefault(key, profile)
+                self.misses += 1
+            return key, dict(profile)
+        finally:
+            with self._lock:
+                self._pending.pop(key, None)
+            event.set()
+
 # ============================================================
 # MAIN WORKFLOW
 # ============================================================
 
-def select_golden_sample(db) -> dict:
-    """Select accounts for the Golden Sample: 50 clean, 50 with laundering."""
+def select_golden_sample(db, seed: int = DEFAULT_SEED,
+                         n_clean: int = CLEAN_ACCOUNTS_SAMPLE,
+                         n_laundering: int = LAUNDERING_ACCOUNTS_SAMPLE) -> dict:
+    """Select accounts for the Golden Sample: 50 clean, 50 with laundering by default (seeded)."""
     print("\n[1/4] Selecting Golden Sample accounts...")
 
-    # Find accounts that have laundering transactions (using nested sender.account_id)
-    laundering_accounts = list(db.transactions.aggregate([
-        {"$match": {"is_laundering": True}},
-        {"$group": {"_id": "$sender.account_id"}},
-        {"$limit": LAUNDERING_ACCOUNTS_SAMPLE * 2}  # Get extra in case some have too few txns
-    ]))
-    laundering_account_ids = [a["_id"] for a in laundering_accounts]
+    # One pass over senders (using nested sender.account_id): laundering
+    # accounts, and accounts with NO laundering and at least 10 transactions
+    laundering_account_ids, clean_account_ids = [], []
+    for group in db.transactions.aggregate([
+        {"$group": {
+            "_id": "$sender.account_id",
+            "count": {"$sum": 1},
+            "launder_count": {"$sum": {"$cond": ["$is_laundering", 1, 0]}},
+        }}
+    ], allowDiskUse=True):
+        if group["launder_count"] > 0:
+            laundering_account_ids.append(group["_id"])
+        elif group["count"] >= 10:
+            clean_account_ids.append(group["_id"])
     print(f"    Found {len(laundering_account_ids)} accounts with laundering transactions")
-
-    # Find accounts with NO laundering transactions (only clean activity)
-    clean_accounts = list(db.transactions.aggregate([
-        {"$match": {"is_laundering": False, "sender.account_id": {"$nin": laundering_account_ids}}},
-        {"$group": {"_id": "$sender.account_id", "count": {"$sum": 1}}},
-        {"$match": {"count": {"$gte": 10}}},  # At least 10 transactions
-        {"$limit": CLEAN_ACCOUNTS_SAMPLE * 2}
-    ]))
-    clean_account_ids = [a["_id"] for a in clean_accounts]
     print(f"    Found {len(clean_account_ids)} clean accounts with 10+ transactions")
 
-    # Sample
-    selected_clean = random.sample(clean_account_ids, min(CLEAN_ACCOUNTS_SAMPLE, len(clean_account_ids)))
-    selected_laundering = random.sample(laundering_account_ids, min(LAUNDERING_ACCOUNTS_SAMPLE, len(laundering_account_ids)))
+    # Sample (same seed and data -> same accounts)
+    sample = stratified_sample(
+        laundering_account_ids, clean_account_ids,
+        n_laundering, n_clean, seed=seed
+    )
 
-    print(f"    Selected {len(selected_clean)} clean accounts for sample")
-    print(f"    Selected {len(selected_laundering)} accounts with laundering for sample")
+    print(f"    Selected {len(sample.clean)} clean accounts for sample")
+    print(f"    Selected {len(sample.laundering)} accounts with laundering for sample")
 
     return {
-        "clean": selected_clean,
-        "laundering": selected_laundering
+        "clean": sample.clean,
+        "laundering": sample.laundering
     }
 
-def generate_profiles_for_sample(db, openai_client, sample: dict):
-    """Generate profiles for all accounts in the sample."""
+def load_checkpoint(path: Optional[str]) -> Dict[str, str]:
+    """account_id -> last recorded status ("generated", "skipped" or "error")."""
+    statuses: Dict[str, str] = {}
+    if not path or not Path(path).exists():
+        return statuses
+    with open(path) as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # Last line of an interrupted run
+            statuses[entry["account_id"]] = entry["status"]
+    return statuses
+
+def pending_accounts(db, accounts: List[str], checkpoint: Dict[str, str]) -> List[str]:
+    """Accounts still to profile: no stored profile and not skipped before."""
+    done = set()
+    for chunk in history_chunks(accounts):
+        done.update(
+            a["account_id"] for a in db.accounts.find(
+                {"account_id": {"$in": chunk}, "profile_generated": True}, {"account_id": 1}
+            )
+        )
+    return [a for a in accounts if a not in done and checkpoint.get(a) != "skipped"]
+
+def iter_profile_jobs(db, accounts: List[str]) -> Iterator[Tuple[str, list, int]]:
+    """(account_id, first 50 clean transactions, laundering count), fetched per chunk."""
+    for chunk in history_chunks(accounts):
+        clean_histories = fetch_account_histories(
+            db, chunk, extra_filter={"is_laundering": False}, limit_per_account=50
+        )
+        laundering_counts = count_account_transactions(
+            db, chunk, extra_filter={"is_laundering": True}
+        )
+        for account_id in chunk:
+            yield account_id, clean_histories[account_id], laundering_counts[account_id]
+
+def build_profile(openai_client, account_id: str, clean_txns: list, has_laundering: bool,
+                  laundering_count: int, templates: Optional[ProfileTemplateCache] = None) -> dict:
+    """Analyze one account and generate or reuse its profile (runs in a worker thread)."""
+    stats = analyze_transactions(clean_txns)
+    if templates is None:
+        profile = generate_profile(openai_client, clean_txns, stats)
+    else:
+        fingerprint = behavioral_fingerprint(stats)
+        template_id, profile = templates.get_or_create(
+            fingerprint, lambda: generate_profile(openai_client, clean_txns, stats), account_id
+        )
+        profile["_template_id"] = template_id
+        profile["_fingerprint"] = fingerprint
+
+    # Add metadata
+    profile["_generated_at"] = datetime.utcnow().isoformat()
+    profile["_based_on_txn_count"] = len(clean_txns)
+    profile["_behavioral_stats"] = stats
+    profile["_has_laundering"] = has_laundering
+    profile["_laundering_txn_count"] = laundering_count
+    return profile
+
+class ProfileWriter:
+    """
+    Buffers profiles and stores them with one bulk_write per batch.
+
+    Each account's outcome is appended to the checkpoint file only after its
+    batch is written, so the checkpoint never claims a profile that is not
+    in MongoDB. A failed write keeps the batch queued for the next flush.
+    """
+
+    def __init__(self, db, checkpoint_path: Optional[str] = None, batch_size: int = PROFILE_WRITE_BATCH):
+        self.db = db
+        self.checkpoint_path = checkpoint_path
+        self.batch_size = batch_size
+        self.written = 0
+        self._operations: List[UpdateOne] = []
+        self._entries: List[dict] = []
+        self._end_partial_line()
+
+    def _end_partial_line(self):
+        """Terminate a line cut off by an interrupted run, so appends start on a new one."""
+        if not self.checkpoint_path or not Path(self.checkpoint_path).exists():
+            return
+        with open(self.checkpoint_path, "rb+") as f:
+            if f.seek(0, os.SEEK_END) == 0:
+                return
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":
+                f.write(b"\n")
+
+    def add(self, account_id: str, profile: dict):
+        """Queue a generated profile."""
+        self._operations.append(UpdateOne(
+            {"account_id": account_id},
+            {"$set": {"profile": profile, "profile_generated": True}},
+            upsert=True
+        ))
+        self._entries.append({"account_id": account_id, "status": "generated"})
+        if len(self._operations) >= self.batch_size:
+            self.flush()
+
+    def record(self, account_id: str, status: str):
+        """Checkpoint an account that produced no profile ("skipped" or "error")."""
+        self._entries.append({"account_id": account_id, "status": status})
+
+    def flush(self):
+        """Write queued profiles, then checkpoint their accounts."""
+        if self._operations:
+            self.db.accounts.bulk_write(self._operations, ordered=False)
+            self.written += len(self._operations)
+            self._operations = []
+        if self._entries and self.checkpoint_path:
+            at = datetime.utcnow().isoformat()
+            with open(self.checkpoint_path, "a") as f:
+                for entry in self._entries:
+                    f.write(json.dumps({**entry, "at": at}) + "\n")
+        self._entries = []
+
+def generate_profiles_for_sample(db, openai_client, sample: dict,
+                                 workers: int = PROFILE_WORKERS,
+                                 checkpoint_path: Optional[str] = None,
+                                 use_templates: bool = True) -> int:
+    """
+    Generate profiles for all accounts in the sample.
+
+    Accounts that already have a profile (or were skipped in a checkpointed
+    run) are not sent to the LLM again, so an interrupted run can simply be
+    restarted. Up to `workers` LLM requests run at once; histories are
+    fetched chunk by chunk while they do. With templates, accounts whose
+    behavioral fingerprint has been profiled before reuse that profile
+    instead of calling the LLM.
+
+    Args:
+        db: pymongo Database
+        openai_client: OpenAI client (shared by the worker threads)
+        sample: {"clean": [...], "laundering": [...]} account IDs
+        workers: Concurrent LLM requests
+        checkpoint_path: JSONL file recording each account's outcome
+        use_templates: Reuse profiles of accounts with the same fingerprint
+
+    Returns:
+        Number of profiles generated in this run
+    """
     print("\n[2/4] Generating profiles from clean transaction behavior...")
 
     all_accounts = sample["clean"] + sample["laundering"]
-    profiles_generated = 0
-
-    for i, account_id in enumerate(all_accounts):
-        print(f"\n    Processing account {i+1}/{len(all_accounts)}: {account_id}")
-
-        # Get ONLY clean transactions for this account (using nested sender.account_id)
-        clean_txns = list(db.transactions.find({
-            "sender.account_id": account_id,
-            "is_laundering": False
-        }).sort("timestamp", 1).limit(50))  # First 50 clean transactions
-
-        if len(clean_txns) < 5:
-            print(f"      Skipping - only {len(clean_txns)} clean transactions")
-            continue
-
-        # Analyze behavior
-        stats = analyze_transactions(clean_txns)
-
-        # Generate profile
-        try:
-            profile = generate_profile(openai_client, clean_txns, stats)
-
-            # Add metadata
-            profile["_generated_at"] = datetime.utcnow().isoformat()
-            profile["_based_on_txn_count"] = len(clean_txns)
-            profile["_behavioral_stats"] = stats
-            profile["_has_laundering"] = account_id in sample["laundering"]
-
-            # Count laundering transactions for this account
-            launder_count = db.transactions.count_documents({
-                "sender.account_id": account_id,
-                "is_laundering": True
-            })
-            profile["_laundering_txn_count"] = launder_count
-
-            # Store in MongoDB
-            db.accounts.update_one(
-                {"account_id": account_id},
-                {
-                    "$set": {
-                        "profile": profile,
-                        "profile_generated": True
-                    }
-                },
-                upsert=True
+    laundering_accounts = set(sample["laundering"])
+    accounts = pending_accounts(db, all_accounts, load_checkpoint(checkpoint_path))
+    print(f"    {len(all_accounts) - len(accounts)} accounts already done, "
+          f"{len(accounts)} to process with {workers} workers")
+
+    templates = ProfileTemplateCache(db[COLLECTIONS["profile_templates"]]) if use_templates else None
+    if templates is not None:
+        print(f"    {len(templates)} profile templates cached")
+
+    writer = ProfileWriter(db, checkpoint_path)
+    in_flight = {}
+    processed = 0
+    started = time.time()
+
+    def collect(futures):
+        nonlocal processed
+        for future in futures:
+            account_id = in_flight.pop(future)
+            processed += 1
+            try:
+                profile = future.result()
+            except Exception as e:
+                print(f"    [{processed}/{len(accounts)}] {account_id}: Error generating profile: {e}")
+                writer.record(account_id, "error")
+                continue
+            writer.add(account_id, profile)
+            print(f"    [{processed}/{len(accounts)}] {account_id}: "
+                  f"{profile.get('customer_type')} - {profile.get('likely_occupation_or_industry')}")
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="profile") as pool:
+        for account_id, clean_txns, laundering_count in iter_profile_jobs(db, accounts):
+            if len(clean_txns) < MIN_CLEAN_TRANSACTIONS:
+                processed += 1
+                print(f"    [{processed}/{len(accounts)}] {account_id}: "
+                      f"Skipping - only {len(clean_txns)} clean transactions")
+                writer.record(account_id, "skipped")
+                continue
+
+            future = pool.submit(
+                build_profile, openai_client, account_id, clean_txns,
+                account_id in laundering_accounts, laundering_count, templates
             )
+            in_flight[future] = account_id
 
-            profiles_generated += 1
-            print(f"      Generated: {profile['customer_type']} - {profile['likely_occupation_or_industry']}")
-            print(f"      Narrative: {profile['narrative_summary'][:100]}...")
+            # Keep a small backlog queued behind the running requests
+            if len(in_flight) >= 2 * workers:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                collect(done)
 
-        except Exception as e:
-            print(f"      Error generating profile: {e}")
-            continue
+        while in_flight:
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            collect(done)
 
-    return profiles_generated
+    writer.flush()
+    elapsed = time.time() - started
+    print(f"    Generated {writer.written} profiles in {elapsed:.1f}s")
+    if templates is not None:
+        print(f"    LLM calls: {templates.misses}, template reuses: {templates.hits}")
+    return writer.written
 
 def verify_profiles(db):
     """Verify generated profiles and show sample."""
@@ -354,6 +643,43 @@ def print_summary(db, profiles_generated: int):
 # ============================================================
 
 def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic customer profiles")
+    parser.add_argument(
+        "--clean",
+        type=int,
+        default=CLEAN_ACCOUNTS_SAMPLE,
+        help=f"Clean accounts to sample (default: {CLEAN_ACCOUNTS_SAMPLE})"
+    )
+    parser.add_argument(
+        "--laundering",
+        type=int,
+        default=LAUNDERING_ACCOUNTS_SAMPLE,
+        help=f"Accounts with laundering to sample (default: {LAUNDERING_ACCOUNTS_SAMPLE})"
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=DEFAULT_SEED,
+        help=f"Sampling seed (default: {DEFAULT_SEED})"
+    )
+    parser.add_argument(
+        "--workers", "-w",
+        type=int,
+        default=PROFILE_WORKERS,
+        help=f"Concurrent LLM requests (default: {PROFILE_WORKERS})"
+    )
+    parser.add_argument(
+        "--checkpoint",
+        default=PROFILE_CHECKPOINT,
+        help=f"Progress file for resuming (default: {PROFILE_CHECKPOINT})"
+    )
+    parser.add_argument(
+        "--no-templates",
+        action="store_true",
+        help="Call the LLM for every account instead of reusing fingerprint templates"
+    )
+    args = parser.parse_args()
+
     print("="*60)
     print("PROFILE REVERSE-ENGINEERING GENERATOR")
     print("'Sherlock Holmes' Script for CNA Testing")
@@ -367,10 +693,13 @@ def main():
     print(f"\nConnected to MongoDB: {DATABASE_NAME}")
 
     # Step 1: Select Golden Sample
-    sample = select_golden_sample(db)
+    sample = select_golden_sample(db, args.seed, n_clean=args.clean, n_laundering=args.laundering)
 
     # Step 2: Generate profiles
-    profiles_generated = generate_profiles_for_sample(db, openai_client, sample)
+    profiles_generated = generate_profiles_for_sample(
+        db, openai_client, sample, workers=args.workers, checkpoint_path=args.checkpoint,
+        use_templates=not args.no_templates
+    )
 
     # Step 3: Verify
     verify_profiles(db)
@@ -6,11 +6,17 @@ Extracts text from PDFs, chunks, embeds with OpenAI, uploads to MongoDB Atlas.
 
 import os
 import re
+import sys
+import queue
 import hashlib
 import logging
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, Future
+from functools import lru_cache
 from pathlib import Path
 from datetime import datetime
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Iterable, Iterator, Tuple, Callable
 import certifi
 
 # --- Configuration ---
@@ -30,6 +36,14 @@ EMBEDDING_MODEL = "text-embedding-3-small"
 EMBEDDING_DIMENSIONS = 1536
 BATCH_SIZE = 100  # embeddings per batch
 
+# Pipeline settings
+EXTRACT_WORKERS = os.cpu_count() or 4  # processes for extract/clean/chunk
+EMBED_IN_FLIGHT = 4  # concurrent embedding requests
+WRITE_QUEUE_DOCS = 8  # documents buffered for the bulk writer
+
+# Near-duplicate collapsing (estimated Jaccard of 5-word shingles)
+NEAR_DUPLICATE_THRESHOLD = 0.9
+
 # Logging
 logging.basicConfig(
     level=logging.INFO,
@@ -41,19 +55,19 @@ logger = logging.getLogger(__name__)
 def install_dependencies():
     """Install required packages if missing."""
     import subprocess
-    import sys
 
+    # (pip package, import name)
     packages = [
-        'pymupdf',  # PDF text extraction (fitz)
-        'openai',
-        'pymongo',
-        'tiktoken',  # Token counting
-        'python-docx',  # DOCX support
+        ('pymupdf', 'fitz'),  # PDF text extraction
+        ('openai', 'openai'),
+        ('pymongo', 'pymongo'),
+        ('tiktoken', 'tiktoken'),  # Token counting
+        ('python-docx', 'docx'),  # DOCX support
     ]
 
-    for package in packages:
+    for package, module in packages:
         try:
-            __import__(package.replace('-', '_').split('[')[0])
+            __import__(module)
         except ImportError:
             logger.info(f"Installing {package}...")
             subprocess.check_call([sys.executable, '-m', 'pip', 'install', '-q', package])
@@ -68,6 +82,11 @@ from openai import OpenAI
 from pymongo import MongoClient
 from pymongo.operations import UpdateOne
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from shared.dedup import near_duplicate_groups
+from shared.embedding_cache import get_embedding_cache
+
 try:
     from docx import Document as DocxDocument
     HAS_DOCX = True
@@ -184,19 +203,47 @@ def clean_text(text: str) -> str:
     return text.strip()
 
 
+def sha256_text(text: str) -> str:
+    """Content hash of a chunk's text."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def file_sha256(path: Path) -> str:
+    """Content hash of a file's bytes."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+@lru_cache(maxsize=None)
+def get_encoding(encoding_name: str = "cl100k_base") -> "tiktoken.Encoding":
+    """Get a tiktoken encoding, loaded once per process."""
+    return tiktoken.get_encoding(encoding_name)
+
+
 def count_tokens(text: str, encoding_name: str = "cl100k_base") -> int:
     """Count tokens in text."""
-    encoding = tiktoken.get_encoding(encoding_name)
-    return len(encoding.encode(text))
+    return len(get_encoding(encoding_name).encode(text))
 
 
-def chunk_text(text: str, chunk_size: int = CHUNK_SIZE, overlap: int = CHUNK_OVERLAP) -> List[Dict[str, Any]]:
+def chunk_text(text: str, chunk_size: int = CHUNK_SIZE, overlap: int = CHUNK_OVERLAP,
+               tokens: Optional[List[int]] = None) -> List[Dict[str, Any]]:
     """
     Split text into overlapping chunks.
-    Returns list of {text, start_char, end_char, token_count}
+    Returns list of {text, start_char, end_char, token_count, content_hash}
+
+    The text is encoded once (pass `tokens` to reuse an existing encoding)
+    and character offsets come from a single decode_with_offsets pass, so
+    chunking is linear in document length.
     """
-    encoding = tiktoken.get_encoding("cl100k_base")
-    tokens = encoding.encode(text)
+    encoding = get_encoding()
+    if tokens is None:
+        tokens = encoding.encode(text)
+
+    # Character offset of every token in the decoded text
+    _, token_offsets = encoding.decode_with_offsets(tokens)
 
     chunks = []
     start = 0
@@ -206,15 +253,15 @@ def chunk_text(text: str, chunk_size: int = CHUNK_SIZE, overlap: int = CHUNK_OVE
         chunk_tokens = tokens[start:end]
         chunk_text = encoding.decode(chunk_tokens)
 
-        # Find character positions (approximate)
-        char_start = len(encoding.decode(tokens[:start])) if start > 0 else 0
+        char_start = token_offsets[start]
         char_end = char_start + len(chunk_text)
 
         chunks.append({
             "text": chunk_text,
             "start_char": char_start,
             "end_char": char_end,
-            "token_count": len(chunk_tokens)
+            "token_count": len(chunk_tokens),
+            "content_hash": sha256_text(chunk_text)
         })
 
         # Move start, accounting for overlap
@@ -228,13 +275,19 @@ def chunk_text(text: str, chunk_size: int = CHUNK_SIZE, overlap: int = CHUNK_OVE
 
 
 def generate_embeddings(client: OpenAI, texts: List[str]) -> List[List[float]]:
-    """Generate embeddings for a batch of texts."""
-    response = client.embeddings.create(
-        model=EMBEDDING_MODEL,
-        input=texts,
-        dimensions=EMBEDDING_DIMENSIONS
-    )
-    return [item.embedding for item in response.data]
+    """Generate embeddings for a batch of texts (cached texts are not re-sent)."""
+    def request(batch: List[str]) -> List[List[float]]:
+        response = client.embeddings.create(
+            model=EMBEDDING_MODEL,
+            input=batch,
+            dimensions=EMBEDDING_DIMENSIONS
+        )
+        return [item.embedding for item in response.data]
+
+    cache = get_embedding_cache(EMBEDDING_MODEL, EMBEDDING_DIMENSIONS)
+    if cache is None:
+        return request(texts)
+    return cache.embed(texts, request)
 
 
 def get_document_metadata(file_path: Path) -> Dict[str, Any]:
@@ -265,22 +318,41 @@ def get_document_metadata(file_path: Path) -> Dict[str, Any]:
     else:
         source = source_map.get(source, source.upper())
 
-    # Generate document ID from filename
-    doc_id = hashlib.md5(file_path.name.encode()).hexdigest()[:12]
+    # Generate document ID from the relative path (same filename in two
+    # folders = two documents)
+    relative_path = str(file_path.relative_to(BASE_DIR))
+    doc_id = hashlib.md5(relative_path.encode()).hexdigest()[:12]
 
     return {
         "doc_id": doc_id,
         "filename": file_path.name,
         "source": source,
-        "file_path": str(file_path.relative_to(BASE_DIR)),
+        "file_path": relative_path,
         "file_size": file_path.stat().st_size,
     }
 
 
-def process_document(file_path: Path, openai_client: OpenAI) -> List[Dict[str, Any]]:
-    """Process a single document: extract, chunk, embed."""
-    logger.info(f"Processing: {file_path.name}")
+def prepare_document(file_path: Path, file_hash: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """
+    CPU stage for one document: extract, clean, chunk.
+
+    Runs in worker processes, so it only takes and returns picklable data.
+
+    Args:
+        file_path: Document to prepare
+        file_hash: sha256 of the file bytes (computed if not given)
+
+    Returns:
+        {"doc_id", "file_hash", "metadata", "chunks"} or None if no usable text
+    """
+    try:
+        return _prepare_document(file_path, file_hash or file_sha256(file_path))
+    except Exception as e:
+        logger.error(f"Error processing {file_path.name}: {e}")
+        return None
+
 
+def _prepare_document(file_path: Path, file_hash: str) -> Optional[Dict[str, Any]]:
     # Extract text
     if file_path.suffix.lower() == '.pdf':
         text = extract_text_from_pdf(file_path)
@@ -288,68 +360,311 @@ def process_document(file_path: Path, openai_client: OpenAI) -> List[Dict[str, A
         text = extract_text_from_docx(file_path)
     else:
         logger.warning(f"Unsupported file type: {file_path}")
-        return []
+        return None
 
     if not text or len(text) < 100:
         logger.warning(f"No/insufficient text extracted from {file_path.name}")
-        return []
+        return None
 
     text = clean_text(text)
-    total_tokens = count_tokens(text)
-    logger.info(f"  Extracted {len(text):,} chars, {total_tokens:,} tokens")
+    tokens = get_encoding().encode(text)
 
     # Get metadata
     metadata = get_document_metadata(file_path)
 
-    # Chunk text
-    chunks = chunk_text(text)
-    logger.info(f"  Created {len(chunks)} chunks")
-
-    # Generate embeddings in batches
-    chunk_texts = [c["text"] for c in chunks]
-    all_embeddings = []
-
-    for i in range(0, len(chunk_texts), BATCH_SIZE):
-        batch = chunk_texts[i:i + BATCH_SIZE]
-        embeddings = generate_embeddings(openai_client, batch)
-        all_embeddings.extend(embeddings)
-        logger.info(f"  Embedded batch {i // BATCH_SIZE + 1}/{(len(chunk_texts) - 1) // BATCH_SIZE + 1}")
-
-    # Create document records
-    records = []
-    for i, (chunk, embedding) in enumerate(zip(chunks, all_embeddings)):
-        record = {
-            "_id": f"{metadata['doc_id']}_chunk_{i:04d}",
-            "doc_id": metadata["doc_id"],
+    # Chunk text (reusing the tokens from above)
+    chunks = chunk_text(text, tokens=tokens)
+    logger.info(
+        f"Prepared {file_path.name}: {len(text):,} chars, "
+        f"{len(tokens):,} tokens, {len(chunks)} chunks"
+    )
+
+    return {
+        "doc_id": metadata["doc_id"],
+        "file_hash": file_hash,
+        "metadata": {
+            "filename": metadata["filename"],
+            "source": metadata["source"],
+            "file_path": metadata["file_path"],
+        },
+        "chunks": chunks,
+    }
+
+
+def build_records(prepared: Dict[str, Any], embeddings: List[List[float]]) -> List[Dict[str, Any]]:
+    """Combine a prepared document with its chunk embeddings into MongoDB records."""
+    doc_id = prepared["doc_id"]
+    chunks = prepared["chunks"]
+
+    return [
+        {
+            "_id": f"{doc_id}_chunk_{i:04d}",
+            "doc_id": doc_id,
             "chunk_index": i,
             "total_chunks": len(chunks),
             "text": chunk["text"],
             "token_count": chunk["token_count"],
+            "content_hash": chunk["content_hash"],
+            "file_hash": prepared["file_hash"],
             "embedding": embedding,
-            "metadata": {
-                "filename": metadata["filename"],
-                "source": metadata["source"],
-                "file_path": metadata["file_path"],
-            },
+            "metadata": prepared["metadata"],
             "ingested_at": datetime.utcnow(),
         }
-        records.append(record)
+        for i, (chunk, embedding) in enumerate(zip(chunks, embeddings))
+    ]
+
+
+def embed_documents(openai_client: OpenAI, prepared_docs: Iterable[Dict[str, Any]],
+                    max_in_flight: int = EMBED_IN_FLIGHT,
+                    lookup: Optional[Callable[[Dict[str, Any]], Dict[str, List[float]]]] = None,
+                    ) -> Iterator[Tuple[Dict[str, Any], List[List[float]]]]:
+    """
+    Embedding stage: embed chunks of many documents concurrently.
+
+    Up to `max_in_flight` batch requests run at once, across document
+    boundaries. Documents are yielded in input order once all of their
+    batches are back; a document whose embedding fails is logged and skipped.
+
+    Args:
+        openai_client: OpenAI client
+        prepared_docs: Output of prepare_document / prepare_translated_documents
+        max_in_flight: Concurrent embedding requests
+        lookup: Returns already-known embeddings for a prepared document,
+            keyed by chunk content_hash; only the other chunks are embedded
+
+    Yields:
+        (prepared document, embeddings in chunk order)
+    """
+    pending: deque = deque()  # (prepared, known embeddings, missing indices, [Future, ...])
+    in_flight = 0
+
+    def finish_oldest() -> Optional[Tuple[Dict[str, Any], List[List[float]]]]:
+        nonlocal in_flight
+        prepared, known, missing, futures = pending.popleft()
+        in_flight -= len(futures)
+        fresh = []
+        try:
+            for future in futures:
+                fresh.extend(future.result())
+        except Exception as e:
+            logger.error(f"Error embedding {prepared['metadata']['filename']}: {e}")
+            return None
+
+        for index, embedding in zip(missing, fresh):
+            known[prepared["chunks"][index]["content_hash"]] = embedding
+        logger.info(
+            f"  Embedded {prepared['metadata']['filename']}: {len(missing)} new, "
+            f"{len(prepared['chunks']) - len(missing)} reused"
+        )
+        return prepared, [known[c["content_hash"]] for c in prepared["chunks"]]
+
+    with ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="embed") as pool:
+        for prepared in prepared_docs:
+            if prepared is None:
+                continue
+
+            known = lookup(prepared) if lookup else {}
+            chunks = prepared["chunks"]
+            missing = [i for i, c in enumerate(chunks) if c["content_hash"] not in known]
+            texts = [chunks[i]["text"] for i in missing]
+            futures: List[Future] = [
+                pool.submit(generate_embeddings, openai_client, texts[i:i + BATCH_SIZE])
+                for i in range(0, len(texts), BATCH_SIZE)
+            ]
+            pending.append((prepared, known, missing, futures))
+            in_flight += len(futures)
+
+            # Bound outstanding work before taking the next document
+            while in_flight > max_in_flight and len(pending) > 1:
+                finished = finish_oldest()
+                if finished:
+                    yield finished
+
+        while pending:
+            finished = finish_oldest()
+            if finished:
+                yield finished
+
+
+def find_existing_embeddings(collection, prepared: Dict[str, Any]) -> Dict[str, List[float]]:
+    """
+    Stored embeddings for a prepared document's chunks, keyed by content hash.
+
+    Matches any stored chunk with the same text (any document), plus chunks
+    of the same file ingested before content hashes were recorded.
+    """
+    hashes = list({c["content_hash"] for c in prepared["chunks"]})
+    known = {
+        doc["content_hash"]: doc["embedding"]
+        for doc in collection.find(
+            {"content_hash": {"$in": hashes}, "embedding": {"$exists": True}},
+            {"content_hash": 1, "embedding": 1}
+        )
+    }
+
+    legacy = collection.find(
+        {"metadata.file_path": prepared["metadata"]["file_path"], "content_hash": {"$exists": False}},
+        {"text": 1, "embedding": 1}
+    )
+    for doc in legacy:
+        known.setdefault(sha256_text(doc["text"]), doc["embedding"])
+
+    return known
+
+
+def stored_file_hashes(collection) -> Dict[str, Optional[str]]:
+    """file_path -> file_hash of the stored version (None if it predates hashing)."""
+    return {
+        group["_id"]: group["file_hash"]
+        for group in collection.aggregate([
+            {"$group": {"_id": "$metadata.file_path", "file_hash": {"$first": "$file_hash"}}}
+        ])
+    }
+
+
+def collapse_near_duplicates(collection, openai_client: OpenAI) -> int:
+    """
+    Collapse near-duplicate chunks into one canonical record per group.
+
+    Runs over the whole collection after ingestion. The canonical record
+    keeps its embedding and lists every source document in `sources`; the
+    other records keep their text and bookkeeping fields (so re-ingestion
+    and cleanup still work per file) but drop their embedding and point at
+    the canonical with `duplicate_of`, which takes them out of the vector
+    index. Source filters also match `sources.source`, so the passage is
+    still found when searching any of its sources. A duplicate whose canonical was deleted is re-embedded (from the
+    embedding cache when possible) and becomes canonical again.
+
+    Returns:
+        Number of chunks currently collapsed into another record
+    """
+    records = list(collection.find({}, {"text": 1, "metadata": 1, "duplicate_of": 1, "sources": 1}))
+    groups = near_duplicate_groups([r["text"] for r in records], threshold=NEAR_DUPLICATE_THRESHOLD)
+
+    updates: Dict[str, Dict[str, Any]] = {}  # _id -> {"$set": ..., "$unset": ...}
+    promote = []
+    grouped = set()
+
+    for group in groups:
+        # Prefer a record that still has its embedding, then a stable order
+        members = sorted(
+            (records[i] for i in group),
+            key=lambda r: (r.get("duplicate_of") is not None, r["metadata"]["file_path"], r["_id"])
+        )
+        canonical = members[0]
+        grouped.update(r["_id"] for r in members)
+
+        sources = list({
+            r["metadata"]["file_path"]: {
+                "filename": r["metadata"]["filename"],
+                "source": r["metadata"]["source"],
+                "file_path": r["metadata"]["file_path"],
+            }
+            for r in members
+        }.values())
+        if canonical.get("duplicate_of") is not None:
+            promote.append(canonical)
+        if canonical.get("duplicate_of") is not None or canonical.get("sources") != sources:
+            updates[canonical["_id"]] = {"$set": {"sources": sources}, "$unset": {"duplicate_of": ""}}
+
+        for r in members[1:]:
+            if r.get("duplicate_of") != canonical["_id"]:
+                updates[r["_id"]] = {
+                    "$set": {"duplicate_of": canonical["_id"]},
+                    "$unset": {"embedding": "", "sources": ""}
+                }
+
+    # Records no longer part of any group
+    for r in records:
+        if r["_id"] in grouped:
+            continue
+        if r.get("duplicate_of") is not None:
+            promote.append(r)
+        if r.get("duplicate_of") is not None or "sources" in r:
+            updates[r["_id"]] = {"$unset": {"duplicate_of": "", "sources": ""}}
+
+    texts = [r["text"] for r in promote]
+    for i in range(0, len(texts), BATCH_SIZE):
+        embeddings = generate_embeddings(openai_client, texts[i:i + BATCH_SIZE])
+        for r, embedding in zip(promote[i:i + BATCH_SIZE], embeddings):
+            updates[r["_id"]].setdefault("$set", {})["embedding"] = embedding
+
+    if updates:
+        collection.bulk_write([UpdateOne({"_id": _id}, update) for _id, update in updates.items()])
+
+    collapsed = sum(len(group) - 1 for group in groups)
+    logger.info(
+        f"Near-duplicates: {collapsed} chunks collapsed into {len(groups)} canonical records "
+        f"({len(updates)} records updated, {len(promote)} re-embedded)"
+    )
+    return collapsed
+
+
+class BulkWriter:
+    """
+    Single writer thread: upserts the records of each finished document.
+
+    Decouples MongoDB round trips from embedding; the queue is bounded so
+    memory stays flat if Atlas is slower than OpenAI. After a document is
+    written, its chunks from older versions (beyond the new chunk count, or
+    under a previous doc_id) are deleted.
+    """
 
-    return records
+    def __init__(self, collection, max_queued: int = WRITE_QUEUE_DOCS):
+        self.collection = collection
+        self.total_chunks = 0
+        self.successful_docs = 0
+        self._queue: "queue.Queue[Optional[Tuple[str, List[Dict[str, Any]]]]]" = queue.Queue(max_queued)
+        self._thread = threading.Thread(target=self._run, name="bulk-writer", daemon=True)
+        self._thread.start()
+
+    def write(self, name: str, records: List[Dict[str, Any]]) -> None:
+        """Queue a document's records for upsert."""
+        if records:
+            self._queue.put((name, records))
+
+    def close(self) -> None:
+        """Flush queued documents and stop the writer."""
+        self._queue.put(None)
+        self._thread.join()
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            name, records = item
+            try:
+                operations = [
+                    UpdateOne(
+                        {"_id": r["_id"]},
+                        {"$set": r, "$unset": {"duplicate_of": "", "sources": ""}},
+                        upsert=True
+                    )
+                    for r in records
+                ]
+                self.collection.bulk_write(operations)
+                orphans = self.collection.delete_many({
+                    "metadata.file_path": records[0]["metadata"]["file_path"],
+                    "_id": {"$nin": [r["_id"] for r in records]}
+                }).deleted_count
+                self.total_chunks += len(records)
+                self.successful_docs += 1
+                logger.info(f"  Uploaded {len(records)} chunks of {name} to MongoDB ({orphans} stale removed)")
+            except Exception as e:
+                logger.error(f"Error writing {name}: {e}")
 
 
-def process_translated_documents(file_path: Path, openai_client: OpenAI) -> List[Dict[str, Any]]:
-    """Process combined translated document file into multiple document entries."""
+def prepare_translated_documents(file_path: Path, file_hash: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Parse and chunk the combined translated file into prepared documents."""
     logger.info(f"Processing translated file: {file_path.name}")
+    file_hash = file_hash or file_sha256(file_path)
 
     # Parse into individual documents
     docs = parse_combined_translation(file_path)
     logger.info(f"  Found {len(docs)} documents in translation file")
 
-    if not docs:
-        return []
-
-    all_records = []
+    prepared_docs = []
 
     for doc_idx, doc in enumerate(docs):
         source_name = doc['source']
@@ -361,77 +676,79 @@ def process_translated_documents(file_path: Path, openai_client: OpenAI) -> List
             logger.warning(f"  Skipping {source_name} (too short)")
             continue
 
-        total_tokens = count_tokens(content)
-        logger.info(f"  [{doc_idx + 1}/{len(docs)}] {source_name}: {len(content):,} chars, {total_tokens:,} tokens")
+        tokens = get_encoding().encode(content)
+        logger.info(f"  [{doc_idx + 1}/{len(docs)}] {source_name}: {len(content):,} chars, {len(tokens):,} tokens")
 
         # Generate doc_id from source name
         doc_id = hashlib.md5(source_name.encode()).hexdigest()[:12]
 
-        # Chunk text
-        chunks = chunk_text(content)
+        # Chunk text (reusing the tokens from above)
+        chunks = chunk_text(content, tokens=tokens)
         logger.info(f"    Created {len(chunks)} chunks")
 
-        # Generate embeddings in batches
-        chunk_texts = [c["text"] for c in chunks]
-        all_embeddings = []
-
-        for i in range(0, len(chunk_texts), BATCH_SIZE):
-            batch = chunk_texts[i:i + BATCH_SIZE]
-            embeddings = generate_embeddings(openai_client, batch)
-            all_embeddings.extend(embeddings)
-
-        # Create records
-        for i, (chunk, embedding) in enumerate(zip(chunks, all_embeddings)):
-            record = {
-                "_id": f"{doc_id}_chunk_{i:04d}",
-                "doc_id": doc_id,
-                "chunk_index": i,
-                "total_chunks": len(chunks),
-                "text": chunk["text"],
-                "token_count": chunk["token_count"],
-                "embedding": embedding,
-                "metadata": {
-                    "filename": source_name,
-                    "source": "Israel/IMPA",
-                    "file_path": f"israel/{source_name}",
-                    "translated_from": "Hebrew",
-                },
-                "ingested_at": datetime.utcnow(),
-            }
-            all_records.append(record)
+        prepared_docs.append({
+            "doc_id": doc_id,
+            "file_hash": file_hash,
+            "metadata": {
+                "filename": source_name,
+                "source": "Israel/IMPA",
+                "file_path": f"israel/{source_name}",
+                "translated_from": "Hebrew",
+            },
+            "chunks": chunks,
+        })
 
-    return all_records
+    return prepared_docs
 
 
 def create_vector_index(db):
-    """Create MongoDB Atlas Vector Search index."""
+    """
+    Create MongoDB Atlas Vector Search index.
+
+    Source filters match `metadata.source` or `sources.source` (the documents
+    a collapsed near-duplicate also appears in); an existing index without
+    the second filter path is updated in place.
+    """
     collection = db[COLLECTION_NAME]
 
+    fields = [
+        {
+            "type": "vector",
+            "path": "embedding",
+            "numDimensions": EMBEDDING_DIMENSIONS,
+            "similarity": "cosine"
+        },
+        {
+            "type": "filter",
+            "path": "metadata.source"
+        },
+        {
+            "type": "filter",
+            "path": "sources.source"
+        }
+    ]
+
     # Check if index exists
     existing_indexes = list(collection.list_search_indexes())
     for idx in existing_indexes:
         if idx.get("name") == VECTOR_INDEX_NAME:
-            logger.info(f"Vector index '{VECTOR_INDEX_NAME}' already exists")
+            paths = {f.get("path") for f in idx.get("latestDefinition", {}).get("fields", [])}
+            if {f["path"] for f in fields} <= paths:
+                logger.info(f"Vector index '{VECTOR_INDEX_NAME}' already exists")
+                return
+            try:
+                collection.update_search_index(VECTOR_INDEX_NAME, {"fields": fields})
+                logger.info(f"Added sources.source filter to vector index '{VECTOR_INDEX_NAME}'")
+            except Exception as e:
+                logger.warning(f"Could not update vector index (may need Atlas UI): {e}")
+                logger.info("Add a filter field with path: sources.source")
             return
 
     # Create vector search index
     index_definition = {
         "name": VECTOR_INDEX_NAME,
         "type": "vectorSearch",
-        "definition": {
-            "fields": [
-                {
-                    "type": "vector",
-                    "path": "embedding",
-                    "numDimensions": EMBEDDING_DIMENSIONS,
-                    "similarity": "cosine"
-                },
-                {
-                    "type": "filter",
-                    "path": "metadata.source"
-                }
-            ]
-        }
+        "definition": {"fields": fields}
     }
 
     try:
@@ -443,6 +760,7 @@ def create_vector_index(db):
         logger.info(f"  Collection: {COLLECTION_NAME}")
         logger.info(f"  Index name: {VECTOR_INDEX_NAME}")
         logger.info(f"  Field: embedding, Dimensions: {EMBEDDING_DIMENSIONS}, Similarity: cosine")
+        logger.info("  Filters: metadata.source, sources.source")
 
 
 def main():
@@ -465,69 +783,71 @@ def main():
     # Filter out download list and scripts
     doc_files = [f for f in doc_files if not f.name.startswith(("DOWNLOAD", "bulk_"))]
 
-    logger.info(f"Found {len(doc_files)} documents to process")
-
-    # Process each document
-    total_chunks = 0
-    successful_docs = 0
+    logger.info(f"Found {len(doc_files)} documents")
 
+    # Skip files whose bytes are unchanged since they were last ingested
+    stored = stored_file_hashes(collection)
+    changed_files, changed_hashes = [], []
     for file_path in doc_files:
-        try:
-            # Check if already processed
-            existing = collection.find_one({"metadata.filename": file_path.name})
-            if existing:
-                logger.info(f"SKIP: {file_path.name} already in database")
-                continue
+        file_hash = file_sha256(file_path)
+        if stored.get(str(file_path.relative_to(BASE_DIR))) == file_hash:
+            logger.info(f"SKIP: {file_path.name} unchanged")
+            continue
+        changed_files.append(file_path)
+        changed_hashes.append(file_hash)
 
-            records = process_document(file_path, openai_client)
+    logger.info(f"{len(changed_files)} new or changed documents")
 
-            if records:
-                # Bulk upsert
-                operations = [
-                    UpdateOne(
-                        {"_id": r["_id"]},
-                        {"$set": r},
-                        upsert=True
-                    )
-                    for r in records
-                ]
-                result = collection.bulk_write(operations)
-                total_chunks += len(records)
-                successful_docs += 1
-                logger.info(f"  Uploaded {len(records)} chunks to MongoDB")
+    def lookup(prepared: Dict[str, Any]) -> Dict[str, List[float]]:
+        return find_existing_embeddings(collection, prepared)
 
-        except Exception as e:
-            logger.error(f"Error processing {file_path.name}: {e}")
-            continue
+    # Pipeline: worker processes extract/chunk -> threads embed -> one bulk writer
+    writer = BulkWriter(collection)
+    try:
+        with ProcessPoolExecutor(max_workers=EXTRACT_WORKERS) as extract_pool:
+            prepared_docs = extract_pool.map(prepare_document, changed_files, changed_hashes)
+            for prepared, embeddings in embed_documents(openai_client, prepared_docs, lookup=lookup):
+                writer.write(prepared["metadata"]["filename"], build_records(prepared, embeddings))
 
-    # Process Israeli translated documents
-    israel_translated = BASE_DIR / "israel" / "aml_english_translated.txt"
-    if israel_translated.exists():
-        logger.info("")
-        logger.info("Processing Israeli translated documents...")
-
-        # Check if already processed
-        existing = collection.find_one({"metadata.source": "Israel/IMPA"})
-        if existing:
-            logger.info("SKIP: Israeli documents already in database")
-        else:
-            try:
-                records = process_translated_documents(israel_translated, openai_client)
-                if records:
-                    operations = [
-                        UpdateOne(
-                            {"_id": r["_id"]},
-                            {"$set": r},
-                            upsert=True
-                        )
-                        for r in records
-                    ]
-                    result = collection.bulk_write(operations)
-                    total_chunks += len(records)
-                    successful_docs += 1
-                    logger.info(f"  Uploaded {len(records)} Israeli document chunks to MongoDB")
-            except Exception as e:
-                logger.error(f"Error processing Israeli documents: {e}")
+        # Process Israeli translated documents
+        israel_translated = BASE_DIR / "israel" / "aml_english_translated.txt"
+        if israel_translated.exists():
+            logger.info("")
+            logger.info("Processing Israeli translated documents...")
+
+            # Check if already processed
+            translated_hash = file_sha256(israel_translated)
+            existing = collection.find_one({"metadata.source": "Israel/IMPA", "file_hash": translated_hash})
+            if existing:
+                logger.info("SKIP: Israeli documents unchanged")
+            else:
+                translated_docs = prepare_translated_documents(israel_translated, translated_hash)
+                for prepared, embeddings in embed_documents(openai_client, translated_docs, lookup=lookup):
+                    writer.write(prepared["metadata"]["filename"], build_records(prepared, embeddings))
+
+                # Sections no longer in the translation file
+                collection.delete_many({
+                    "metadata.source": "Israel/IMPA",
+                    "metadata.file_path": {"$nin": [d["metadata"]["file_path"] for d in translated_docs]}
+                })
+    finally:
+        writer.close()
+
+    # Remove chunks of documents that no longer exist on disk
+    current_paths = [str(f.relative_to(BASE_DIR)) for f in doc_files]
+    removed = collection.delete_many({
+        "metadata.file_path": {"$nin": current_paths},
+        "metadata.translated_from": {"$exists": False}
+    }).deleted_count
+    if removed:
+        logger.info(f"Removed {removed} chunks of deleted documents")
+
+    # Collapse near-duplicate chunks (only needed when the corpus changed)
+    if writer.successful_docs or removed:
+        collapse_near_duplicates(collection, openai_client)
+
+    total_chunks = writer.total_chunks
+    successful_docs = writer.successful_docs
 
     # Create vector index
     logger.info("")
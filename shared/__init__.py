@@ -3,9 +3,18 @@ Shared Utilities
 
 Common modules used across all engines:
 - db: MongoDB connection pooling
+- async_db: Async MongoDB connection pooling (asyncio)
+- storage: Pluggable storage backends (MongoDB / embedded local)
 - config: Configuration and thresholds
 - models: Pydantic data models
 - clients: OpenAI/Anthropic API clients
+- embedding_cache: Persistent content-addressed embedding cache
+- dedup: MinHash/LSH near-duplicate text detection
+- batch: Columnar transaction batches (NumPy)
+- columnar: Partitioned Parquet staging of raw transactions (pyarrow)
+- experiment: Seeded sampling and checkpointed sharding for experiments
+- evaluation: ROC/PR curves and threshold sweeps over anomaly scores
+- graph: CSR transaction graph for cycle, fan-out and pass-through queries
 """
 
 from .config import Config, THRESHOLDS
@@ -16,6 +25,7 @@ from .models import (
     TribunalVerdict,
     SARDraft,
 )
+from .batch import TransactionBatch
 
 __all__ = [
     "Config",
@@ -25,4 +35,5 @@ __all__ = [
     "TribunalInput",
     "TribunalVerdict",
     "SARDraft",
+    "TransactionBatch",
 ]
@@ -0,0 +1,242 @@
+"""
+Async MongoDB Connection Pool for AML Three-Layer Tribunal
+
+Asyncio counterpart of shared/db.py built on PyMongo's native async API.
+Uses the same pool settings and query shapes, so one event loop can keep
+hundreds of history, baseline and vector lookups in flight.
+"""
+
+import asyncio
+import certifi
+from typing import Optional, Dict, List, Any, Iterable
+from pymongo import AsyncMongoClient
+from pymongo.asynchronous.database import AsyncDatabase
+from pymongo.asynchronous.collection import AsyncCollection
+
+from shared.config import MONGODB_URI, DATABASE_NAME, COLLECTIONS, MONGODB_POOL_OPTIONS
+from shared.db import (
+    HISTORY_INDEX_KEYS,
+    HISTORY_PROJECTION,
+    history_chunks,
+    history_match,
+    history_pipeline,
+    count_pipeline,
+    vector_search_pipeline,
+)
+
+
+class AsyncMongoDBConnection:
+    """
+    Singleton async MongoDB connection manager.
+
+    Construction never blocks: the client connects in the background and
+    readiness is checked explicitly with `await db.ping()`.
+
+    An AsyncMongoClient only works on the event loop it was first used on,
+    so there is one client per loop: when accessed from a different running
+    loop (e.g. a second asyncio.run()), a new client is created for it. The
+    previous client is dropped without closing, as its loop is usually
+    already closed; call `await db.close()` before leaving a loop to release
+    its connections.
+
+    Usage:
+        db = AsyncMongoDBConnection()
+        doc = await db.transactions.find_one({"txn_id": txn_id})
+    """
+
+    _instance: Optional["AsyncMongoDBConnection"] = None
+    _client: Optional[AsyncMongoClient] = None
+    _database: Optional[AsyncDatabase] = None
+    _loop: Optional[asyncio.AbstractEventLoop] = None  # Loop the client is bound to
+
+    def __new__(cls) -> "AsyncMongoDBConnection":
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        if self._client is None:
+            self._connect()
+
+    def _connect(self) -> None:
+        """Create the async client for MongoDB Atlas."""
+        self._client = AsyncMongoClient(
+            MONGODB_URI,
+            tlsCAFile=certifi.where(),  # Required for macOS SSL
+            **MONGODB_POOL_OPTIONS,
+        )
+        self._database = self._client[DATABASE_NAME]
+        self._loop = None
+
+    def _bind_loop(self) -> None:
+        """Bind the client to the running loop, replacing it if bound to another one."""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return  # Not in a loop: binds on first use inside one
+        if self._loop is None:
+            self._loop = loop
+        elif self._loop is not loop:
+            self._connect()
+            self._loop = loop
+
+    @property
+    def client(self) -> AsyncMongoClient:
+        """Get the AsyncMongoClient instance for the running loop."""
+        self._bind_loop()
+        return self._client
+
+    @property
+    def database(self) -> AsyncDatabase:
+        """Get the database instance for the running loop."""
+        self._bind_loop()
+        return self._database
+
+    # ==========================================================================
+    # COLLECTION ACCESSORS
+    # ==========================================================================
+
+    @property
+    def transactions(self) -> AsyncCollection:
+        """Get the transactions collection (5M+ docs)."""
+        return self.database[COLLECTIONS["transactions"]]
+
+    @property
+    def accounts(self) -> AsyncCollection:
+        """Get the accounts collection (515K+ docs)."""
+        return self.database[COLLECTIONS["accounts"]]
+
+    @property
+    def banks(self) -> AsyncCollection:
+        """Get the banks collection (30K+ docs)."""
+        return self.database[COLLECTIONS["banks"]]
+
+    @property
+    def regulatory_docs(self) -> AsyncCollection:
+        """Get the regulatory_docs collection (vector embeddings)."""
+        return self.database[COLLECTIONS["regulatory_docs"]]
+
+    @property
+    def cluster_baselines(self) -> AsyncCollection:
+        """Get the cluster_baselines collection (for Statistical Engine)."""
+        return self.database[COLLECTIONS["cluster_baselines"]]
+
+    @property
+    def account_embeddings(self) -> AsyncCollection:
+        """Get the account_embeddings collection (for Narrative Engine)."""
+        return self.database[COLLECTIONS["account_embeddings"]]
+
+    # ==========================================================================
+    # UTILITY METHODS
+    # ==========================================================================
+
+    def get_collection(self, name: str) -> AsyncCollection:
+        """Get a collection by name."""
+        return self.database[name]
+
+    async def close(self) -> None:
+        """Close the connection."""
+        if self._client:
+            await self._client.close()
+            self._client = None
+            self._database = None
+            self._loop = None
+            AsyncMongoDBConnection._instance = None
+
+    async def ping(self) -> bool:
+        """Check if connection is alive."""
+        try:
+            await self.client.admin.command("ping")
+            return True
+        except Exception:
+            return False
+
+
+# =============================================================================
+# CONVENIENCE FUNCTIONS
+# =============================================================================
+
+def get_async_db() -> AsyncMongoDBConnection:
+    """Get the singleton async database connection."""
+    return AsyncMongoDBConnection()
+
+
+async def fetch_account_histories(
+    db,
+    account_ids: Iterable[str],
+    extra_filter: Optional[Dict[str, Any]] = None,
+    limit_per_account: Optional[int] = None,
+    projection: Optional[Dict[str, Any]] = None,
+) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Awaitable version of shared.db.fetch_account_histories.
+
+    Account chunks are queried concurrently.
+
+    Args:
+        db: AsyncMongoDBConnection or AsyncDatabase
+        account_ids: Sender account IDs to fetch
+        extra_filter: Additional match conditions (e.g. {"is_laundering": False})
+        limit_per_account: Keep only the first N transactions per account
+        projection: Fields to return (defaults to HISTORY_PROJECTION)
+
+    Returns:
+        Dict of account_id -> transactions sorted by timestamp ascending
+    """
+    account_ids = list(dict.fromkeys(account_ids))
+    histories: Dict[str, List[Dict[str, Any]]] = {a: [] for a in account_ids}
+
+    async def fetch_chunk(chunk: List[str]) -> None:
+        if limit_per_account is None:
+            cursor = db.transactions.find(
+                history_match(chunk, extra_filter), projection or HISTORY_PROJECTION
+            ).sort(HISTORY_INDEX_KEYS[:2])
+            async for txn in cursor:
+                histories[txn["sender"]["account_id"]].append(txn)
+        else:
+            pipeline = history_pipeline(chunk, limit_per_account, extra_filter, projection)
+            cursor = await db.transactions.aggregate(pipeline, allowDiskUse=True)
+            async for group in cursor:
+                histories[group["_id"]] = group["transactions"]
+
+    await asyncio.gather(*(fetch_chunk(chunk) for chunk in history_chunks(account_ids)))
+    return histories
+
+
+async def count_account_transactions(
+    db,
+    account_ids: Iterable[str],
+    extra_filter: Optional[Dict[str, Any]] = None,
+) -> Dict[str, int]:
+    """Awaitable version of shared.db.count_account_transactions."""
+    account_ids = list(dict.fromkeys(account_ids))
+    counts = {a: 0 for a in account_ids}
+
+    async def count_chunk(chunk: List[str]) -> None:
+        cursor = await db.transactions.aggregate(count_pipeline(chunk, extra_filter))
+        async for group in cursor:
+            counts[group["_id"]] = group["count"]
+
+    await asyncio.gather(*(count_chunk(chunk) for chunk in history_chunks(account_ids)))
+    return counts
+
+
+async def load_cluster_baselines(db) -> Dict[int, Dict[str, Any]]:
+    """Load all peer group baselines, keyed by cluster_id."""
+    return {
+        doc["cluster_id"]: doc
+        async for doc in db.cluster_baselines.find({}, {"_id": 0})
+    }
+
+
+async def search_regulatory_docs(
+    db,
+    query_vector: List[float],
+    limit: int = 8,
+    source_filter: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """Run an Atlas vector search over regulatory_docs for a query embedding."""
+    cursor = await db.regulatory_docs.aggregate(
+        vector_search_pipeline(query_vector, limit=limit, source_filter=source_filter)
+    )
+    return await cursor.to_list()
@@ -0,0 +1,468 @@
+"""
+Columnar Transaction Batches for AML Three-Layer Tribunal
+
+Provides a NumPy-backed container for scoring many transactions at once.
+Strings (accounts, banks, currencies, payment formats) are dictionary-encoded
+into int32 codes so batches are cheap to slice, filter and pass between layers.
+"""
+
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Union
+
+import numpy as np
+
+from shared.models import Transaction, TransactionParty, TransactionAmount
+
+
+# =============================================================================
+# DICTIONARY ENCODING
+# =============================================================================
+
+class StringDictionary:
+    """
+    Append-only mapping between strings and dense int32 codes.
+
+    Usage:
+        banks = StringDictionary()
+        codes = banks.encode_many(["011", "012", "011"])  # array([0, 1, 0])
+        banks.decode(1)  # "012"
+    """
+
+    def __init__(self, values: Optional[Iterable[str]] = None):
+        self._values: List[str] = []
+        self._codes: Dict[str, int] = {}
+        for value in values or ():
+            self.encode(value)
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def __contains__(self, value: str) -> bool:
+        return value in self._codes
+
+    @property
+    def values(self) -> List[str]:
+        """All known values, indexed by code."""
+        return self._values
+
+    def encode(self, value: str) -> int:
+        """Get the code for a value, assigning a new one if unseen."""
+        code = self._codes.get(value)
+        if code is None:
+            code = len(self._values)
+            self._codes[value] = code
+            self._values.append(value)
+        return code
+
+    def encode_many(self, values: Iterable[str]) -> np.ndarray:
+        """Encode a sequence of values into an int32 code array."""
+        encode = self.encode
+        return np.fromiter((encode(v) for v in values), dtype=np.int32)
+
+    def lookup(self, value: str) -> int:
+        """Get the code for a value without assigning one (-1 if unseen)."""
+        return self._codes.get(value, -1)
+
+    def decode(self, code: int) -> str:
+        """Get the value for a code."""
+        return self._values[code]
+
+    def decode_many(self, codes: np.ndarray) -> List[str]:
+        """Decode an array of codes back into strings."""
+        values = self._values
+        return [values[c] for c in codes.tolist()]
+
+
+@dataclass
+class BatchDictionaries:
+    """
+    Dictionaries shared by all batches built from the same source.
+
+    Sender and receiver columns share one dictionary, so account 42 means the
+    same account whichever side of the transaction it appears on.
+    """
+    accounts: StringDictionary = field(default_factory=StringDictionary)
+    banks: StringDictionary = field(default_factory=StringDictionary)
+    currencies: StringDictionary = field(default_factory=StringDictionary)
+    payment_formats: StringDictionary = field(default_factory=StringDictionary)
+
+
+# =============================================================================
+# CSV COLUMN FALLBACKS
+# =============================================================================
+
+# Same naming conventions accepted by scripts/aml_ingest.py
+CSV_COLUMNS: Dict[str, tuple] = {
+    "timestamp": ("Timestamp", "timestamp"),
+    "sender_account": ("Account", "From Account", "account"),
+    "sender_bank": ("From Bank", "from_bank"),
+    "receiver_account": ("Account.1", "To Account", "account_1"),
+    "receiver_bank": ("To Bank", "to_bank"),
+    "amount_sent": ("Amount Paid", "amount_paid"),
+    "amount_received": ("Amount Received", "amount_received"),
+    "currency_sent": ("Payment Currency", "payment_currency"),
+    "currency_received": ("Receiving Currency", "receiving_currency"),
+    "payment_format": ("Payment Format", "payment_format"),
+    "is_laundering": ("Is Laundering", "is_laundering"),
+}
+
+
+def resolve_column(columns: Iterable[str], field_name: str) -> Optional[str]:
+    """Return the first CSV column name present for a batch field."""
+    available = set(columns)
+    for candidate in CSV_COLUMNS[field_name]:
+        if candidate in available:
+            return candidate
+    return None
+
+
+# =============================================================================
+# TRANSACTION BATCH
+# =============================================================================
+
+IndexLike = Union[slice, np.ndarray, Sequence[int]]
+
+
+class TransactionBatch:
+    """
+    Columnar batch of transactions.
+
+    Columns:
+        timestamp           int64 epoch seconds (UTC)
+        amount_sent         float64
+        amount_received     float64
+        sender_account      int32 code into dictionaries.accounts
+        receiver_account    int32 code into dictionaries.accounts
+        sender_bank         int32 code into dictionaries.banks
+        receiver_bank       int32 code into dictionaries.banks
+        currency_sent       int32 code into dictionaries.currencies
+        currency_received   int32 code into dictionaries.currencies
+        payment_format      int32 code into dictionaries.payment_formats
+        is_laundering       bool
+        row_id              int64 position in the root batch (before any cuts)
+
+    Slicing returns views; masks and index arrays copy only the columns.
+    row_id survives every cut, so Layer 2/3 results can be scattered back
+    onto the original batch:
+
+        flagged = batch.filter(layer1_scores > THRESHOLDS.statistical_gate)
+        escalated = flagged.filter(layer2_scores < THRESHOLDS.narrative_gate)
+        final_mask = batch.mask_from(escalated)
+    """
+
+    COLUMNS = (
+        "timestamp",
+        "amount_sent",
+        "amount_received",
+        "sender_account",
+        "receiver_account",
+        "sender_bank",
+        "receiver_bank",
+        "currency_sent",
+        "currency_received",
+        "payment_format",
+        "is_laundering",
+        "row_id",
+    )
+
+    DTYPES = {
+        "timestamp": np.int64,
+        "amount_sent": np.float64,
+        "amount_received": np.float64,
+        "sender_account": np.int32,
+        "receiver_account": np.int32,
+        "sender_bank": np.int32,
+        "receiver_bank": np.int32,
+        "currency_sent": np.int32,
+        "currency_received": np.int32,
+        "payment_format": np.int32,
+        "is_laundering": np.bool_,
+        "row_id": np.int64,
+    }
+
+    def __init__(
+        self,
+        columns: Dict[str, np.ndarray],
+        dictionaries: Optional[BatchDictionaries] = None,
+        txn_ids: Optional[np.ndarray] = None,
+    ):
+        self.dictionaries = dictionaries or BatchDictionaries()
+
+        size = len(columns["timestamp"])
+        if "row_id" not in columns:
+            columns = {**columns, "row_id": np.arange(size, dtype=np.int64)}
+
+        for name in self.COLUMNS:
+            column = np.asarray(columns[name], dtype=self.DTYPES[name])
+            if len(column) != size:
+                raise ValueError(f"Column '{name}' has {len(column)} rows, expected {size}")
+            setattr(self, name, column)
+
+        self.txn_ids = txn_ids if txn_ids is not None else np.full(size, None, dtype=object)
+
+    def __len__(self) -> int:
+        return len(self.timestamp)
+
+    def __repr__(self) -> str:
+        return f"TransactionBatch(rows={len(self)}, accounts={len(self.dictionaries.accounts)})"
+
+    # ==========================================================================
+    # CONSTRUCTORS
+    # ==========================================================================
+
+    @classmethod
+    def empty(cls, dictionaries: Optional[BatchDictionaries] = None) -> "TransactionBatch":
+        """Create a zero-row batch."""
+        columns = {name: np.empty(0, dtype=cls.DTYPES[name]) for name in cls.COLUMNS}
+        return cls(columns, dictionaries, np.empty(0, dtype=object))
+
+    @classmethod
+    def from_documents(
+        cls,
+        documents: Iterable[Dict[str, Any]],
+        dictionaries: Optional[BatchDictionaries] = None,
+    ) -> "TransactionBatch":
+        """
+        Build a batch from transaction documents (e.g. a MongoDB cursor).
+
+        Args:
+            documents: Iterable of documents in the `transactions` schema
+            dictionaries: Dictionaries to encode into (shared across batches)
+
+        Returns:
+            TransactionBatch with one row per document
+        """
+        dictionaries = dictionaries or BatchDictionaries()
+        accounts = dictionaries.accounts.encode
+        banks = dictionaries.banks.encode
+        currencies = dictionaries.currencies.encode
+        formats = dictionaries.payment_formats.encode
+
+        timestamps, txn_ids = [], []
+        amount_sent, amount_received = [], []
+        sender_account, receiver_account = [], []
+        sender_bank, receiver_bank = [], []
+        currency_sent, currency_received = [], []
+        payment_format, is_laundering = [], []
+
+        for doc in documents:
+            sender = doc.get("sender") or {}
+            receiver = doc.get("receiver") or {}
+            amount = doc.get("amount") or {}
+
+            timestamps.append(doc.get("timestamp"))
+            txn_ids.append(doc.get("txn_id"))
+            amount_sent.append(amount.get("sent") or 0.0)
+            amount_received.append(amount.get("received") or 0.0)
+            sender_account.append(accounts(str(sender.get("account_id", ""))))
+            receiver_account.append(accounts(str(receiver.get("account_id", ""))))
+            sender_bank.append(banks(str(sender.get("bank_id", ""))))
+            receiver_bank.append(banks(str(receiver.get("bank_id", ""))))
+            currency_sent.append(currencies(amount.get("currency_sent", "US Dollar")))
+            currency_received.append(currencies(amount.get("currency_received", "US Dollar")))
+            payment_format.append(formats(doc.get("payment_format", "Unknown")))
+            is_laundering.append(bool(doc.get("is_laundering") or False))
+
+        columns = {
+            "timestamp": _to_epoch_seconds(timestamps),
+            "amount_sent": amount_sent,
+            "amount_received": amount_received,
+            "sender_account": sender_account,
+            "receiver_account": receiver_account,
+            "sender_bank": sender_bank,
+            "receiver_bank": receiver_bank,
+            "currency_sent": currency_sent,
+            "currency_received": currency_received,
+            "payment_format": payment_format,
+            "is_laundering": is_laundering,
+        }
+        return cls(columns, dictionaries, np.array(txn_ids, dtype=object))
+
+    @classmethod
+    def from_dataframe(
+        cls,
+        frame,
+        dictionaries: Optional[BatchDictionaries] = None,
+    ) -> "TransactionBatch":
+        """
+        Build a batch from a raw CSV chunk (IBM AML column names).
+
+        Args:
+            frame: pandas DataFrame, e.g. one chunk of pd.read_csv(..., chunksize=N)
+            dictionaries: Dictionaries to encode into (shared across batches)
+
+        Returns:
+            TransactionBatch with one row per CSV row
+        """
+        import pandas as pd
+
+        dictionaries = dictionaries or BatchDictionaries()
+        size = len(frame)
+
+        def column(field_name: str, default: Any) -> pd.Series:
+            name = resolve_column(frame.columns, field_name)
+            if name is None:
+                return pd.Series([default] * size, index=frame.index)
+            return frame[name]
+
+        def strings(field_name: str, default: str) -> np.ndarray:
+            return column(field_name, default).astype(str).str.strip().to_numpy()
+
+        def encode(dictionary: StringDictionary, values: np.ndarray) -> np.ndarray:
+            # Encode each distinct value once, then broadcast the codes
+            uniques, inverse = np.unique(values, return_inverse=True)
+            codes = dictionary.encode_many(uniques.tolist())
+            return codes[inverse.reshape(-1)]
+
+        timestamps = pd.to_datetime(column("timestamp", None), errors="coerce").fillna(pd.Timestamp(0))
+        amount_sent = pd.to_numeric(column("amount_sent", 0), errors="coerce").fillna(0.0).to_numpy()
+        amount_received = pd.to_numeric(column("amount_received", 0), errors="coerce").fillna(0.0).to_numpy()
+        laundering = pd.to_numeric(column("is_laundering", 0), errors="coerce").fillna(0).astype(int)
+
+        columns = {
+            "timestamp": timestamps.to_numpy(dtype="datetime64[s]").astype(np.int64),
+            "amount_sent": np.where(amount_sent == 0, amount_received, amount_sent),
+            "amount_received": amount_received,
+            "sender_account": encode(dictionaries.accounts, strings("sender_account", "")),
+            "receiver_account": encode(dictionaries.accounts, strings("receiver_account", "")),
+            "sender_bank": encode(dictionaries.banks, strings("sender_bank", "")),
+            "receiver_bank": encode(dictionaries.banks, strings("receiver_bank", "")),
+            "currency_sent": encode(dictionaries.currencies, strings("currency_sent", "USD")),
+            "currency_received": encode(dictionaries.currencies, strings("currency_received", "USD")),
+            "payment_format": encode(dictionaries.payment_formats, strings("payment_format", "Unknown")),
+            "is_laundering": laundering.to_numpy().astype(bool),
+        }
+        return cls(columns, dictionaries)
+
+    @classmethod
+    def concat(cls, batches: Sequence["TransactionBatch"]) -> "TransactionBatch":
+        """
+        Concatenate batches that share the same dictionaries.
+
+        row_id is renumbered so the result is a fresh root batch.
+        """
+        if not batches:
+            return cls.empty()
+
+        dictionaries = batches[0].dictionaries
+        if any(b.dictionaries is not dictionaries for b in batches):
+            raise ValueError("Can only concatenate batches that share dictionaries")
+
+        columns = {
+            name: np.concatenate([getattr(b, name) for b in batches])
+            for name in cls.COLUMNS
+            if name != "row_id"
+        }
+        txn_ids = np.concatenate([b.txn_ids for b in batches])
+        return cls(columns, dictionaries, txn_ids)
+
+    # ==========================================================================
+    # SELECTION
+    # ==========================================================================
+
+    def __getitem__(self, key: IndexLike) -> "TransactionBatch":
+        """Select rows by slice (view), boolean mask or integer indices (copy)."""
+        if not isinstance(key, slice):
+            key = np.asarray(key)
+            if key.dtype == np.bool_ and len(key) != len(self):
+                raise ValueError(f"Mask has {len(key)} rows, batch has {len(self)}")
+
+        columns = {name: getattr(self, name)[key] for name in self.COLUMNS}
+        return TransactionBatch(columns, self.dictionaries, self.txn_ids[key])
+
+    def filter(self, mask: np.ndarray) -> "TransactionBatch":
+        """Keep rows where mask is True (e.g. transactions that failed Layer 1)."""
+        return self[np.asarray(mask, dtype=bool)]
+
+    def take(self, indices: Sequence[int]) -> "TransactionBatch":
+        """Select rows by position."""
+        return self[np.asarray(indices, dtype=np.int64)]
+
+    def mask_from(self, subset: "TransactionBatch") -> np.ndarray:
+        """
+        Boolean mask over this batch marking rows present in a subset.
+
+        This batch must be the root batch and the subset must have been cut
+        from it (directly or through several filters), so its row_ids index
+        into this batch.
+        """
+        mask = np.zeros(len(self), dtype=bool)
+        mask[subset.row_id] = True
+        return mask
+
+    def rows_for_accounts(self, account_ids: Iterable[str]) -> np.ndarray:
+        """Boolean mask of rows sent by any of the given accounts."""
+        codes = [self.dictionaries.accounts.lookup(a) for a in account_ids]
+        return np.isin(self.sender_account, [c for c in codes if c >= 0])
+
+    # ==========================================================================
+    # MATERIALIZATION
+    # ==========================================================================
+
+    def decode(self, column: str) -> List[str]:
+        """Decode a dictionary-encoded column back into strings."""
+        dictionary = {
+            "sender_account": self.dictionaries.accounts,
+            "receiver_account": self.dictionaries.accounts,
+            "sender_bank": self.dictionaries.banks,
+            "receiver_bank": self.dictionaries.banks,
+            "currency_sent": self.dictionaries.currencies,
+            "currency_received": self.dictionaries.currencies,
+            "payment_format": self.dictionaries.payment_formats,
+        }[column]
+        return dictionary.decode_many(getattr(self, column))
+
+    def to_transactions(self) -> Iterator[Transaction]:
+        """
+        Materialize rows as Transaction models.
+
+        Intended for the few rows that reach per-transaction engines
+        (e.g. Layer 3), not for the whole batch.
+        """
+        sender_accounts = self.decode("sender_account")
+        receiver_accounts = self.decode("receiver_account")
+        sender_banks = self.decode("sender_bank")
+        receiver_banks = self.decode("receiver_bank")
+        currencies_sent = self.decode("currency_sent")
+        currencies_received = self.decode("currency_received")
+        formats = self.decode("payment_format")
+        timestamps = self.timestamp.astype("datetime64[s]").tolist()
+
+        for i in range(len(self)):
+            yield Transaction(
+                txn_id=self.txn_ids[i],
+                sender=TransactionParty(account_id=sender_accounts[i], bank_id=sender_banks[i]),
+                receiver=TransactionParty(account_id=receiver_accounts[i], bank_id=receiver_banks[i]),
+                amount=TransactionAmount(
+                    sent=float(self.amount_sent[i]),
+                    received=float(self.amount_received[i]),
+                    currency_sent=currencies_sent[i],
+                    currency_received=currencies_received[i],
+                ),
+                payment_format=formats[i],
+                timestamp=timestamps[i],
+                is_laundering=bool(self.is_laundering[i]),
+            )
+
+
+# =============================================================================
+# HELPERS
+# =============================================================================
+
+def _to_epoch_seconds(values: List[Any]) -> np.ndarray:
+    """Convert datetimes / ISO strings to int64 epoch seconds (missing -> 0)."""
+    converted = []
+    for value in values:
+        if isinstance(value, str) and value:
+            try:
+                value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+            except ValueError:
+                value = None
+        if isinstance(value, datetime):
+            if value.tzinfo is not None:
+                value = value.replace(tzinfo=None) - value.utcoffset()
+            converted.append(np.datetime64(value, "s"))
+        else:
+            converted.append(np.datetime64(0, "s"))
+    return np.array(converted, dtype="datetime64[s]").astype(np.int64)
@@ -2,13 +2,19 @@
 API Clients for AML Three-Layer Tribunal
 
 Provides singleton clients for OpenAI and Anthropic APIs.
+Each SDK is imported and its client created on first use.
 """
 
-from typing import Optional, List
-import anthropic
-from openai import OpenAI
+from typing import TYPE_CHECKING, Optional, List
 
-from shared.config import OPENAI_API_KEY, ANTHROPIC_API_KEY, EMBEDDING_MODEL
+from shared.config import (
+    OPENAI_API_KEY, ANTHROPIC_API_KEY, EMBEDDING_MODEL, EMBEDDING_DIMENSIONS, EMBEDDING_CACHE_RUNTIME,
+)
+from shared.embedding_cache import get_embedding_cache
+
+if TYPE_CHECKING:
+    import anthropic
+    from openai import OpenAI
 
 
 class APIClients:
@@ -22,77 +28,91 @@ class APIClients:
     """
 
     _instance: Optional["APIClients"] = None
-    _openai: Optional[OpenAI] = None
-    _anthropic: Optional[anthropic.Anthropic] = None
+    _openai: Optional["OpenAI"] = None
+    _anthropic: Optional["anthropic.Anthropic"] = None
 
     def __new__(cls) -> "APIClients":
         if cls._instance is None:
             cls._instance = super().__new__(cls)
         return cls._instance
 
-    def __init__(self):
+    @property
+    def openai(self) -> "OpenAI":
+        """Get the OpenAI client, creating it on first use."""
         if self._openai is None:
-            self._initialize_clients()
+            if not OPENAI_API_KEY:
+                raise ValueError("OpenAI API key not configured")
+            from openai import OpenAI
 
-    def _initialize_clients(self) -> None:
-        """Initialize API clients."""
-        if OPENAI_API_KEY:
             self._openai = OpenAI(api_key=OPENAI_API_KEY)
-
-        if ANTHROPIC_API_KEY:
-            self._anthropic = anthropic.Anthropic(api_key=ANTHROPIC_API_KEY)
-
-    @property
-    def openai(self) -> OpenAI:
-        """Get the OpenAI client."""
-        if self._openai is None:
-            raise ValueError("OpenAI API key not configured")
         return self._openai
 
     @property
-    def anthropic(self) -> anthropic.Anthropic:
-        """Get the Anthropic client."""
+    def anthropic(self) -> "anthropic.Anthropic":
+        """Get the Anthropic client, creating it on first use."""
         if self._anthropic is None:
-            raise ValueError("Anthropic API key not configured")
+            if not ANTHROPIC_API_KEY:
+                raise ValueError("Anthropic API key not configured")
+            import anthropic
+
+            self._anthropic = anthropic.Anthropic(api_key=ANTHROPIC_API_KEY)
         return self._anthropic
 
     # ==========================================================================
     # EMBEDDING METHODS
     # ==========================================================================
 
-    def get_embedding(self, text: str, model: str = EMBEDDING_MODEL) -> List[float]:
+    def get_embedding(
+        self,
+        text: str,
+        model: str = EMBEDDING_MODEL,
+        dimensions: int = EMBEDDING_DIMENSIONS,
+    ) -> List[float]:
         """
         Generate embedding for a single text.
 
         Args:
             text: Text to embed
             model: OpenAI embedding model to use
+            dimensions: Embedding dimensions to request
 
         Returns:
             List of floats representing the embedding vector
         """
-        response = self.openai.embeddings.create(
-            model=model,
-            input=text,
-        )
-        return response.data[0].embedding
+        return self.get_embeddings([text], model=model, dimensions=dimensions)[0]
 
-    def get_embeddings(self, texts: List[str], model: str = EMBEDDING_MODEL) -> List[List[float]]:
+    def get_embeddings(
+        self,
+        texts: List[str],
+        model: str = EMBEDDING_MODEL,
+        dimensions: int = EMBEDDING_DIMENSIONS,
+    ) -> List[List[float]]:
         """
         Generate embeddings for multiple texts.
 
+        With AML_EMBEDDING_CACHE_RUNTIME=1, texts already in the local
+        embedding cache are not sent to OpenAI (and new ones are added).
+
         Args:
             texts: List of texts to embed
             model: OpenAI embedding model to use
+            dimensions: Embedding dimensions to request
 
         Returns:
             List of embedding vectors
         """
-        response = self.openai.embeddings.create(
-            model=model,
-            input=texts,
-        )
-        return [item.embedding for item in response.data]
+        def request(batch: List[str]) -> List[List[float]]:
+            response = self.openai.embeddings.create(
+                model=model,
+                input=batch,
+                dimensions=dimensions,
+            )
+            return [item.embedding for item in response.data]
+
+        cache = get_embedding_cache(model, dimensions) if EMBEDDING_CACHE_RUNTIME else None
+        if cache is None:
+            return request(texts)
+        return cache.embed(texts, request)
 
     # ==========================================================================
     # CHAT METHODS
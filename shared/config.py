@@ -19,6 +19,13 @@ MONGODB_URI = os.environ.get(
 )
 DATABASE_NAME = "aml_db"
 
+# Connection pool settings shared by the sync and async MongoDB clients
+MONGODB_POOL_OPTIONS = {
+    "serverSelectionTimeoutMS": 30000,
+    "maxPoolSize": 50,
+    "minPoolSize": 10,
+}
+
 # Collection names
 COLLECTIONS = {
     "transactions": "transactions",
@@ -27,8 +34,13 @@ COLLECTIONS = {
     "regulatory_docs": "regulatory_docs",
     "cluster_baselines": "cluster_baselines",
     "account_embeddings": "account_embeddings",
+    "profile_templates": "profile_templates",
 }
 
+# Storage backend: "mongo" (Atlas) or "local" (embedded SQLite + NumPy vectors)
+STORAGE_BACKEND = os.environ.get("AML_STORAGE_BACKEND", "mongo")
+LOCAL_STORAGE_PATH = os.environ.get("AML_LOCAL_STORAGE_PATH", "aml_local.sqlite3")
+
 
 # =============================================================================
 # API KEYS
@@ -45,6 +57,22 @@ ANTHROPIC_API_KEY = os.environ.get("ANTHROPIC_API_KEY")
 EMBEDDING_MODEL = "text-embedding-3-small"
 EMBEDDING_DIMENSIONS = 1536
 
+# Local content-addressed embedding cache (shared/embedding_cache.py).
+# Lives in the per-user cache directory; an empty AML_EMBEDDING_CACHE_DIR
+# disables it, deleting the directory clears it. New vectors are no longer
+# stored once it reaches AML_EMBEDDING_CACHE_MAX_MB (0 = unbounded).
+# Ingestion always uses it; runtime queries only with AML_EMBEDDING_CACHE_RUNTIME=1.
+EMBEDDING_CACHE_DIR = os.environ.get(
+    "AML_EMBEDDING_CACHE_DIR",
+    os.path.join(
+        os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"),
+        "aml-tribunal",
+        "embeddings",
+    ),
+)
+EMBEDDING_CACHE_MAX_MB = int(os.environ.get("AML_EMBEDDING_CACHE_MAX_MB", "1024"))
+EMBEDDING_CACHE_RUNTIME = os.environ.get("AML_EMBEDDING_CACHE_RUNTIME", "") == "1"
+
 LLM_MODEL = "claude-sonnet-4-20250514"  # For Expert Agent reasoning
 
 
@@ -161,6 +189,10 @@ TYPOLOGIES = {
     },
 }
 
+# Optional JSON file replacing the built-in typology rules (engines/expert/rules.py);
+# re-read whenever its modification time changes
+TYPOLOGY_RULES_PATH = os.environ.get("AML_TYPOLOGY_RULES_PATH", "")
+
 
 # =============================================================================
 # CONFIG CLASS
@@ -174,6 +206,7 @@ class Config:
     mongodb_uri: str = MONGODB_URI
     database_name: str = DATABASE_NAME
     collections: Dict[str, str] = field(default_factory=lambda: COLLECTIONS)
+    storage_backend: str = STORAGE_BACKEND
 
     # API Keys
     openai_api_key: str = OPENAI_API_KEY
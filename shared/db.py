@@ -2,21 +2,29 @@
 MongoDB Connection Pool for AML Three-Layer Tribunal
 
 Provides a singleton connection manager used across all engines.
+The client (and pymongo itself) is only loaded on first use, so importing
+this module or constructing the manager never touches the network.
 """
 
-import certifi
-from typing import Optional
-from pymongo import MongoClient
-from pymongo.database import Database
-from pymongo.collection import Collection
+import threading
+from itertools import groupby
+from typing import TYPE_CHECKING, Optional, Dict, List, Any, Iterable, Iterator
 
-from shared.config import MONGODB_URI, DATABASE_NAME, COLLECTIONS
+from shared.config import MONGODB_URI, DATABASE_NAME, COLLECTIONS, MONGODB_POOL_OPTIONS
+
+if TYPE_CHECKING:
+    from pymongo import MongoClient
+    from pymongo.database import Database
+    from pymongo.collection import Collection
 
 
 class MongoDBConnection:
     """
     Singleton MongoDB connection manager.
 
+    Construction is free: the MongoClient is created on first access and
+    readiness is checked explicitly with ping().
+
     Usage:
         db = MongoDBConnection()
         transactions = db.transactions
@@ -24,40 +32,43 @@ class MongoDBConnection:
     """
 
     _instance: Optional["MongoDBConnection"] = None
-    _client: Optional[MongoClient] = None
-    _database: Optional[Database] = None
+    _client: Optional["MongoClient"] = None
+    _database: Optional["Database"] = None
+    _lock = threading.Lock()
 
     def __new__(cls) -> "MongoDBConnection":
         if cls._instance is None:
             cls._instance = super().__new__(cls)
         return cls._instance
 
-    def __init__(self):
-        if self._client is None:
-            self._connect()
-
     def _connect(self) -> None:
-        """Establish connection to MongoDB Atlas."""
-        self._client = MongoClient(
-            MONGODB_URI,
-            serverSelectionTimeoutMS=30000,
-            tlsCAFile=certifi.where(),  # Required for macOS SSL
-            maxPoolSize=50,
-            minPoolSize=10,
-        )
-        self._database = self._client[DATABASE_NAME]
-
-        # Verify connection
-        self._client.admin.command("ping")
+        """Create the client for MongoDB Atlas (connects in the background)."""
+        import certifi
+        from pymongo import MongoClient
+
+        with self._lock:
+            if self._client is not None:
+                return
+            client = MongoClient(
+                MONGODB_URI,
+                tlsCAFile=certifi.where(),  # Required for macOS SSL
+                **MONGODB_POOL_OPTIONS,
+            )
+            self._database = client[DATABASE_NAME]
+            self._client = client
 
     @property
-    def client(self) -> MongoClient:
-        """Get the MongoClient instance."""
+    def client(self) -> "MongoClient":
+        """Get the MongoClient instance, creating it on first use."""
+        if self._client is None:
+            self._connect()
         return self._client
 
     @property
-    def database(self) -> Database:
-        """Get the database instance."""
+    def database(self) -> "Database":
+        """Get the database instance, creating the client on first use."""
+        if self._client is None:
+            self._connect()
         return self._database
 
     # ==========================================================================
@@ -65,42 +76,47 @@ class MongoDBConnection:
     # ==========================================================================
 
     @property
-    def transactions(self) -> Collection:
+    def transactions(self) -> "Collection":
         """Get the transactions collection (5M+ docs)."""
-        return self._database[COLLECTIONS["transactions"]]
+        return self.database[COLLECTIONS["transactions"]]
 
     @property
-    def accounts(self) -> Collection:
+    def accounts(self) -> "Collection":
         """Get the accounts collection (515K+ docs)."""
-        return self._database[COLLECTIONS["accounts"]]
+        return self.database[COLLECTIONS["accounts"]]
 
     @property
-    def banks(self) -> Collection:
+    def banks(self) -> "Collection":
         """Get the banks collection (30K+ docs)."""
-        return self._database[COLLECTIONS["banks"]]
+        return self.database[COLLECTIONS["banks"]]
 
     @property
-    def regulatory_docs(self) -> Collection:
+    def regulatory_docs(self) -> "Collection":
         """Get the regulatory_docs collection (vector embeddings)."""
-        return self._database[COLLECTIONS["regulatory_docs"]]
+        return self.database[COLLECTIONS["regulatory_docs"]]
 
     @property
-    def cluster_baselines(self) -> Collection:
+    def cluster_baselines(self) -> "Collection":
         """Get the cluster_baselines collection (for Statistical Engine)."""
-        return self._database[COLLECTIONS["cluster_baselines"]]
+        return self.database[COLLECTIONS["cluster_baselines"]]
 
     @property
-    def account_embeddings(self) -> Collection:
+    def account_embeddings(self) -> "Collection":
         """Get the account_embeddings collection (for Narrative Engine)."""
-        return self._database[COLLECTIONS["account_embeddings"]]
+        return self.database[COLLECTIONS["account_embeddings"]]
 
     # ==========================================================================
     # UTILITY METHODS
     # ==========================================================================
 
-    def get_collection(self, name: str) -> Collection:
+    def get_collection(self, name: str) -> "Collection":
         """Get a collection by name."""
-        return self._database[name]
+        return self.database[name]
+
+    @property
+    def connected(self) -> bool:
+        """Whether the client has been created (no network check)."""
+        return self._client is not None
 
     def close(self) -> None:
         """Close the connection."""
@@ -110,10 +126,22 @@ class MongoDBConnection:
             self._database = None
             MongoDBConnection._instance = None
 
-    def ping(self) -> bool:
-        """Check if connection is alive."""
+    def ping(self, timeout: Optional[float] = None) -> bool:
+        """
+        Readiness probe: check that the cluster answers a ping.
+
+        Args:
+            timeout: Seconds to wait (defaults to the client's server
+                selection timeout)
+
+        Returns:
+            True if the server responded
+        """
+        import pymongo
+
         try:
-            self._client.admin.command("ping")
+            with pymongo.timeout(timeout):
+                self.client.admin.command("ping")
             return True
         except Exception:
             return False
@@ -128,16 +156,215 @@ def get_db() -> MongoDBConnection:
     return MongoDBConnection()
 
 
-def get_transactions() -> Collection:
+def get_transactions() -> "Collection":
     """Get the transactions collection."""
     return get_db().transactions
 
 
-def get_accounts() -> Collection:
+def get_accounts() -> "Collection":
     """Get the accounts collection."""
     return get_db().accounts
 
 
-def get_regulatory_docs() -> Collection:
+def get_regulatory_docs() -> "Collection":
     """Get the regulatory_docs collection."""
     return get_db().regulatory_docs
+
+
+# =============================================================================
+# BULK HISTORY ACCESS
+# =============================================================================
+
+# Only the fields the engines and scripts read from a transaction
+HISTORY_PROJECTION = {
+    "_id": 0,
+    "txn_id": 1,
+    "timestamp": 1,
+    "sender.account_id": 1,
+    "sender.bank_id": 1,
+    "receiver.account_id": 1,
+    "receiver.bank_id": 1,
+    "amount.sent": 1,
+    "amount.received": 1,
+    "amount.currency_sent": 1,
+    "amount.currency_received": 1,
+    "payment_format": 1,
+    "is_laundering": 1,
+}
+
+# Leading (sender.account_id, timestamp) serves the $in + sort; the remaining
+# keys make the index covering for HISTORY_PROJECTION (no document fetches).
+# Directions are pymongo.ASCENDING (1), spelled out to keep pymongo unimported.
+HISTORY_INDEX_NAME = "sender_history_covering"
+HISTORY_INDEX_KEYS = [
+    ("sender.account_id", 1),
+    ("timestamp", 1),
+] + [
+    (name, 1)
+    for name in HISTORY_PROJECTION
+    if name not in ("_id", "sender.account_id", "timestamp")
+]
+
+# Accounts per $in query (keeps query documents well under the 16MB limit)
+HISTORY_QUERY_CHUNK = 1000
+
+
+def ensure_history_index(transactions: "Collection") -> str:
+    """Create the covering index used by fetch_account_histories."""
+    return transactions.create_index(HISTORY_INDEX_KEYS, name=HISTORY_INDEX_NAME)
+
+
+def history_chunks(account_ids: Iterable[str]) -> Iterator[List[str]]:
+    """Split (deduplicated) account IDs into $in-sized chunks."""
+    account_ids = list(dict.fromkeys(account_ids))
+    for start in range(0, len(account_ids), HISTORY_QUERY_CHUNK):
+        yield account_ids[start:start + HISTORY_QUERY_CHUNK]
+
+
+def history_match(chunk: List[str], extra_filter: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Match stage for a chunk of sender accounts."""
+    return {"sender.account_id": {"$in": chunk}, **(extra_filter or {})}
+
+
+def history_pipeline(
+    chunk: List[str],
+    limit_per_account: int,
+    extra_filter: Optional[Dict[str, Any]] = None,
+    projection: Optional[Dict[str, Any]] = None,
+) -> List[Dict[str, Any]]:
+    """Aggregation returning the first N transactions per account ($firstN: MongoDB 5.2+)."""
+    return [
+        {"$match": history_match(chunk, extra_filter)},
+        {"$sort": dict(HISTORY_INDEX_KEYS[:2])},
+        {"$project": projection or HISTORY_PROJECTION},
+        {"$group": {
+            "_id": "$sender.account_id",
+            "transactions": {"$firstN": {"input": "$$ROOT", "n": limit_per_account}},
+        }},
+    ]
+
+
+def count_pipeline(chunk: List[str], extra_filter: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    """Aggregation counting transactions per sender account."""
+    return [
+        {"$match": history_match(chunk, extra_filter)},
+        {"$group": {"_id": "$sender.account_id", "count": {"$sum": 1}}},
+    ]
+
+
+def vector_search_pipeline(
+    query_vector: List[float],
+    limit: int = 8,
+    source_filter: Optional[str] = None,
+    num_candidates: int = 100,
+    index_name: str = "vector_index",
+) -> List[Dict[str, Any]]:
+    """
+    Atlas $vectorSearch pipeline over the regulatory_docs collection.
+
+    A source filter matches a chunk's own source or any document listed in
+    its `sources` (collapsed near-duplicates keep one embedded copy).
+    """
+    pipeline = [
+        {
+            "$vectorSearch": {
+                "index": index_name,
+                "path": "embedding",
+                "queryVector": query_vector,
+                "numCandidates": num_candidates,
+                "limit": limit,
+            }
+        },
+        {
+            "$project": {
+                "text": 1,
+                "metadata": 1,
+                "sources": 1,
+                "score": {"$meta": "vectorSearchScore"},
+            }
+        },
+    ]
+
+    if source_filter:
+        pipeline[0]["$vectorSearch"]["filter"] = {
+            "$or": [{"metadata.source": source_filter}, {"sources.source": source_filter}]
+        }
+
+    return pipeline
+
+
+def fetch_account_histories(
+    db,
+    account_ids: Iterable[str],
+    extra_filter: Optional[Dict[str, Any]] = None,
+    limit_per_account: Optional[int] = None,
+    projection: Optional[Dict[str, Any]] = None,
+) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Fetch chronological transaction histories for many sender accounts.
+
+    Replaces one find() per account with one $in query per
+    HISTORY_QUERY_CHUNK accounts, sorted on the history index and grouped
+    client-side.
+
+    Args:
+        db: MongoDBConnection or pymongo Database
+        account_ids: Sender account IDs to fetch
+        extra_filter: Additional match conditions (e.g. {"is_laundering": False})
+        limit_per_account: Keep only the first N transactions per account
+        projection: Fields to return (defaults to HISTORY_PROJECTION)
+
+    Returns:
+        Dict of account_id -> transactions sorted by timestamp ascending.
+        Accounts without matching transactions map to an empty list.
+    """
+    account_ids = list(dict.fromkeys(account_ids))
+    histories: Dict[str, List[Dict[str, Any]]] = {a: [] for a in account_ids}
+
+    for chunk in history_chunks(account_ids):
+        if limit_per_account is None:
+            cursor = db.transactions.find(
+                history_match(chunk, extra_filter), projection or HISTORY_PROJECTION
+            ).sort(HISTORY_INDEX_KEYS[:2])
+            for account_id, txns in groupby(cursor, key=lambda t: t["sender"]["account_id"]):
+                histories[account_id].extend(txns)
+        else:
+            pipeline = history_pipeline(chunk, limit_per_account, extra_filter, projection)
+            for group in db.transactions.aggregate(pipeline, allowDiskUse=True):
+                histories[group["_id"]] = group["transactions"]
+
+    return histories
+
+
+def count_account_transactions(
+    db,
+    account_ids: Iterable[str],
+    extra_filter: Optional[Dict[str, Any]] = None,
+) -> Dict[str, int]:
+    """
+    Count transactions per sender account in one aggregation.
+
+    Args:
+        db: MongoDBConnection or pymongo Database
+        account_ids: Sender account IDs to count
+        extra_filter: Additional match conditions (e.g. {"is_laundering": True})
+
+    Returns:
+        Dict of account_id -> count (0 for accounts without matches)
+    """
+    account_ids = list(dict.fromkeys(account_ids))
+    counts = {a: 0 for a in account_ids}
+
+    for chunk in history_chunks(account_ids):
+        for group in db.transactions.aggregate(count_pipeline(chunk, extra_filter)):
+            counts[group["_id"]] = group["count"]
+
+    return counts
+
+
+def load_cluster_baselines(db) -> Dict[int, Dict[str, Any]]:
+    """Load all peer group baselines, keyed by cluster_id."""
+    return {
+        doc["cluster_id"]: doc
+        for doc in db.cluster_baselines.find({}, {"_id": 0})
+    }
@@ -0,0 +1,144 @@
+"""
+Near-Duplicate Text Detection for AML Three-Layer Tribunal
+
+MinHash signatures over word shingles with LSH banding, used to collapse
+near-identical regulatory chunks (the same PDF in two folders, a
+re-issued recommendation set) before they crowd the vector index.
+
+Usage:
+    groups = near_duplicate_groups(texts, threshold=0.9)
+    # [[0, 7], [3, 4, 12], ...] indices of texts that are near duplicates
+"""
+
+import re
+import zlib
+from collections import defaultdict
+from typing import List, Iterable
+
+import numpy as np
+
+
+DEFAULT_PERMUTATIONS = 128
+DEFAULT_BANDS = 32  # 4 rows per band: candidate pairs from ~0.45 Jaccard
+SHINGLE_WORDS = 5
+
+_WORD = re.compile(r"\w+")
+
+
+def shingles(text: str, size: int = SHINGLE_WORDS) -> np.ndarray:
+    """
+    Hashed word shingles of a text (case and punctuation insensitive).
+
+    Args:
+        text: Input text
+        size: Words per shingle
+
+    Returns:
+        Unique 32-bit shingle hashes as uint64
+    """
+    words = _WORD.findall(text.lower())
+    if len(words) <= size:
+        grams = [" ".join(words)]
+    else:
+        grams = [" ".join(words[i:i + size]) for i in range(len(words) - size + 1)]
+    return np.unique(np.fromiter(
+        (zlib.crc32(g.encode("utf-8")) for g in grams), dtype=np.uint64, count=len(grams)
+    ))
+
+
+def minhash_signatures(
+    texts: Iterable[str],
+    num_perm: int = DEFAULT_PERMUTATIONS,
+    seed: int = 1,
+) -> np.ndarray:
+    """
+    MinHash signature of each text.
+
+    Permutations are multiply-shift hashes of the shingle hashes; the
+    fraction of equal signature positions estimates Jaccard similarity.
+
+    Args:
+        texts: Texts to sign
+        num_perm: Signature length
+        seed: Seed for the hash family (signatures are only comparable
+            with the same seed and length)
+
+    Returns:
+        (n_texts, num_perm) uint64 array
+    """
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, 2**63, size=num_perm, dtype=np.uint64) | np.uint64(1)
+    b = rng.integers(0, 2**63, size=num_perm, dtype=np.uint64)
+
+    signatures = []
+    with np.errstate(over="ignore"):
+        for text in texts:
+            hashes = shingles(text)
+            signatures.append(((a[:, None] * hashes[None, :] + b[:, None]) >> np.uint64(32)).min(axis=1))
+    if not signatures:
+        return np.empty((0, num_perm), dtype=np.uint64)
+    return np.stack(signatures)
+
+
+def near_duplicate_groups(
+    texts: List[str],
+    threshold: float = 0.9,
+    num_perm: int = DEFAULT_PERMUTATIONS,
+    bands: int = DEFAULT_BANDS,
+) -> List[List[int]]:
+    """
+    Group texts whose estimated Jaccard similarity is at least `threshold`.
+
+    LSH banding proposes candidate pairs; each candidate is confirmed on
+    the full signature. Groups are connected components of confirmed
+    pairs.
+
+    Args:
+        texts: Texts to compare
+        threshold: Minimum estimated Jaccard similarity of word shingles
+        num_perm: Signature length (must be divisible by bands)
+        bands: LSH bands
+
+    Returns:
+        Groups of two or more indices (ascending), ordered by first index
+    """
+    if num_perm % bands:
+        raise ValueError(f"num_perm ({num_perm}) must be divisible by bands ({bands})")
+
+    signatures = minhash_signatures(texts, num_perm)
+    rows = num_perm // bands
+
+    parent = list(range(len(texts)))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    checked = set()
+    for band in range(bands):
+        buckets = defaultdict(list)
+        for i, key in enumerate(map(bytes, signatures[:, band * rows:(band + 1) * rows])):
+            buckets[key].append(i)
+
+        for members in buckets.values():
+            # Compare each member with one representative per group seen so far
+            representatives: List[int] = []
+            for member in members:
+                for rep in representatives:
+                    if find(rep) == find(member):
+                        break
+                    if (rep, member) in checked:
+                        continue
+                    checked.add((rep, member))
+                    if np.mean(signatures[rep] == signatures[member]) >= threshold:
+                        parent[find(member)] = find(rep)
+                        break
+                else:
+                    representatives.append(member)
+
+    groups = defaultdict(list)
+    for i in range(len(texts)):
+        groups[find(i)].append(i)
+    return sorted((g for g in groups.values() if len(g) > 1), key=lambda g: g[0])
@@ -0,0 +1,296 @@
+"""
+Persistent Embedding Cache for AML Three-Layer Tribunal
+
+Content-addressed store of OpenAI embeddings, keyed by
+(model, dimensions, sha256(text)). Ingestion and runtime queries consult
+it before calling the API, so repeated boilerplate and duplicated PDFs
+are embedded once.
+
+Layout (one pair of files per model and dimensions):
+    <dir>/text-embedding-3-small-1536.f32   row-major float32 vectors
+    <dir>/text-embedding-3-small-1536.keys  32-byte sha256 digest per row
+
+Both files are append-only. Vectors are read through a memory map, so
+opening a large cache costs only the key index. Appends hold an exclusive
+file lock (where available), so several processes can share a directory.
+
+The directory defaults to a per-user cache location (EMBEDDING_CACHE_DIR).
+Once the vectors file reaches EMBEDDING_CACHE_MAX_MB, new embeddings are
+returned but not stored; delete the directory to clear the cache.
+
+Usage:
+    cache = get_embedding_cache()
+    vectors = cache.embed(texts, lambda missing: call_openai(missing))
+"""
+
+import hashlib
+import os
+import threading
+from pathlib import Path
+from typing import Optional, Dict, List, Callable, Tuple, Union
+
+import numpy as np
+
+from shared.config import EMBEDDING_MODEL, EMBEDDING_DIMENSIONS, EMBEDDING_CACHE_DIR, EMBEDDING_CACHE_MAX_MB
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process use only
+    fcntl = None
+
+
+KEY_BYTES = 32  # sha256 digest
+
+
+def text_key(text: str) -> bytes:
+    """Cache key of a text (sha256 of its UTF-8 bytes)."""
+    return hashlib.sha256(text.encode("utf-8")).digest()
+
+
+class EmbeddingCache:
+    """
+    Append-only embedding store for one model and dimension count.
+
+    Thread-safe. Concurrent `embed` calls for the same text share one API
+    request instead of racing each other.
+    """
+
+    def __init__(
+        self,
+        directory: Union[str, Path],
+        model: str = EMBEDDING_MODEL,
+        dimensions: int = EMBEDDING_DIMENSIONS,
+        max_bytes: Optional[int] = None,
+    ):
+        """
+        Args:
+            directory: Cache directory (created if missing)
+            model: Embedding model name
+            dimensions: Embedding dimensions
+            max_bytes: Stop storing new vectors once the vectors file would
+                exceed this size (None = unbounded)
+        """
+        self.directory = Path(directory)
+        self.model = model
+        self.dimensions = dimensions
+        self.max_bytes = max_bytes
+
+        stem = f"{model.replace('/', '_')}-{dimensions}"
+        self.vectors_path = self.directory / f"{stem}.f32"
+        self.keys_path = self.directory / f"{stem}.keys"
+
+        self._lock = threading.Lock()
+        self._rows: Dict[bytes, int] = {}
+        self._count = 0  # rows indexed (a key appended twice keeps its first row)
+        self._matrix: Optional[np.ndarray] = None
+        self._pending: Dict[bytes, threading.Event] = {}
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.keys_path.touch(exist_ok=True)
+        self.vectors_path.touch(exist_ok=True)
+        with self._lock:
+            self._refresh()
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    # ==========================================================================
+    # FILE ACCESS
+    # ==========================================================================
+
+    def _complete_rows(self) -> int:
+        """Rows present in both files (a crashed append may leave one longer)."""
+        row_bytes = 4 * self.dimensions
+        return min(
+            self.keys_path.stat().st_size // KEY_BYTES,
+            self.vectors_path.stat().st_size // row_bytes,
+        )
+
+    def _refresh(self) -> None:
+        """Index rows appended since the last refresh (by any process)."""
+        rows = self._complete_rows()
+        known = self._count
+        if rows <= known:
+            return
+
+        with open(self.keys_path, "rb") as f:
+            f.seek(known * KEY_BYTES)
+            data = f.read((rows - known) * KEY_BYTES)
+        for i in range(rows - known):
+            self._rows.setdefault(data[i * KEY_BYTES:(i + 1) * KEY_BYTES], known + i)
+        self._count = rows
+
+    def _vectors(self) -> np.ndarray:
+        """Memory map over all indexed rows."""
+        rows = self._count
+        if self._matrix is None or self._matrix.shape[0] < rows:
+            self._matrix = np.memmap(
+                self.vectors_path, dtype=np.float32, mode="r", shape=(rows, self.dimensions)
+            ) if rows else np.empty((0, self.dimensions), dtype=np.float32)
+        return self._matrix
+
+    def _append(self, keys: List[bytes], vectors: np.ndarray) -> None:
+        """Append rows, truncating any partial row left by a crashed writer."""
+        with open(self.keys_path, "r+b") as keys_file, open(self.vectors_path, "r+b") as vectors_file:
+            if fcntl is not None:
+                fcntl.flock(keys_file, fcntl.LOCK_EX)
+            try:
+                self._refresh()
+                new = [(k, v) for k, v in zip(keys, vectors) if k not in self._rows]
+                if not new:
+                    return
+
+                rows = self._complete_rows()
+                keys_file.truncate(rows * KEY_BYTES)
+                vectors_file.truncate(rows * 4 * self.dimensions)
+
+                if self.max_bytes is not None:
+                    room = self.max_bytes // (4 * self.dimensions) - rows
+                    new = new[:max(room, 0)]
+                    if not new:
+                        return
+
+                vectors_file.seek(0, os.SEEK_END)
+                vectors_file.write(np.stack([v for _, v in new]).tobytes())
+                vectors_file.flush()
+                keys_file.seek(0, os.SEEK_END)
+                keys_file.write(b"".join(k for k, _ in new))
+                keys_file.flush()
+
+                for i, (key, _) in enumerate(new):
+                    self._rows[key] = rows + i
+                self._count = rows + len(new)
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(keys_file, fcntl.LOCK_UN)
+
+    # ==========================================================================
+    # PUBLIC API
+    # ==========================================================================
+
+    def get_many(self, texts: List[str]) -> List[Optional[List[float]]]:
+        """Cached embeddings for texts (None where not cached)."""
+        keys = [text_key(t) for t in texts]
+        with self._lock:
+            if any(k not in self._rows for k in keys):
+                self._refresh()
+            return self._lookup(keys)
+
+    def _lookup(self, keys: List[bytes]) -> List[Optional[List[float]]]:
+        matrix = self._vectors()
+        return [
+            matrix[self._rows[k]].tolist() if k in self._rows else None
+            for k in keys
+        ]
+
+    def put_many(self, texts: List[str], embeddings: List[List[float]]) -> None:
+        """Store embeddings for texts (already cached texts are ignored)."""
+        if not texts:
+            return
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        if vectors.shape != (len(texts), self.dimensions):
+            raise ValueError(
+                f"Expected {len(texts)} embeddings of {self.dimensions} dimensions, got {vectors.shape}"
+            )
+        with self._lock:
+            self._append([text_key(t) for t in texts], vectors)
+
+    def embed(
+        self,
+        texts: List[str],
+        embed_fn: Callable[[List[str]], List[List[float]]],
+    ) -> List[List[float]]:
+        """
+        Embed texts, calling `embed_fn` only for texts not cached yet.
+
+        Duplicates within `texts`, and texts another thread is embedding
+        right now, are not sent again.
+
+        Args:
+            texts: Texts to embed
+            embed_fn: Embeds a list of texts (one API request)
+
+        Returns:
+            Embeddings in the order of `texts`
+        """
+        keys = [text_key(t) for t in texts]
+        owned: Dict[bytes, str] = {}
+        waiting: Dict[bytes, threading.Event] = {}
+        event = threading.Event()
+
+        with self._lock:
+            if any(k not in self._rows for k in keys):
+                self._refresh()
+            for key, text in zip(keys, texts):
+                if key in self._rows or key in owned or key in waiting:
+                    continue
+                if key in self._pending:
+                    waiting[key] = self._pending[key]
+                else:
+                    owned[key] = text
+                    self._pending[key] = event
+
+        fresh: Dict[str, List[float]] = {}
+        try:
+            if owned:
+                missing = list(owned.values())
+                fresh = dict(zip(missing, embed_fn(missing)))
+                self.put_many(missing, [fresh[t] for t in missing])
+        finally:
+            with self._lock:
+                for key in owned:
+                    self._pending.pop(key, None)
+            event.set()
+
+        for other in set(waiting.values()):
+            other.wait()
+
+        with self._lock:
+            result = self._lookup(keys)
+        # Embedded here but not stored (cache full)
+        result = [fresh.get(t) if v is None else v for t, v in zip(texts, result)]
+
+        # Texts another thread failed to embed (or could not store)
+        retry = [t for t, v in zip(texts, result) if v is None]
+        if retry:
+            embedded = dict(zip(retry, self.embed(retry, embed_fn)))
+            result = [v if v is not None else embedded[t] for t, v in zip(texts, result)]
+        return result
+
+
+# =============================================================================
+# CONVENIENCE FUNCTIONS
+# =============================================================================
+
+_caches: Dict[Tuple[str, str, int], EmbeddingCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_embedding_cache(
+    model: str = EMBEDDING_MODEL,
+    dimensions: int = EMBEDDING_DIMENSIONS,
+    directory: Optional[Union[str, Path]] = None,
+) -> Optional[EmbeddingCache]:
+    """
+    Get the shared cache for a model, or None if caching is disabled.
+
+    Args:
+        model: Embedding model name
+        dimensions: Embedding dimensions requested from the API
+        directory: Cache directory (defaults to EMBEDDING_CACHE_DIR; an
+            empty value disables caching)
+
+    Returns:
+        EmbeddingCache instance (one per directory, model and dimensions),
+        bounded by EMBEDDING_CACHE_MAX_MB
+    """
+    directory = EMBEDDING_CACHE_DIR if directory is None else directory
+    if not directory:
+        return None
+
+    max_bytes = EMBEDDING_CACHE_MAX_MB * 1024 * 1024 if EMBEDDING_CACHE_MAX_MB > 0 else None
+    key = (str(Path(directory).resolve()), model, dimensions)
+    with _caches_lock:
+        if key not in _caches:
+            _caches[key] = EmbeddingCache(directory, model, dimensions, max_bytes=max_bytes)
+        return _caches[key]
@@ -0,0 +1,216 @@
+"""
+Score Evaluation for AML Three-Layer Tribunal
+
+Threshold-free evaluation of anomaly scores against is_laundering labels.
+Scores are sorted once; every threshold, curve point and alert budget is
+then read off cumulative counts, so a full sweep costs O(N log N) instead
+of one pass over the results per threshold.
+
+Conventions:
+- Higher score = more suspicious
+- A transaction is flagged at threshold t when score > t (as in the
+  experiment scripts); ROC/PR curves use score >= t like scikit-learn
+
+Usage:
+    curve = score_curve(scores.total_error, scores.is_laundering)
+    curve.roc_auc(), curve.average_precision()
+    metrics = EvaluationMetrics.from_scores(scores.total_error, scores.is_laundering, 1.5)
+"""
+
+from dataclasses import dataclass
+from typing import List, Sequence, Tuple, Union
+
+import numpy as np
+
+from shared.models import EvaluationMetrics
+
+
+ArrayLike = Union[np.ndarray, Sequence[float]]
+
+
+def _as_arrays(scores: ArrayLike, labels: ArrayLike) -> Tuple[np.ndarray, np.ndarray]:
+    scores = np.asarray(scores, dtype=np.float64)
+    labels = np.asarray(labels, dtype=bool)
+    if scores.shape != labels.shape or scores.ndim != 1:
+        raise ValueError(f"scores {scores.shape} and labels {labels.shape} must be 1-D and equal length")
+    return scores, labels
+
+
+# =============================================================================
+# CURVES
+# =============================================================================
+
+@dataclass
+class ScoreCurve:
+    """
+    Cumulative confusion counts at every distinct score.
+
+    Entry i describes flagging everything with score >= thresholds[i]
+    (thresholds descending, so tp/fp are non-decreasing).
+    """
+    thresholds: np.ndarray  # float64, distinct scores, descending
+    tp: np.ndarray          # int64
+    fp: np.ndarray          # int64
+    positives: int
+    negatives: int
+
+    @property
+    def tpr(self) -> np.ndarray:
+        """True positive rate (recall) at each threshold."""
+        return self.tp / self.positives if self.positives else np.zeros(len(self.tp))
+
+    @property
+    def fpr(self) -> np.ndarray:
+        """False positive rate at each threshold."""
+        return self.fp / self.negatives if self.negatives else np.zeros(len(self.fp))
+
+    @property
+    def precision(self) -> np.ndarray:
+        """Precision at each threshold."""
+        flagged = self.tp + self.fp
+        return np.divide(self.tp, flagged, out=np.zeros(len(flagged)), where=flagged > 0)
+
+    def roc_curve(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(fpr, tpr, thresholds), starting from the (0, 0) point at +inf."""
+        return (
+            np.r_[0.0, self.fpr],
+            np.r_[0.0, self.tpr],
+            np.r_[np.inf, self.thresholds],
+        )
+
+    def pr_curve(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(precision, recall, thresholds) in order of increasing threshold."""
+        precision = self.precision[::-1]
+        recall = self.tpr[::-1]
+        return np.r_[precision, 1.0], np.r_[recall, 0.0], self.thresholds[::-1]
+
+    def roc_auc(self) -> float:
+        """Area under the ROC curve (trapezoidal; ties count half)."""
+        if not self.positives or not self.negatives:
+            return float("nan")
+        fpr, tpr, _ = self.roc_curve()
+        return float(np.sum(np.diff(fpr) * (tpr[1:] + tpr[:-1]) / 2))
+
+    def average_precision(self) -> float:
+        """Average precision: sum over thresholds of precision * recall gained."""
+        if not self.positives:
+            return float("nan")
+        recall = np.r_[0.0, self.tpr]
+        return float(np.sum(np.diff(recall) * self.precision))
+
+
+def score_curve(scores: ArrayLike, labels: ArrayLike) -> ScoreCurve:
+    """
+    Sort scores once and accumulate confusion counts per distinct score.
+
+    Args:
+        scores: Anomaly scores (higher = more suspicious)
+        labels: True for laundering
+
+    Returns:
+        ScoreCurve over every distinct score
+    """
+    scores, labels = _as_arrays(scores, labels)
+    order = np.argsort(-scores, kind="stable")
+    sorted_scores = scores[order]
+    sorted_labels = labels[order]
+
+    # Last index of each run of equal scores
+    ends = np.flatnonzero(np.r_[sorted_scores[1:] != sorted_scores[:-1], True]) if len(scores) else np.empty(0, dtype=np.int64)
+    tp = np.cumsum(sorted_labels, dtype=np.int64)[ends]
+    fp = (ends + 1) - tp
+
+    positives = int(labels.sum())
+    return ScoreCurve(
+        thresholds=sorted_scores[ends],
+        tp=tp,
+        fp=fp,
+        positives=positives,
+        negatives=len(labels) - positives,
+    )
+
+
+def roc_auc(scores: ArrayLike, labels: ArrayLike) -> float:
+    """Area under the ROC curve."""
+    return score_curve(scores, labels).roc_auc()
+
+
+def average_precision(scores: ArrayLike, labels: ArrayLike) -> float:
+    """Area under the precision-recall curve (step-wise, like sklearn)."""
+    return score_curve(scores, labels).average_precision()
+
+
+# =============================================================================
+# THRESHOLDS & BUDGETS
+# =============================================================================
+
+def threshold_sweep(
+    scores: ArrayLike,
+    labels: ArrayLike,
+    thresholds: ArrayLike,
+) -> List[EvaluationMetrics]:
+    """
+    Confusion matrix for flagging `score > t` at each threshold.
+
+    One sort plus a binary search per threshold (O((N + T) log N)).
+
+    Args:
+        scores: Anomaly scores
+        labels: True for laundering
+        thresholds: Thresholds to evaluate
+
+    Returns:
+        EvaluationMetrics per threshold, in the given order
+    """
+    scores, labels = _as_arrays(scores, labels)
+    order = np.argsort(scores, kind="stable")
+    sorted_scores = scores[order]
+    # Positives at or below each position, in ascending score order
+    positives_below = np.r_[0, np.cumsum(labels[order], dtype=np.int64)]
+
+    below = np.searchsorted(sorted_scores, np.asarray(thresholds, dtype=np.float64), side="right")
+    positives = int(positives_below[-1])
+    negatives = len(scores) - positives
+
+    metrics = []
+    for count_below in below.tolist():
+        fn = int(positives_below[count_below])
+        tn = count_below - fn
+        metrics.append(EvaluationMetrics(
+            true_positives=positives - fn,
+            false_positives=negatives - tn,
+            true_negatives=tn,
+            false_negatives=fn,
+        ))
+    return metrics
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k highest scores (ties broken by position)."""
+    k = max(0, min(k, len(scores)))
+    return np.argsort(-scores, kind="stable")[:k]
+
+
+def precision_at_k(scores: ArrayLike, labels: ArrayLike, k: int) -> float:
+    """Share of laundering among the k highest-scoring transactions."""
+    scores, labels = _as_arrays(scores, labels)
+    top = _top_k(scores, k)
+    return float(labels[top].mean()) if len(top) else 0.0
+
+
+def recall_at_budget(scores: ArrayLike, labels: ArrayLike, budget: Union[int, float]) -> float:
+    """
+    Share of all laundering caught when investigators review a fixed budget.
+
+    Args:
+        scores: Anomaly scores
+        labels: True for laundering
+        budget: Number of alerts (int), or a fraction of all transactions (float < 1)
+
+    Returns:
+        Recall within the top-`budget` scores
+    """
+    scores, labels = _as_arrays(scores, labels)
+    k = int(round(budget * len(scores))) if isinstance(budget, float) and budget < 1 else int(budget)
+    positives = labels.sum()
+    return float(labels[_top_k(scores, k)].sum() / positives) if positives else 0.0
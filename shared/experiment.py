@@ -0,0 +1,192 @@
+"""
+Experiment Harness for AML Three-Layer Tribunal
+
+Shared plumbing for the offline experiment scripts:
+- Seeded, stratified sampling of laundering vs clean accounts, so two runs
+  with the same seed and population study the same accounts
+- Account sharding over a process pool
+- Per-shard checkpoints on disk, so an interrupted run resumes where it
+  stopped instead of starting over
+
+Usage:
+    sample = stratified_sample(laundering_ids, clean_ids, 25_000, 25_000, seed=42)
+    results = run_sharded(sample.accounts, score_shard, checkpoint_dir="checkpoints/exp1")
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import random
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Iterable, List, Optional, Sequence, Union
+
+
+DEFAULT_SEED = 42
+DEFAULT_SHARD_SIZE = 1000
+
+
+# =============================================================================
+# SAMPLING
+# =============================================================================
+
+@dataclass
+class Sample:
+    """Accounts drawn for an experiment, split by label."""
+    laundering: List[str] = field(default_factory=list)
+    clean: List[str] = field(default_factory=list)
+    seed: int = DEFAULT_SEED
+
+    @property
+    def accounts(self) -> List[str]:
+        """All sampled accounts, laundering first."""
+        return self.laundering + self.clean
+
+
+def _draw(population: Iterable[str], size: Optional[int], rng: random.Random) -> List[str]:
+    # Sorting first makes the draw independent of query/result order
+    candidates = sorted(set(population))
+    if size is None or size >= len(candidates):
+        return candidates
+    return sorted(rng.sample(candidates, size))
+
+
+def stratified_sample(
+    laundering_ids: Iterable[str],
+    clean_ids: Iterable[str],
+    n_laundering: Optional[int],
+    n_clean: Optional[int],
+    seed: int = DEFAULT_SEED,
+) -> Sample:
+    """
+    Draw a reproducible sample from each stratum.
+
+    Args:
+        laundering_ids: Accounts with at least one laundering transaction
+        clean_ids: Accounts with none (an account in both is treated as laundering)
+        n_laundering: Laundering accounts to draw (None = all)
+        n_clean: Clean accounts to draw (None = all)
+        seed: Random seed
+
+    Returns:
+        Sample with sorted account lists
+    """
+    rng = random.Random(seed)
+    laundering_ids = set(laundering_ids)
+    laundering = _draw(laundering_ids, n_laundering, rng)
+    clean = _draw((a for a in clean_ids if a not in laundering_ids), n_clean, rng)
+    return Sample(laundering=laundering, clean=clean, seed=seed)
+
+
+# =============================================================================
+# SHARDED EXECUTION
+# =============================================================================
+
+def make_shards(items: Sequence[Any], shard_size: int = DEFAULT_SHARD_SIZE) -> List[List[Any]]:
+    """Split items into consecutive shards (deterministic for a given order)."""
+    return [list(items[i:i + shard_size]) for i in range(0, len(items), shard_size)]
+
+
+def _run_key(shards: List[List[Any]], tag: str) -> str:
+    digest = hashlib.sha256(tag.encode())
+    for shard in shards:
+        digest.update(json.dumps(shard, default=str).encode())
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    with open(tmp, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def run_sharded(
+    items: Sequence[Any],
+    worker: Callable[[List[Any]], Any],
+    checkpoint_dir: Optional[Union[str, Path]] = None,
+    shard_size: int = DEFAULT_SHARD_SIZE,
+    workers: Optional[int] = None,
+    tag: str = "",
+    verbose: bool = True,
+) -> List[Any]:
+    """
+    Run `worker` over shards of `items` in a process pool.
+
+    With a checkpoint directory, every finished shard is pickled to
+    `shard_00000.pkl`, ... and skipped on the next run. A manifest records
+    the shard contents; reusing a directory for a different sample raises
+    instead of silently mixing results.
+
+    Args:
+        items: Work items (e.g. account IDs), already in a deterministic order
+        worker: Top-level (picklable) function processing one shard; it runs
+            in a child process, so it opens its own database connections
+        checkpoint_dir: Directory for shard results (None = no checkpoints)
+        shard_size: Items per shard
+        workers: Processes (defaults to the CPU count; 1 runs in-process)
+        tag: Extra run parameters folded into the manifest key
+        verbose: Print progress
+
+    Returns:
+        Shard results in shard order
+    """
+    shards = make_shards(items, shard_size)
+    results: List[Any] = [None] * len(shards)
+    done = [False] * len(shards)
+
+    directory = Path(checkpoint_dir) if checkpoint_dir else None
+    if directory is not None:
+        directory.mkdir(parents=True, exist_ok=True)
+        manifest_path = directory / "manifest.json"
+        key = _run_key(shards, tag)
+        if manifest_path.exists():
+            manifest = json.loads(manifest_path.read_text())
+            if manifest.get("key") != key:
+                raise ValueError(
+                    f"Checkpoint directory {directory} belongs to a different run "
+                    f"(sample, shard size or parameters changed); use a new directory"
+                )
+        else:
+            _write_atomic(manifest_path, json.dumps({
+                "key": key, "shards": len(shards), "items": len(items), "tag": tag
+            }).encode())
+
+        for i in range(len(shards)):
+            path = directory / f"shard_{i:05d}.pkl"
+            if path.exists():
+                with open(path, "rb") as f:
+                    results[i] = pickle.load(f)
+                done[i] = True
+
+    pending = [i for i in range(len(shards)) if not done[i]]
+    completed = len(shards) - len(pending)
+    if verbose:
+        print(f"    {len(shards)} shards ({completed} already checkpointed)")
+
+    def finish(i: int, result: Any) -> None:
+        nonlocal completed
+        results[i] = result
+        if directory is not None:
+            _write_atomic(directory / f"shard_{i:05d}.pkl", pickle.dumps(result))
+        completed += 1
+        if verbose:
+            print(f"    Shard {i + 1} done ({completed}/{len(shards)})")
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(pending) <= 1:
+        for i in pending:
+            finish(i, worker(shards[i]))
+        return results
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(pending))) as pool:
+        futures = {pool.submit(worker, shards[i]): i for i in pending}
+        for future in as_completed(futures):
+            finish(futures[future], future.result())
+
+    return results
@@ -0,0 +1,528 @@
+"""
+Transaction Graph Index for AML Three-Layer Tribunal
+
+Compact in-memory directed graph of money movement between accounts, for
+typologies that a single account's AccountStats cannot show: funds that
+come back to where they started (circular flows), funds fanning out
+through several hops shortly after arriving (rapid movement), and
+accounts that pass on what they receive (in ≈ out).
+
+Storage:
+- Accounts are dense int32 codes from a StringDictionary (the same codes
+  as TransactionBatch.dictionaries.accounts when built from a batch)
+- Outgoing and incoming edges are CSR arrays (indptr, neighbour,
+  timestamp, amount), each node's edges sorted by timestamp so a time
+  window is two binary searches
+- New edges go to a small delta buffer that queries read alongside the
+  CSR arrays; it is merged into them once it outgrows COMPACT_RATIO of
+  the graph, so incremental updates stay amortized cheap
+- With a retention period, each merge also evicts edges older than that
+  before the newest edge, so a graph fed by a stream stays bounded. A
+  graph without retention keeps every edge; rebuild it on a schedule if
+  it is preloaded and then fed indefinitely
+
+About 20 bytes per edge in each direction: 5M edges over 515K accounts
+take ~200 MB. Queries are bounded (depth, time window, MAX_EXPANSIONS)
+so even hub accounts answer in milliseconds.
+
+Paths are time-respecting: each hop happens at or after the previous one,
+so money can actually have flowed along them. Self-transfers are kept as
+edges but never count as cycles, counterparties or pass-through flow.
+
+Usage:
+    graph = TransactionGraph.from_parquet(PARQUET_ROOT)
+    graph.add_transaction(txn)                  # incremental update
+    graph.find_cycles("8000EBD30", max_depth=4)  # [["8000EBD30", "...", "8000EBD30"], ...]
+    graph.graph_features("8000EBD30")           # GraphFeatures for TribunalInput
+"""
+
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+
+from shared.batch import StringDictionary, TransactionBatch, _to_epoch_seconds
+from shared.models import GraphFeatures, Transaction
+
+
+# Default lookback for graph queries (seconds)
+GRAPH_WINDOW = 7 * 24 * 3600
+
+# Longest cycle searched for (edges)
+MAX_CYCLE_DEPTH = 4
+
+# Node expansions per query before a search stops early
+MAX_EXPANSIONS = 5000
+
+# Cycles reported per query
+MAX_CYCLES = 100
+
+# Delta buffer is merged into the CSR arrays beyond max(COMPACT_MIN_EDGES, COMPACT_RATIO * edges)
+COMPACT_MIN_EDGES = 10_000
+COMPACT_RATIO = 0.05
+
+# Only the fields needed to build the graph from `transactions`
+GRAPH_PROJECTION = {
+    "_id": 0,
+    "timestamp": 1,
+    "sender.account_id": 1,
+    "receiver.account_id": 1,
+    "amount.sent": 1,
+}
+
+Edges = Tuple[np.ndarray, np.ndarray, np.ndarray]  # (neighbours, timestamps, amounts)
+
+
+# =============================================================================
+# CSR STORAGE
+# =============================================================================
+
+@dataclass
+class _CSR:
+    """Edges of one direction grouped by node, each group sorted by timestamp."""
+    indptr: np.ndarray     # int64, (nodes + 1,)
+    neighbour: np.ndarray  # int32
+    timestamp: np.ndarray  # int64 epoch seconds
+    amount: np.ndarray     # float64
+
+    @classmethod
+    def build(cls, nodes: np.ndarray, neighbours: np.ndarray, timestamps: np.ndarray,
+              amounts: np.ndarray, num_nodes: int) -> "_CSR":
+        order = np.lexsort((timestamps, nodes))
+        indptr = np.zeros(num_nodes + 1, dtype=np.int64)
+        np.cumsum(np.bincount(nodes, minlength=num_nodes), out=indptr[1:])
+        return cls(
+            indptr=indptr,
+            neighbour=neighbours[order].astype(np.int32, copy=False),
+            timestamp=timestamps[order],
+            amount=amounts[order],
+        )
+
+    @property
+    def num_nodes(self) -> int:
+        return len(self.indptr) - 1
+
+    def edges(self, node: int, start: int, end: int) -> Edges:
+        """Edges of a node with start <= timestamp <= end."""
+        if node >= self.num_nodes:
+            return _NO_EDGES
+        lo, hi = self.indptr[node], self.indptr[node + 1]
+        times = self.timestamp[lo:hi]
+        i = lo + np.searchsorted(times, start, side="left")
+        j = lo + np.searchsorted(times, end, side="right")
+        return self.neighbour[i:j], self.timestamp[i:j], self.amount[i:j]
+
+    def latest(self, node: int) -> Optional[int]:
+        if node >= self.num_nodes or self.indptr[node] == self.indptr[node + 1]:
+            return None
+        return int(self.timestamp[self.indptr[node + 1] - 1])
+
+
+_NO_EDGES: Edges = (
+    np.empty(0, dtype=np.int32),
+    np.empty(0, dtype=np.int64),
+    np.empty(0, dtype=np.float64),
+)
+
+
+def _earliest_per_neighbour(edges: Edges) -> Tuple[List[int], List[int]]:
+    """Distinct neighbours with their earliest edge time (edges sorted by time)."""
+    neighbours, timestamps, _ = edges
+    unique, first = np.unique(neighbours, return_index=True)
+    return unique.tolist(), timestamps[first].tolist()
+
+
+def _latest_per_neighbour(edges: Edges) -> Tuple[List[int], List[int]]:
+    """Distinct neighbours with their latest edge time (edges sorted by time)."""
+    neighbours, timestamps, _ = edges
+    unique, last = np.unique(neighbours[::-1], return_index=True)
+    return unique.tolist(), timestamps[::-1][last].tolist()
+
+
+def _epoch(value: Union[datetime, int, float]) -> int:
+    if isinstance(value, datetime):
+        return int(_to_epoch_seconds([value])[0])
+    return int(value)
+
+
+# =============================================================================
+# GRAPH
+# =============================================================================
+
+class TransactionGraph:
+    """
+    Directed multigraph of transactions: one edge per transaction, sender to
+    receiver, carrying its timestamp and amount sent.
+
+    Thread-safe: updates and queries share one lock.
+    """
+
+    def __init__(self, accounts: Optional[StringDictionary] = None, retention: Optional[int] = None):
+        """
+        Args:
+            accounts: Account dictionary to share (e.g. a batch's)
+            retention: Seconds of edges to keep before the newest edge,
+                enforced whenever the delta buffer is merged (None keeps all)
+        """
+        self.accounts = accounts if accounts is not None else StringDictionary()
+        self.retention = retention
+        self._lock = threading.RLock()
+        self._out = _CSR.build(*self._empty_columns(), num_nodes=0)
+        self._in = _CSR.build(*self._empty_columns(), num_nodes=0)
+        self._clear_delta()
+
+    @staticmethod
+    def _empty_columns() -> Tuple[np.ndarray, ...]:
+        return (np.empty(0, dtype=np.int32), np.empty(0, dtype=np.int32),
+                np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64))
+
+    def _clear_delta(self) -> None:
+        self._delta_src: List[int] = []
+        self._delta_dst: List[int] = []
+        self._delta_ts: List[int] = []
+        self._delta_amount: List[float] = []
+        self._delta_out: Dict[int, List[int]] = {}  # node -> positions in the delta lists
+        self._delta_in: Dict[int, List[int]] = {}
+
+    def __len__(self) -> int:
+        return self.num_edges
+
+    def __repr__(self) -> str:
+        return f"TransactionGraph(accounts={self.num_accounts:,}, edges={self.num_edges:,})"
+
+    @property
+    def num_accounts(self) -> int:
+        return len(self.accounts)
+
+    @property
+    def num_edges(self) -> int:
+        return len(self._out.neighbour) + len(self._delta_src)
+
+    # ==========================================================================
+    # CONSTRUCTION
+    # ==========================================================================
+
+    @classmethod
+    def from_batch(cls, batch: TransactionBatch) -> "TransactionGraph":
+        """Build a graph sharing the batch's account codes."""
+        graph = cls(batch.dictionaries.accounts)
+        graph.add_batch(batch)
+        return graph
+
+    @classmethod
+    def from_documents(cls, documents: Iterable[Dict[str, Any]]) -> "TransactionGraph":
+        """Build a graph from transaction documents (e.g. a MongoDB cursor)."""
+        return cls.from_batch(TransactionBatch.from_documents(documents))
+
+    @classmethod
+    def from_collection(cls, collection, query: Optional[Dict[str, Any]] = None) -> "TransactionGraph":
+        """
+        Build a graph from the `transactions` collection.
+
+        Args:
+            collection: db.transactions (or any collection in that schema)
+            query: Optional filter, e.g. a timestamp range
+
+        Returns:
+            TransactionGraph over the matching transactions
+        """
+        cursor = collection.find(query or {}, GRAPH_PROJECTION, batch_size=10_000)
+        return cls.from_documents(cursor)
+
+    @classmethod
+    def from_parquet(
+        cls,
+        root: Union[str, Path],
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+    ) -> "TransactionGraph":
+        """Build a graph from transactions staged as Parquet (shared/columnar.py)."""
+        from shared.columnar import read_batch
+        return cls.from_batch(read_batch(root, start, end))
+
+    # ==========================================================================
+    # UPDATES
+    # ==========================================================================
+
+    def add_batch(self, batch: TransactionBatch) -> None:
+        """Add every transaction of a batch."""
+        senders, receivers = batch.sender_account, batch.receiver_account
+        if batch.dictionaries.accounts is not self.accounts:
+            recode = self.accounts.encode_many(batch.dictionaries.accounts.values)
+            senders, receivers = recode[senders], recode[receivers]
+        self.add_edges(senders, receivers, batch.timestamp, batch.amount_sent)
+
+    def add_transaction(self, transaction: Transaction) -> None:
+        """Add a single transaction."""
+        self.add_edges(
+            [self.accounts.encode(transaction.sender.account_id)],
+            [self.accounts.encode(transaction.receiver.account_id)],
+            [_epoch(transaction.timestamp)],
+            [transaction.amount.sent],
+        )
+
+    def add_edges(self, senders, receivers, timestamps, amounts) -> None:
+        """
+        Add edges between already-encoded accounts.
+
+        Small additions go to the delta buffer; bulk loads (or a delta that
+        has outgrown the graph) trigger a merge into the CSR arrays.
+
+        Args:
+            senders: Sender account codes
+            receivers: Receiver account codes
+            timestamps: Epoch seconds
+            amounts: Amounts sent
+        """
+        with self._lock:
+            if len(senders) >= COMPACT_MIN_EDGES:
+                self._merge(
+                    np.asarray(senders, dtype=np.int32),
+                    np.asarray(receivers, dtype=np.int32),
+                    np.asarray(timestamps, dtype=np.int64),
+                    np.asarray(amounts, dtype=np.float64),
+                )
+                return
+
+            position = len(self._delta_src)
+            for src, dst, ts, amount in zip(senders, receivers, timestamps, amounts):
+                src, dst = int(src), int(dst)
+                self._delta_src.append(src)
+                self._delta_dst.append(dst)
+                self._delta_ts.append(int(ts))
+                self._delta_amount.append(float(amount))
+                self._delta_out.setdefault(src, []).append(position)
+                self._delta_in.setdefault(dst, []).append(position)
+                position += 1
+
+            if len(self._delta_src) > max(COMPACT_MIN_EDGES, COMPACT_RATIO * len(self._out.neighbour)):
+                self.compact()
+
+    def compact(self) -> None:
+        """Merge the delta buffer into the CSR arrays (evicting edges past the retention period)."""
+        with self._lock:
+            self._merge(*self._empty_columns())
+
+    def _merge(self, src: np.ndarray, dst: np.ndarray, ts: np.ndarray, amount: np.ndarray) -> None:
+        """Rebuild the CSR arrays from existing edges, the delta buffer and new edges."""
+        out = self._out
+        existing_src = np.repeat(np.arange(out.num_nodes, dtype=np.int32), np.diff(out.indptr))
+        src = np.concatenate([existing_src, np.asarray(self._delta_src, dtype=np.int32), src])
+        dst = np.concatenate([out.neighbour, np.asarray(self._delta_dst, dtype=np.int32), dst])
+        ts = np.concatenate([out.timestamp, np.asarray(self._delta_ts, dtype=np.int64), ts])
+        amount = np.concatenate([out.amount, np.asarray(self._delta_amount, dtype=np.float64), amount])
+
+        if self.retention is not None and len(ts):
+            keep = ts >= ts.max() - self.retention
+            src, dst, ts, amount = src[keep], dst[keep], ts[keep], amount[keep]
+
+        num_nodes = max(len(self.accounts), int(src.max(initial=-1)) + 1, int(dst.max(initial=-1)) + 1)
+        self._out = _CSR.build(src, dst, ts, amount, num_nodes)
+        self._in = _CSR.build(dst, src, ts, amount, num_nodes)
+        self._clear_delta()
+
+    # ==========================================================================
+    # EDGE ACCESS
+    # ==========================================================================
+
+    def _edges(self, node: int, start: int, end: int, outgoing: bool = True) -> Edges:
+        """Edges of a node in [start, end], CSR and delta combined, sorted by time."""
+        csr, delta = (self._out, self._delta_out) if outgoing else (self._in, self._delta_in)
+        edges = csr.edges(node, start, end)
+        positions = delta.get(node)
+        if not positions:
+            return edges
+
+        other = self._delta_dst if outgoing else self._delta_src
+        extra = [p for p in positions if start <= self._delta_ts[p] <= end]
+        if not extra:
+            return edges
+        neighbours = np.concatenate([edges[0], np.array([other[p] for p in extra], dtype=np.int32)])
+        timestamps = np.concatenate([edges[1], np.array([self._delta_ts[p] for p in extra], dtype=np.int64)])
+        amounts = np.concatenate([edges[2], np.array([self._delta_amount[p] for p in extra])])
+        order = np.argsort(timestamps, kind="stable")
+        return neighbours[order], timestamps[order], amounts[order]
+
+    def _counterparty_edges(self, node: int, start: int, end: int, outgoing: bool) -> Edges:
+        """Edges of a node in [start, end] without self-transfers."""
+        neighbours, timestamps, amounts = self._edges(node, start, end, outgoing)
+        other = neighbours != node
+        return neighbours[other], timestamps[other], amounts[other]
+
+    def _latest(self, node: int) -> Optional[int]:
+        """Time of a node's most recent edge in either direction."""
+        times = [self._out.latest(node), self._in.latest(node)]
+        for positions in (self._delta_out.get(node, ()), self._delta_in.get(node, ())):
+            times.extend(self._delta_ts[p] for p in positions)
+        times = [t for t in times if t is not None]
+        return max(times) if times else None
+
+    def _resolve(self, account_id: str, now, window: int) -> Optional[Tuple[int, int, int]]:
+        """(node, start, end) of a query, or None for an unknown/inactive account."""
+        node = self.accounts.lookup(account_id)
+        if node < 0:
+            return None
+        end = _epoch(now) if now is not None else self._latest(node)
+        if end is None:
+            return None
+        return node, end - window, end
+
+    # ==========================================================================
+    # QUERIES
+    # ==========================================================================
+
+    def find_cycles(
+        self,
+        account_id: str,
+        max_depth: int = MAX_CYCLE_DEPTH,
+        window: int = GRAPH_WINDOW,
+        now: Optional[datetime] = None,
+        limit: int = MAX_CYCLES,
+    ) -> List[List[str]]:
+        """
+        Time-respecting cycles through an account.
+
+        Depth-first search along edges in [now - window, now], each hop no
+        earlier than the previous one (via the earliest such edge to each
+        neighbour). Self-transfers are not cycles.
+
+        Args:
+            account_id: Account the cycles start and end at
+            max_depth: Longest cycle, in edges
+            window: Lookback in seconds
+            now: End of the window (defaults to the account's latest transaction)
+            limit: Maximum cycles returned
+
+        Returns:
+            Cycles as account ID paths, first and last element account_id
+        """
+        with self._lock:
+            resolved = self._resolve(account_id, now, window)
+            if resolved is None:
+                return []
+            origin, start, end = resolved
+
+            cycles: List[List[int]] = []
+            stack = [(origin, start, [origin])]
+            expansions = 0
+            while stack and len(cycles) < limit and expansions < MAX_EXPANSIONS:
+                node, arrival, path = stack.pop()
+                expansions += 1
+                neighbours, times = _earliest_per_neighbour(self._edges(node, arrival, end))
+                for neighbour, time in zip(neighbours, times):
+                    if neighbour == origin:
+                        if len(path) > 1:
+                            cycles.append(path + [origin])
+                    elif len(path) < max_depth and neighbour not in path:
+                        stack.append((neighbour, time, path + [neighbour]))
+
+            cycles.sort(key=len)
+            return [self.accounts.decode_many(np.asarray(c)) for c in cycles[:limit]]
+
+    def _reach(self, account_id: str, hops: int, window: int, now, outgoing: bool) -> List[int]:
+        """Accounts first reached at each hop of a time-respecting breadth-first search."""
+        with self._lock:
+            resolved = self._resolve(account_id, now, window)
+            if resolved is None:
+                return [0] * hops
+            origin, start, end = resolved
+
+            # Forward: earliest arrival per account; backward: latest departure
+            best: Dict[int, int] = {origin: start if outgoing else end}
+            frontier = dict(best)
+            per_hop = []
+            expansions = 0
+            for _ in range(hops):
+                reached: Dict[int, int] = {}
+                new = 0
+                for node, time in frontier.items():
+                    if expansions >= MAX_EXPANSIONS:
+                        break
+                    expansions += 1
+                    if outgoing:
+                        neighbours, times = _earliest_per_neighbour(self._edges(node, time, end, True))
+                    else:
+                        neighbours, times = _latest_per_neighbour(self._edges(node, start, time, False))
+                    for neighbour, t in zip(neighbours, times):
+                        known = best.get(neighbour)
+                        if known is None:
+                            new += 1
+                        elif (t >= known) if outgoing else (t <= known):
+                            continue
+                        best[neighbour] = t
+                        reached[neighbour] = t
+                per_hop.append(new)
+                frontier = reached
+            return per_hop
+
+    def fan_out(self, account_id: str, hops: int = 2, window: int = GRAPH_WINDOW,
+                now: Optional[datetime] = None) -> List[int]:
+        """
+        Accounts funds from an account can have reached within `hops` transfers.
+
+        Args:
+            account_id: Source account
+            hops: Maximum path length
+            window: Lookback in seconds
+            now: End of the window (defaults to the account's latest transaction)
+
+        Returns:
+            Newly reached accounts per hop (sum = distinct accounts reached)
+        """
+        return self._reach(account_id, hops, window, now, outgoing=True)
+
+    def fan_in(self, account_id: str, hops: int = 2, window: int = GRAPH_WINDOW,
+               now: Optional[datetime] = None) -> List[int]:
+        """Accounts whose funds can have reached an account within `hops` transfers (see fan_out)."""
+        return self._reach(account_id, hops, window, now, outgoing=False)
+
+    def pass_through_ratio(self, account_id: str, window: int = GRAPH_WINDOW,
+                           now: Optional[datetime] = None) -> Optional[float]:
+        """
+        Amount sent to other accounts over amount received from them within the window.
+
+        Returns:
+            sent / received (None without incoming funds); ≈ 1 means the
+            account passes on what it receives
+        """
+        with self._lock:
+            resolved = self._resolve(account_id, now, window)
+            if resolved is None:
+                return None
+            node, start, end = resolved
+            received = float(self._counterparty_edges(node, start, end, outgoing=False)[2].sum())
+            sent = float(self._counterparty_edges(node, start, end, outgoing=True)[2].sum())
+            return sent / received if received > 0 else None
+
+    def graph_features(self, account_id: str, now: Optional[datetime] = None,
+                       window: int = GRAPH_WINDOW, max_depth: int = MAX_CYCLE_DEPTH) -> GraphFeatures:
+        """
+        Graph features of an account for TribunalInput.
+
+        Args:
+            account_id: Account to describe
+            now: End of the window (defaults to the account's latest transaction)
+            window: Lookback in seconds
+            max_depth: Longest cycle searched for
+
+        Returns:
+            GraphFeatures (zeros for an unknown account)
+        """
+        with self._lock:
+            resolved = self._resolve(account_id, now, window)
+            if resolved is None:
+                return GraphFeatures()
+            node, start, end = resolved
+            cycles = self.find_cycles(account_id, max_depth, window, now)
+            return GraphFeatures(
+                out_degree=len(np.unique(self._counterparty_edges(node, start, end, outgoing=True)[0])),
+                in_degree=len(np.unique(self._counterparty_edges(node, start, end, outgoing=False)[0])),
+                cycle_count=len(cycles),
+                shortest_cycle=len(cycles[0]) - 1 if cycles else None,
+                fan_out_2hop=sum(self.fan_out(account_id, 2, window, now)),
+                fan_in_2hop=sum(self.fan_in(account_id, 2, window, now)),
+                pass_through_ratio=self.pass_through_ratio(account_id, window, now),
+            )
@@ -72,6 +72,45 @@ class AccountHistory(BaseModel):
     profile_narrative: Optional[str] = None  # LLM-generated profile
 
 
+class WindowFeatures(BaseModel):
+    """
+    Rolling-window aggregates of an account, including the current transaction.
+
+    Maintained incrementally by engines/statistical/windows.py. Sub-threshold
+    transactions are outgoing amounts just below the $10K reporting threshold.
+    """
+    txn_count_24h: int = 0
+    txn_count_7d: int = 0
+    sub_threshold_count_24h: int = 0
+    sub_threshold_count_7d: int = 0
+    sub_threshold_sum_24h: float = 0.0
+    sub_threshold_sum_7d: float = 0.0
+    distinct_counterparties_24h: int = 0
+    distinct_counterparties_7d: int = 0
+    sent_24h: float = 0.0
+    sent_7d: float = 0.0
+    received_24h: float = 0.0
+    received_7d: float = 0.0
+    in_out_ratio_24h: Optional[float] = None  # sent / received; None without incoming funds
+    in_out_ratio_7d: Optional[float] = None
+
+
+class GraphFeatures(BaseModel):
+    """
+    Transaction-graph features of an account over a recent window.
+
+    Computed by shared/graph.py from time-respecting paths, so funds can
+    actually have moved along every counted cycle and hop.
+    """
+    out_degree: int = 0                        # Distinct receivers in the window
+    in_degree: int = 0                         # Distinct senders in the window
+    cycle_count: int = 0                       # Cycles back to the account (capped)
+    shortest_cycle: Optional[int] = None       # Edges in the shortest cycle
+    fan_out_2hop: int = 0                      # Accounts reached within 2 transfers
+    fan_in_2hop: int = 0                       # Accounts reaching it within 2 transfers
+    pass_through_ratio: Optional[float] = None  # sent / received; None without incoming funds
+
+
 # =============================================================================
 # TRIBUNAL INPUT/OUTPUT MODELS
 # =============================================================================
@@ -89,6 +128,8 @@ class TribunalInput(BaseModel):
     triggered_by: Literal["statistical", "narrative", "both"]
 
     # Optional: Additional context
+    window_features: Optional[WindowFeatures] = None  # Sender's rolling-window aggregates
+    graph_features: Optional[GraphFeatures] = None  # Sender's transaction-graph features
     counterparty_history: Optional[AccountHistory] = None
     related_transactions: List[Transaction] = Field(default_factory=list)
 
@@ -237,3 +278,17 @@ class EvaluationMetrics(BaseModel):
         """Accuracy = (TP + TN) / total"""
         total = self.true_positives + self.false_positives + self.true_negatives + self.false_negatives
         return (self.true_positives + self.true_negatives) / total if total > 0 else 0.0
+
+    @classmethod
+    def from_scores(cls, scores, labels, threshold: float) -> "EvaluationMetrics":
+        """Confusion matrix for flagging score > threshold (see shared/evaluation.py)."""
+        from shared.evaluation import threshold_sweep
+
+        return threshold_sweep(scores, labels, [threshold])[0]
+
+    @classmethod
+    def sweep(cls, scores, labels, thresholds) -> List["EvaluationMetrics"]:
+        """Confusion matrices for many thresholds from a single sort."""
+        from shared.evaluation import threshold_sweep
+
+        return threshold_sweep(scores, labels, thresholds)
@@ -0,0 +1,549 @@
+"""
+Pluggable Storage Backends for AML Three-Layer Tribunal
+
+One interface over everything the engines and scripts persist:
+transactions, accounts, cluster baselines and embedded document chunks
+(with vector search).
+
+Backends:
+- MongoStorage: MongoDB Atlas (production, uses shared/db.py)
+- LocalStorage: embedded SQLite + in-memory NumPy vector index
+  (offline runs, latency benchmarks and CI without services)
+
+Both pass the same contract tests (tests/test_storage.py).
+"""
+
+import json
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+from typing import Optional, Dict, List, Any, Iterable, Tuple
+
+import numpy as np
+
+from shared.config import STORAGE_BACKEND, LOCAL_STORAGE_PATH
+from shared.db import history_chunks
+
+
+class StorageBackend(ABC):
+    """
+    Storage interface shared by all backends.
+
+    Usage:
+        storage = get_storage()
+        histories = storage.fetch_account_histories(["8000EBD30"])
+        hits = storage.vector_search(query_embedding, limit=5)
+    """
+
+    # ==========================================================================
+    # TRANSACTIONS
+    # ==========================================================================
+
+    @abstractmethod
+    def insert_transactions(self, documents: List[Dict[str, Any]]) -> int:
+        """Insert transactions, ignoring txn_ids already stored. Returns inserted count."""
+
+    @abstractmethod
+    def fetch_account_histories(
+        self,
+        account_ids: Iterable[str],
+        is_laundering: Optional[bool] = None,
+        limit_per_account: Optional[int] = None,
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """Chronological transactions per sender account (empty list if none)."""
+
+    @abstractmethod
+    def count_account_transactions(
+        self,
+        account_ids: Iterable[str],
+        is_laundering: Optional[bool] = None,
+    ) -> Dict[str, int]:
+        """Transaction count per sender account (0 if none)."""
+
+    # ==========================================================================
+    # ACCOUNTS
+    # ==========================================================================
+
+    @abstractmethod
+    def upsert_account(self, account_id: str, fields: Dict[str, Any]) -> None:
+        """Create an account or set the given fields on it."""
+
+    @abstractmethod
+    def get_account(self, account_id: str) -> Optional[Dict[str, Any]]:
+        """Get an account document, or None."""
+
+    # ==========================================================================
+    # BASELINES
+    # ==========================================================================
+
+    @abstractmethod
+    def save_baselines(self, baselines: List[Dict[str, Any]]) -> None:
+        """Store peer group baselines (each with a cluster_id), replacing existing ones."""
+
+    @abstractmethod
+    def load_baselines(self) -> Dict[int, Dict[str, Any]]:
+        """Load all peer group baselines, keyed by cluster_id."""
+
+    # ==========================================================================
+    # EMBEDDINGS & VECTOR SEARCH
+    # ==========================================================================
+
+    @abstractmethod
+    def upsert_embeddings(self, records: List[Dict[str, Any]]) -> None:
+        """Store chunk records with _id, text, embedding and metadata."""
+
+    @abstractmethod
+    def vector_search(
+        self,
+        query_vector: List[float],
+        limit: int = 8,
+        source_filter: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Nearest chunks by cosine similarity.
+
+        Returns records with text, metadata and score, where score uses the
+        Atlas convention for cosine indexes: (1 + cosine) / 2.
+        """
+
+    # ==========================================================================
+    # LIFECYCLE
+    # ==========================================================================
+
+    def ping(self) -> bool:
+        """Check if the backend is reachable."""
+        return True
+
+    def close(self) -> None:
+        """Release backend resources."""
+
+
+# =============================================================================
+# MONGODB BACKEND
+# =============================================================================
+
+class MongoStorage(StorageBackend):
+    """Storage backed by MongoDB Atlas."""
+
+    def __init__(self, db=None):
+        """
+        Args:
+            db: MongoDBConnection or pymongo Database (defaults to get_db())
+        """
+        self._db = db
+
+    @property
+    def db(self):
+        """Database handle, connected on first use."""
+        if self._db is None:
+            from shared.db import get_db
+            self._db = get_db()
+        return self._db
+
+    @staticmethod
+    def _label_filter(is_laundering: Optional[bool]) -> Optional[Dict[str, Any]]:
+        return None if is_laundering is None else {"is_laundering": is_laundering}
+
+    def insert_transactions(self, documents: List[Dict[str, Any]]) -> int:
+        from pymongo import UpdateOne
+
+        if not documents:
+            return 0
+        operations = [
+            UpdateOne({"txn_id": doc["txn_id"]}, {"$setOnInsert": doc}, upsert=True)
+            for doc in documents
+        ]
+        return self.db.transactions.bulk_write(operations, ordered=False).upserted_count
+
+    def fetch_account_histories(
+        self,
+        account_ids: Iterable[str],
+        is_laundering: Optional[bool] = None,
+        limit_per_account: Optional[int] = None,
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        from shared.db import fetch_account_histories
+
+        return fetch_account_histories(
+            self.db,
+            account_ids,
+            extra_filter=self._label_filter(is_laundering),
+            limit_per_account=limit_per_account,
+        )
+
+    def count_account_transactions(
+        self,
+        account_ids: Iterable[str],
+        is_laundering: Optional[bool] = None,
+    ) -> Dict[str, int]:
+        from shared.db import count_account_transactions
+
+        return count_account_transactions(
+            self.db, account_ids, extra_filter=self._label_filter(is_laundering)
+        )
+
+    def upsert_account(self, account_id: str, fields: Dict[str, Any]) -> None:
+        self.db.accounts.update_one({"account_id": account_id}, {"$set": fields}, upsert=True)
+
+    def get_account(self, account_id: str) -> Optional[Dict[str, Any]]:
+        return self.db.accounts.find_one({"account_id": account_id}, {"_id": 0})
+
+    def save_baselines(self, baselines: List[Dict[str, Any]]) -> None:
+        from pymongo import ReplaceOne
+
+        if baselines:
+            self.db.cluster_baselines.bulk_write([
+                ReplaceOne({"cluster_id": b["cluster_id"]}, b, upsert=True)
+                for b in baselines
+            ])
+
+    def load_baselines(self) -> Dict[int, Dict[str, Any]]:
+        from shared.db import load_cluster_baselines
+
+        return load_cluster_baselines(self.db)
+
+    def upsert_embeddings(self, records: List[Dict[str, Any]]) -> None:
+        from pymongo import UpdateOne
+
+        if records:
+            self.db.regulatory_docs.bulk_write([
+                UpdateOne({"_id": r["_id"]}, {"$set": r}, upsert=True)
+                for r in records
+            ])
+
+    def vector_search(
+        self,
+        query_vector: List[float],
+        limit: int = 8,
+        source_filter: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        from shared.db import vector_search_pipeline
+
+        pipeline = vector_search_pipeline(query_vector, limit=limit, source_filter=source_filter)
+        return list(self.db.regulatory_docs.aggregate(pipeline))
+
+    def ping(self) -> bool:
+        return self.db.ping() if hasattr(self.db, "ping") else True
+
+
+# =============================================================================
+# LOCAL EMBEDDED BACKEND
+# =============================================================================
+
+def _encode_json(value: Any) -> Any:
+    """json.dumps default: datetimes round-trip as {"$date": iso}."""
+    if isinstance(value, datetime):
+        return {"$date": value.isoformat()}
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _decode_json(obj: Dict[str, Any]) -> Any:
+    """json.loads object_hook: restore {"$date": iso} to datetime."""
+    if len(obj) == 1 and "$date" in obj:
+        return datetime.fromisoformat(obj["$date"])
+    return obj
+
+
+def _dumps(doc: Dict[str, Any]) -> str:
+    return json.dumps(doc, default=_encode_json)
+
+
+def _loads(text: str) -> Dict[str, Any]:
+    return json.loads(text, object_hook=_decode_json)
+
+
+def _epoch(value: Any) -> float:
+    """Sortable timestamp for the transactions index (naive datetimes are UTC, like BSON)."""
+    if isinstance(value, datetime):
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return (value - datetime(1970, 1, 1)).total_seconds()
+    return 0.0
+
+
+class LocalStorage(StorageBackend):
+    """
+    Embedded storage: SQLite for documents, NumPy for vector search.
+
+    Documents are stored as JSON next to the few columns that are queried
+    (sender account, timestamp, label). The vector index is an in-memory
+    float32 matrix of L2-normalized embeddings, rebuilt lazily after writes;
+    search is an exact matrix-vector product.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS transactions (
+            txn_id TEXT PRIMARY KEY,
+            sender_account TEXT NOT NULL,
+            timestamp REAL NOT NULL,
+            is_laundering INTEGER NOT NULL,
+            doc TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_transactions_history
+            ON transactions (sender_account, timestamp);
+        CREATE TABLE IF NOT EXISTS accounts (
+            account_id TEXT PRIMARY KEY,
+            doc TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS cluster_baselines (
+            cluster_id INTEGER PRIMARY KEY,
+            doc TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS embeddings (
+            id TEXT PRIMARY KEY,
+            source TEXT,
+            doc TEXT NOT NULL,
+            embedding BLOB NOT NULL
+        );
+    """
+
+    def __init__(self, path: str = LOCAL_STORAGE_PATH):
+        """
+        Args:
+            path: SQLite database file (":memory:" for a throwaway store)
+        """
+        self.path = path
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(self.SCHEMA)
+        self._index: Optional[Dict[str, Any]] = None
+
+    # ==========================================================================
+    # TRANSACTIONS
+    # ==========================================================================
+
+    def insert_transactions(self, documents: List[Dict[str, Any]]) -> int:
+        rows = [
+            (
+                doc["txn_id"],
+                str(doc["sender"]["account_id"]),
+                _epoch(doc.get("timestamp")),
+                int(bool(doc.get("is_laundering"))),
+                _dumps({k: v for k, v in doc.items() if k != "_id"}),
+            )
+            for doc in documents
+        ]
+        with self._lock, self._conn:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO transactions VALUES (?, ?, ?, ?, ?)", rows
+            )
+            return self._conn.total_changes - before
+
+    @staticmethod
+    def _account_filter(account_ids: List[str], is_laundering: Optional[bool]) -> Tuple[str, List[Any]]:
+        """WHERE clause and parameters for one chunk of sender accounts."""
+        where = f"sender_account IN ({','.join('?' * len(account_ids))})"
+        params: List[Any] = list(account_ids)
+        if is_laundering is not None:
+            where += " AND is_laundering = ?"
+            params.append(int(is_laundering))
+        return where, params
+
+    def fetch_account_histories(
+        self,
+        account_ids: Iterable[str],
+        is_laundering: Optional[bool] = None,
+        limit_per_account: Optional[int] = None,
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        account_ids = list(dict.fromkeys(account_ids))
+        histories: Dict[str, List[Dict[str, Any]]] = {a: [] for a in account_ids}
+
+        # Chunked like the Mongo path: SQLite caps bound parameters per statement
+        for chunk in history_chunks(account_ids):
+            where, params = self._account_filter(chunk, is_laundering)
+            if limit_per_account is None:
+                sql = (
+                    f"SELECT sender_account, doc FROM transactions WHERE {where} "
+                    "ORDER BY sender_account, timestamp, rowid"
+                )
+            else:
+                sql = (
+                    "SELECT sender_account, doc FROM ("
+                    "SELECT sender_account, doc, timestamp, rowid AS seq, ROW_NUMBER() OVER "
+                    "(PARTITION BY sender_account ORDER BY timestamp, rowid) AS position "
+                    f"FROM transactions WHERE {where}"
+                    ") WHERE position <= ? ORDER BY sender_account, timestamp, seq"
+                )
+                params.append(limit_per_account)
+            with self._lock:
+                rows = self._conn.execute(sql, params).fetchall()
+            for account_id, doc in rows:
+                histories[account_id].append(_loads(doc))
+        return histories
+
+    def count_account_transactions(
+        self,
+        account_ids: Iterable[str],
+        is_laundering: Optional[bool] = None,
+    ) -> Dict[str, int]:
+        account_ids = list(dict.fromkeys(account_ids))
+        counts = {a: 0 for a in account_ids}
+        for chunk in history_chunks(account_ids):
+            where, params = self._account_filter(chunk, is_laundering)
+            with self._lock:
+                rows = self._conn.execute(
+                    f"SELECT sender_account, COUNT(*) FROM transactions WHERE {where} "
+                    "GROUP BY sender_account",
+                    params,
+                ).fetchall()
+            counts.update(dict(rows))
+        return counts
+
+    # ==========================================================================
+    # ACCOUNTS
+    # ==========================================================================
+
+    def upsert_account(self, account_id: str, fields: Dict[str, Any]) -> None:
+        with self._lock, self._conn:
+            doc = self.get_account(account_id) or {"account_id": account_id}
+            doc.update(fields)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO accounts VALUES (?, ?)", (account_id, _dumps(doc))
+            )
+
+    def get_account(self, account_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT doc FROM accounts WHERE account_id = ?", (account_id,)
+            ).fetchone()
+        return _loads(row[0]) if row else None
+
+    # ==========================================================================
+    # BASELINES
+    # ==========================================================================
+
+    def save_baselines(self, baselines: List[Dict[str, Any]]) -> None:
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO cluster_baselines VALUES (?, ?)",
+                [(int(b["cluster_id"]), _dumps(b)) for b in baselines],
+            )
+
+    def load_baselines(self) -> Dict[int, Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute("SELECT cluster_id, doc FROM cluster_baselines").fetchall()
+        return {cluster_id: _loads(doc) for cluster_id, doc in rows}
+
+    # ==========================================================================
+    # EMBEDDINGS & VECTOR SEARCH
+    # ==========================================================================
+
+    def upsert_embeddings(self, records: List[Dict[str, Any]]) -> None:
+        rows = []
+        for r in records:
+            doc = {k: v for k, v in r.items() if k != "embedding"}
+            vector = np.asarray(r["embedding"], dtype=np.float32)
+            rows.append((r["_id"], r.get("metadata", {}).get("source"), _dumps(doc), vector.tobytes()))
+
+        with self._lock, self._conn:
+            self._conn.executemany("INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?, ?)", rows)
+            self._index = None
+
+    def _vector_index(self) -> Dict[str, Any]:
+        """Load (or reuse) the normalized embedding matrix."""
+        with self._lock:
+            if self._index is None:
+                rows = self._conn.execute("SELECT source, doc, embedding FROM embeddings").fetchall()
+                if rows:
+                    matrix = np.stack([np.frombuffer(r[2], dtype=np.float32) for r in rows])
+                    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+                    matrix = matrix / np.where(norms > 0, norms, 1.0)
+                else:
+                    matrix = np.empty((0, 0), dtype=np.float32)
+                self._index = {
+                    "matrix": matrix,
+                    # Own source plus those of collapsed near-duplicates
+                    "sources": [
+                        {r[0], *(s.get("source") for s in _loads(r[1]).get("sources", []))}
+                        for r in rows
+                    ],
+                    "docs": [r[1] for r in rows],
+                }
+            return self._index
+
+    def vector_search(
+        self,
+        query_vector: List[float],
+        limit: int = 8,
+        source_filter: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        index = self._vector_index()
+        matrix = index["matrix"]
+        if not len(matrix):
+            return []
+
+        query = np.asarray(query_vector, dtype=np.float32)
+        query = query / (np.linalg.norm(query) or 1.0)
+        similarities = matrix @ query
+
+        candidates = np.arange(len(matrix))
+        if source_filter:
+            candidates = np.array(
+                [i for i in candidates if source_filter in index["sources"][i]], dtype=np.intp
+            )
+        if not len(candidates):
+            return []
+
+        k = min(limit, len(candidates))
+        top = candidates[np.argpartition(-similarities[candidates], k - 1)[:k]]
+        top = top[np.argsort(-similarities[top], kind="stable")]
+
+        results = []
+        for i in top:
+            doc = _loads(index["docs"][i])
+            result = {
+                "_id": doc.get("_id"),
+                "text": doc.get("text"),
+                "metadata": doc.get("metadata", {}),
+                "score": float((1.0 + similarities[i]) / 2.0),
+            }
+            if "sources" in doc:
+                result["sources"] = doc["sources"]
+            results.append(result)
+        return results
+
+    # ==========================================================================
+    # LIFECYCLE
+    # ==========================================================================
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+# =============================================================================
+# CONVENIENCE FUNCTIONS
+# =============================================================================
+
+_storage: Optional[StorageBackend] = None
+
+
+def get_storage(backend: Optional[str] = None) -> StorageBackend:
+    """
+    Get the configured storage backend.
+
+    Args:
+        backend: "mongo" or "local" (defaults to AML_STORAGE_BACKEND)
+
+    Returns:
+        Process-wide backend instance when using the configured default,
+        a fresh instance when a backend is named explicitly
+    """
+    global _storage
+
+    if backend is None:
+        if _storage is None:
+            _storage = _create_storage(STORAGE_BACKEND)
+        return _storage
+    return _create_storage(backend)
+
+
+def _create_storage(backend: str) -> StorageBackend:
+    if backend == "mongo":
+        return MongoStorage()
+    if backend == "local":
+        return LocalStorage(LOCAL_STORAGE_PATH)
+    raise ValueError(f"Unknown storage backend: {backend!r} (expected 'mongo' or 'local')")
@@ -0,0 +1,58 @@
+"""
+Test Suite for the Async MongoDB Connection
+
+Tests that the singleton keeps one AsyncMongoClient per event loop. No
+server is needed: clients connect lazily and nothing is queried.
+"""
+
+import asyncio
+
+import pytest
+
+pytest.importorskip("pymongo.asynchronous")
+
+import shared.async_db as async_db
+from shared.async_db import AsyncMongoDBConnection, get_async_db
+
+
+@pytest.fixture
+def connection(monkeypatch):
+    """A fresh singleton pointed at an unused local port."""
+    monkeypatch.setattr(async_db, "MONGODB_URI", "mongodb://127.0.0.1:1")
+    monkeypatch.setattr(AsyncMongoDBConnection, "_instance", None)
+    monkeypatch.setattr(AsyncMongoDBConnection, "_client", None)
+    yield get_async_db()
+    AsyncMongoDBConnection._instance = None
+
+
+class TestEventLoopBinding:
+    """One client per event loop."""
+
+    def test_client_reused_within_a_loop(self, connection):
+        async def clients():
+            return connection.client, get_async_db().transactions.database.client
+
+        first, second = asyncio.run(clients())
+        assert first is second
+
+    def test_new_loop_gets_new_client(self, connection):
+        async def client():
+            return get_async_db().client
+
+        first = asyncio.run(client())
+        second = asyncio.run(client())
+        assert second is not first
+        assert connection.client is second  # Outside a loop: keeps the last binding
+
+    def test_close_resets_singleton(self, connection):
+        async def close():
+            client = connection.client
+            await connection.close()
+            return client
+
+        closed = asyncio.run(close())
+        assert AsyncMongoDBConnection._instance is None
+
+        reopened = get_async_db()
+        assert reopened is not connection
+        assert reopened.client is not None and reopened.client is not closed
@@ -0,0 +1,184 @@
+"""
+Test Suite for Columnar Transaction Batches
+
+Tests TransactionBatch construction, selection and mask propagation.
+"""
+
+import pytest
+import numpy as np
+import pandas as pd
+from datetime import datetime
+
+from shared.batch import TransactionBatch, BatchDictionaries, StringDictionary
+
+
+# =============================================================================
+# FIXTURES - Mock Data Builders
+# =============================================================================
+
+def make_document(
+    sender: str = "A1",
+    receiver: str = "B1",
+    amount: float = 100.0,
+    payment_format: str = "Wire",
+    timestamp: datetime = datetime(2022, 9, 1, 12, 0),
+    is_laundering: bool = False,
+) -> dict:
+    """Create a mock document in the transactions collection schema."""
+    return {
+        "txn_id": f"TXN_{sender}_{receiver}_{amount}",
+        "timestamp": timestamp,
+        "sender": {"account_id": sender, "bank_id": "011"},
+        "receiver": {"account_id": receiver, "bank_id": "022"},
+        "amount": {
+            "sent": amount,
+            "received": amount,
+            "currency_sent": "US Dollar",
+            "currency_received": "Euro",
+        },
+        "payment_format": payment_format,
+        "is_laundering": is_laundering,
+    }
+
+
+def make_batch() -> TransactionBatch:
+    """Create a small batch with one laundering row."""
+    return TransactionBatch.from_documents([
+        make_document("A1", "B1", 100.0),
+        make_document("A2", "A1", 9500.0, payment_format="Cash", is_laundering=True),
+        make_document("A1", "B2", 250.0, payment_format="ACH"),
+        make_document("B1", "A2", 75.0),
+    ])
+
+
+# =============================================================================
+# DICTIONARY ENCODING TESTS
+# =============================================================================
+
+class TestStringDictionary:
+    """Tests for dictionary encoding."""
+
+    def test_round_trip(self):
+        """Encoded values decode back to the originals."""
+        dictionary = StringDictionary()
+        codes = dictionary.encode_many(["x", "y", "x", "z"])
+
+        assert codes.dtype == np.int32
+        assert codes.tolist() == [0, 1, 0, 2]
+        assert dictionary.decode_many(codes) == ["x", "y", "x", "z"]
+
+    def test_lookup_does_not_assign(self):
+        """Unknown values map to -1 without growing the dictionary."""
+        dictionary = StringDictionary(["x"])
+
+        assert dictionary.lookup("missing") == -1
+        assert len(dictionary) == 1
+
+
+# =============================================================================
+# CONSTRUCTION TESTS
+# =============================================================================
+
+class TestConstruction:
+    """Tests for building batches from documents and CSV chunks."""
+
+    def test_from_documents_columns(self):
+        """Document fields land in typed columns."""
+        batch = make_batch()
+
+        assert len(batch) == 4
+        assert batch.timestamp.dtype == np.int64
+        assert batch.amount_sent.dtype == np.float64
+        assert batch.sender_account.dtype == np.int32
+        assert batch.is_laundering.tolist() == [False, True, False, False]
+        assert batch.decode("payment_format") == ["Wire", "Cash", "ACH", "Wire"]
+
+    def test_accounts_share_one_dictionary(self):
+        """Sender and receiver codes refer to the same account dictionary."""
+        batch = make_batch()
+
+        # A1 sends row 0 and receives row 1
+        assert batch.sender_account[0] == batch.receiver_account[1]
+
+    def test_from_dataframe_uses_column_fallbacks(self):
+        """IBM CSV column names are resolved, amount_sent falls back to received."""
+        frame = pd.DataFrame({
+            "Timestamp": ["2022/09/01 00:20", "2022/09/01 00:21"],
+            "From Bank": ["10", "11"],
+            "Account": ["8000EBD30", "8000F4580"],
+            "To Bank": ["10", "12"],
+            "Account.1": ["8000EBD30", "8000F5340"],
+            "Amount Received": [3697.34, 0.01],
+            "Receiving Currency": ["US Dollar", "US Dollar"],
+            "Amount Paid": [0.0, 0.01],
+            "Payment Currency": ["US Dollar", "US Dollar"],
+            "Payment Format": ["Reinvestment", "Cheque"],
+            "Is Laundering": [0, 1],
+        })
+        batch = TransactionBatch.from_dataframe(frame)
+
+        assert batch.amount_sent.tolist() == [3697.34, 0.01]
+        assert batch.is_laundering.tolist() == [False, True]
+        assert batch.decode("sender_account") == ["8000EBD30", "8000F4580"]
+        assert batch.timestamp[1] - batch.timestamp[0] == 60
+
+    def test_shared_dictionaries_across_batches(self):
+        """Batches built with the same dictionaries can be concatenated."""
+        dictionaries = BatchDictionaries()
+        first = TransactionBatch.from_documents([make_document("A1")], dictionaries)
+        second = TransactionBatch.from_documents([make_document("A1")], dictionaries)
+        combined = TransactionBatch.concat([first, second])
+
+        assert len(combined) == 2
+        assert combined.sender_account[0] == combined.sender_account[1]
+        assert combined.row_id.tolist() == [0, 1]
+
+
+# =============================================================================
+# SELECTION TESTS
+# =============================================================================
+
+class TestSelection:
+    """Tests for slicing, filtering and mask propagation."""
+
+    def test_slice_is_a_view(self):
+        """Slicing does not copy column data."""
+        batch = make_batch()
+        head = batch[:2]
+
+        assert len(head) == 2
+        assert np.shares_memory(head.amount_sent, batch.amount_sent)
+
+    def test_filter_by_mask(self):
+        """Boolean masks keep only matching rows."""
+        batch = make_batch()
+        flagged = batch.filter(batch.amount_sent > 200)
+
+        assert flagged.amount_sent.tolist() == [9500.0, 250.0]
+        assert flagged.row_id.tolist() == [1, 2]
+
+    def test_mask_propagates_through_layers(self):
+        """Rows escalated through two filters map back onto the root batch."""
+        batch = make_batch()
+        layer1_failed = batch.filter(batch.amount_sent > 200)
+        layer2_failed = layer1_failed.filter(layer1_failed.is_laundering)
+
+        assert batch.mask_from(layer2_failed).tolist() == [False, True, False, False]
+
+    def test_wrong_length_mask_rejected(self):
+        """A mask of the wrong length is an error, not a silent broadcast."""
+        batch = make_batch()
+
+        with pytest.raises(ValueError):
+            batch.filter(np.array([True, False]))
+
+    def test_to_transactions(self):
+        """Rows materialize back into Transaction models."""
+        batch = make_batch()
+        txn = next(batch[1:2].to_transactions())
+
+        assert txn.sender.account_id == "A2"
+        assert txn.amount_sent == 9500.0
+        assert txn.amount.currency_received == "Euro"
+        assert txn.timestamp == datetime(2022, 9, 1, 12, 0)
+        assert txn.is_laundering is True
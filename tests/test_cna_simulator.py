@@ -0,0 +1,282 @@
+"""
+Test Suite for the CNA Simulator
+
+Tests the statistical pre-screen, the local narrative scorer, the
+escalate/pass split when replaying an account, and the concurrency
+limits of the LLM pool and the shared summary.
+"""
+
+import importlib.util
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+
+
+SCRIPT = Path(__file__).resolve().parent.parent / "scripts" / "cna_simulator.py"
+
+
+# =============================================================================
+# FIXTURES
+# =============================================================================
+
+@pytest.fixture(scope="module")
+def cna():
+    """The simulator script, loaded as a module."""
+    pytest.importorskip("pymongo")
+    pytest.importorskip("certifi")
+    pytest.importorskip("openai")
+    spec = importlib.util.spec_from_file_location("cna_simulator", SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def make_profile(**stats) -> dict:
+    """Profile with behavioral statistics: mean 100, std 20, banks 001/002, mostly ACH."""
+    defaults = {
+        "avg_amount": 100.0,
+        "amount_std": 20.0,
+        "min_amount": 50.0,
+        "max_amount": 200.0,
+        "known_banks": ["001", "002"],
+        "payment_format_probs": {"ACH": 0.8, "Wire": 0.2},
+        "top_payment_methods": ["ACH", "Wire"],
+    }
+    defaults.update(stats)
+    return {"customer_type": "individual", "_behavioral_stats": defaults}
+
+
+def make_txn(amount: float, bank: str = "001", payment_format: str = "ACH",
+             txn_id: str = "T0", is_laundering: bool = False) -> dict:
+    """Transaction document in the transactions collection schema."""
+    return {
+        "txn_id": txn_id,
+        "amount": {"sent": amount, "currency_sent": "US Dollar"},
+        "receiver": {"account_id": "R1", "bank_id": bank},
+        "payment_format": payment_format,
+        "is_laundering": is_laundering,
+    }
+
+
+# =============================================================================
+# PRE-SCREEN
+# =============================================================================
+
+class TestPrescreen:
+    """Deterministic suspicion score that decides what reaches the scorer."""
+
+    def test_typical_transaction_passes(self, cna):
+        screen = cna.prescreen_transaction(make_profile(), make_txn(100.0))
+
+        assert screen["signals"] == {"amount": 0.0, "bank": 0.0, "format": pytest.approx(0.2)}
+        assert screen["suspicion"] == pytest.approx(0.25 * 0.2)
+        assert screen["suspicion"] < cna.PRESCREEN_THRESHOLD
+
+    def test_weighted_signals(self, cna):
+        profile = make_profile()
+
+        # z = 2 -> half the amount signal; usual bank; ACH
+        moderate = cna.prescreen_transaction(profile, make_txn(140.0))
+        assert moderate["amount_z"] == pytest.approx(2.0)
+        assert moderate["suspicion"] == pytest.approx(0.5 * 0.5 + 0.25 * 0.2)
+
+        # Every signal saturated
+        worst = cna.prescreen_transaction(profile, make_txn(180.0, bank="999", payment_format="Cash"))
+        assert worst["signals"] == {"amount": 1.0, "bank": 1.0, "format": 1.0}
+        assert worst["suspicion"] == pytest.approx(sum(cna.PRESCREEN_WEIGHTS.values()))
+
+    def test_amount_signal_capped(self, cna):
+        screen = cna.prescreen_transaction(make_profile(), make_txn(10_100.0))
+
+        assert screen["amount_z"] == pytest.approx(500.0)
+        assert screen["signals"]["amount"] == 1.0
+
+    def test_std_fallbacks(self, cna):
+        # No amount_std: a quarter of the observed range (200 - 40) / 4 = 40
+        ranged = make_profile(amount_std=None, min_amount=40.0)
+        assert cna.prescreen_transaction(ranged, make_txn(180.0))["amount_z"] == pytest.approx(2.0)
+
+        # No range either: half the mean
+        flat = make_profile(amount_std=None, min_amount=0, max_amount=0)
+        assert cna.prescreen_transaction(flat, make_txn(150.0))["amount_z"] == pytest.approx(1.0)
+
+        # No spread at all: only the exact mean is unsuspicious
+        empty = {"_behavioral_stats": {}}
+        assert cna.prescreen_transaction(empty, make_txn(0.0))["signals"]["amount"] == 0.0
+        assert cna.prescreen_transaction(empty, make_txn(5.0))["signals"]["amount"] == 1.0
+
+    def test_unknown_banks_and_formats(self, cna):
+        # Profiles without bank or format statistics add nothing for them
+        bare = make_profile(known_banks=None, payment_format_probs=None)
+        screen = cna.prescreen_transaction(bare, make_txn(100.0, bank="999", payment_format="Cash"))
+        assert screen["signals"]["bank"] == 0.0
+        assert screen["signals"]["format"] == 0.0
+
+        # Older profiles: format shares from the "ACH (8), Wire (2)" summary
+        legacy = make_profile(payment_format_probs=None, payment_methods="ACH (8), Wire (2)")
+        legacy["_based_on_txn_count"] = 10
+        assert cna.prescreen_transaction(legacy, make_txn(100.0, payment_format="Wire"))["signals"]["format"] \
+            == pytest.approx(0.8)
+
+        # A missing receiver counts as an unseen bank
+        txn = make_txn(100.0)
+        del txn["receiver"]
+        assert cna.prescreen_transaction(make_profile(), txn)["signals"]["bank"] == 1.0
+
+
+# =============================================================================
+# LOCAL SCORER
+# =============================================================================
+
+class TestLocalScorer:
+    """score_transaction_locally: the deterministic narrative check."""
+
+    def test_fitting_transaction(self, cna):
+        result = cna.score_transaction_locally(make_profile(), make_txn(120.0, payment_format="Wire"))
+
+        assert result["risk_score"] == 0
+        assert result["fits_narrative"] is True
+        assert result["red_flags"] == []
+
+    def test_amount_above_maximum(self, cna):
+        profile = make_profile()
+
+        # 40 points just above the maximum, +20 * log10(ratio) up to 60
+        assert cna.score_transaction_locally(profile, make_txn(400.0))["risk_score"] == 46
+        assert cna.score_transaction_locally(profile, make_txn(2000.0))["risk_score"] == 60
+        assert cna.score_transaction_locally(profile, make_txn(1e6))["risk_score"] == 60
+
+    def test_amount_below_minimum_and_unusual_method(self, cna):
+        result = cna.score_transaction_locally(make_profile(), make_txn(10.0, payment_format="Cash"))
+
+        assert result["risk_score"] == 15 + 30
+        assert result["fits_narrative"] is False
+        assert len(result["red_flags"]) == 2
+
+    def test_legacy_payment_methods(self, cna):
+        legacy = make_profile(top_payment_methods=None, payment_methods="ACH (8), Wire (2)")
+
+        assert cna.score_transaction_locally(legacy, make_txn(100.0, payment_format="Wire"))["risk_score"] == 0
+        assert cna.score_transaction_locally(legacy, make_txn(100.0, payment_format="Cash"))["risk_score"] == 30
+
+
+# =============================================================================
+# ACCOUNT REPLAY
+# =============================================================================
+
+class TestSimulateAccount:
+    """Only escalated transactions reach the scorer; order is preserved."""
+
+    def test_escalate_pass_split(self, cna):
+        account = {"account_id": "A1", "profile": make_profile()}
+        transactions = [
+            make_txn(100.0, txn_id="T1"),
+            make_txn(5000.0, bank="999", txn_id="T2", is_laundering=True),
+            make_txn(110.0, txn_id="T3", is_laundering=True),
+            make_txn(90.0, payment_format="Cash", bank="999", txn_id="T4"),
+            make_txn(105.0, txn_id="T5"),
+        ]
+        calls = []
+
+        def score_fn(profile, txn):
+            calls.append(txn["txn_id"])
+            return {"fits_narrative": False, "risk_score": 80, "reasoning": "fake"}
+
+        summary = cna.SimulationSummary(1, verbose=False)
+        cna.simulate_account(account, transactions, score_fn, summary, cna.PRESCREEN_THRESHOLD)
+        details = summary.stats["details"]
+
+        assert calls == ["T2", "T4"]
+        assert [d["txn_id"] for d in details] == ["T1", "T2", "T3", "T4", "T5"]
+        assert [d["escalated"] for d in details] == [False, True, False, True, False]
+        for detail in details:
+            if not detail["escalated"]:
+                assert (detail["risk_score"], detail["fits_narrative"], detail["flagged"]) == (0, True, False)
+
+        assert summary.prescreen == {
+            "escalated_laundering": 1, "escalated_clean": 1,
+            "passed_laundering": 1, "passed_clean": 2,
+        }
+        assert (summary.stats["true_positives"], summary.stats["false_positives"],
+                summary.stats["false_negatives"], summary.stats["true_negatives"]) == (1, 1, 1, 2)
+
+    def test_without_prescreen_scores_everything(self, cna):
+        account = {"account_id": "A1", "profile": make_profile()}
+        transactions = [make_txn(100.0 + i, txn_id=f"T{i}") for i in range(4)]
+        calls = []
+
+        def score_fn(profile, txn):
+            calls.append(txn["txn_id"])
+            return {"fits_narrative": True, "risk_score": 10}
+
+        summary = cna.SimulationSummary(1, verbose=False)
+        cna.simulate_account(account, transactions, score_fn, summary, prescreen_threshold=None)
+
+        assert calls == ["T0", "T1", "T2", "T3"]
+        assert all(d["prescreen"] is None and d["escalated"] for d in summary.stats["details"])
+        assert sum(summary.prescreen.values()) == 0
+
+
+# =============================================================================
+# CONCURRENCY
+# =============================================================================
+
+class TestConcurrency:
+    """Capped LLM pool and thread-safe summary."""
+
+    def test_scorer_caps_requests_in_flight(self, cna, monkeypatch):
+        lock = threading.Lock()
+        in_flight = peak = 0
+
+        def fake_analyze(openai_client, profile, transaction):
+            nonlocal in_flight, peak
+            with lock:
+                in_flight += 1
+                peak = max(peak, in_flight)
+            time.sleep(0.02)
+            with lock:
+                in_flight -= 1
+            return {"fits_narrative": True, "risk_score": 0}
+
+        monkeypatch.setattr(cna, "analyze_transaction_with_cna", fake_analyze)
+        score = cna.make_llm_scorer(openai_client=None, max_in_flight=3)
+
+        with ThreadPoolExecutor(max_workers=12) as pool:
+            list(pool.map(lambda i: score(make_profile(), make_txn(100.0 + i)), range(36)))
+
+        assert peak == 3
+
+    def test_summary_counts_match_serial(self, cna):
+        profile = make_profile()
+        accounts = [
+            ({"account_id": f"A{a}", "profile": profile},
+             [make_txn(100.0 * (1 + (a + i) % 7), bank=f"{(a * i) % 4:03d}",
+                       txn_id=f"T{a}_{i}", is_laundering=(a + i) % 5 == 0)
+              for i in range(12)])
+            for a in range(120)
+        ]
+        threshold = cna.PRESCREEN_THRESHOLD
+
+        def replay(summary, pool=None):
+            run = lambda item: cna.simulate_account(*item, cna.score_transaction_locally, summary, threshold)
+            if pool is None:
+                for item in accounts:
+                    run(item)
+            else:
+                list(pool.map(run, accounts))
+            return summary
+
+        serial = replay(cna.SimulationSummary(len(accounts), verbose=False))
+        with ThreadPoolExecutor(max_workers=16) as pool:
+            concurrent = replay(cna.SimulationSummary(len(accounts), verbose=False), pool)
+
+        counts = lambda s: {k: v for k, v in s.stats.items() if k != "details"}
+        assert counts(concurrent) == counts(serial)
+        assert counts(serial)["total_txns_analyzed"] == 120 * 12
+        assert concurrent.prescreen == serial.prescreen
+        assert concurrent.accounts_done == serial.accounts_done == 120
+        assert sorted(d["txn_id"] for d in concurrent.stats["details"]) \
+            == sorted(d["txn_id"] for d in serial.stats["details"])
@@ -0,0 +1,42 @@
+"""
+Test Suite for Near-Duplicate Detection
+
+Tests MinHash/LSH grouping of regulatory chunks.
+"""
+
+from shared.dedup import near_duplicate_groups, minhash_signatures
+
+
+RECITAL = (
+    "Member States should ensure that obliged entities apply customer due diligence "
+    "measures when establishing a business relationship, when carrying out an occasional "
+    "transaction that amounts to EUR 15 000 or more, and when there is a suspicion of "
+    "money laundering or terrorist financing, regardless of any derogation, exemption "
+    "or threshold, and when there are doubts about the veracity or adequacy of "
+    "previously obtained customer identification data."
+)
+
+
+class TestNearDuplicates:
+    """Tests for grouping identical and near-identical texts."""
+
+    def test_groups_identical_and_near_identical(self):
+        """Re-extracted copies with small edits group together; other text does not."""
+        texts = [
+            RECITAL,
+            "Structuring involves splitting cash deposits below reporting thresholds.",
+            RECITAL.upper().replace(",", ""),                    # formatting only
+            RECITAL.replace("EUR 15 000", "EUR 10 000"),         # one edited figure
+            RECITAL[:len(RECITAL) // 2],                         # half the passage
+        ]
+
+        assert near_duplicate_groups(texts, threshold=0.8) == [[0, 2, 3]]
+
+    def test_signatures_are_deterministic(self):
+        """Signatures depend only on the text and the seed."""
+        first = minhash_signatures([RECITAL, "short"])
+        second = minhash_signatures([RECITAL, "short"])
+
+        assert first.shape == (2, 128)
+        assert (first == second).all()
+        assert near_duplicate_groups([]) == []
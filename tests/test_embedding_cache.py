@@ -0,0 +1,147 @@
+"""
+Test Suite for the Embedding Cache
+
+Tests that cached texts are never re-embedded, across calls, threads and
+cache instances, that the cache stays within its size bound, and where
+and by whom it is used.
+"""
+
+import threading
+import time
+
+import pytest
+
+from shared.embedding_cache import EmbeddingCache
+
+
+# =============================================================================
+# FIXTURES
+# =============================================================================
+
+class FakeEmbedder:
+    """Records every text sent to the 'API'."""
+
+    def __init__(self, delay: float = 0.0):
+        self.sent = []
+        self.delay = delay
+
+    def __call__(self, texts):
+        self.sent.extend(texts)
+        time.sleep(self.delay)
+        return [[float(len(t)), 1.0, 0.5] for t in texts]
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return EmbeddingCache(tmp_path, model="test-model", dimensions=3)
+
+
+# =============================================================================
+# CACHE TESTS
+# =============================================================================
+
+class TestEmbeddingCache:
+    """Tests for lookups, persistence and deduplication."""
+
+    def test_only_new_texts_are_embedded(self, cache):
+        """Duplicates and previously cached texts cost no API calls."""
+        embedder = FakeEmbedder()
+
+        first = cache.embed(["recital", "definition", "recital"], embedder)
+        second = cache.embed(["definition", "article 5"], embedder)
+
+        assert embedder.sent == ["recital", "definition", "article 5"]
+        assert first[0] == first[2] == [7.0, 1.0, 0.5]
+        assert second[0] == first[1]
+
+    def test_persists_across_instances(self, cache, tmp_path):
+        """A new process sees vectors written earlier, keyed by model and dimensions."""
+        cache.embed(["recital"], FakeEmbedder())
+
+        reopened = EmbeddingCache(tmp_path, model="test-model", dimensions=3)
+        other_model = EmbeddingCache(tmp_path, model="other-model", dimensions=3)
+
+        assert reopened.get_many(["recital", "missing"]) == [[7.0, 1.0, 0.5], None]
+        assert other_model.get_many(["recital"]) == [None]
+
+    def test_concurrent_callers_share_one_request(self, cache):
+        """Threads embedding the same text at once send it only once."""
+        embedder = FakeEmbedder(delay=0.05)
+        results = []
+
+        def worker():
+            results.append(cache.embed(["duplicated pdf chunk"], embedder))
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert embedder.sent == ["duplicated pdf chunk"]
+        assert len(results) == 4 and all(r == results[0] for r in results)
+
+    def test_ignores_partial_row(self, cache, tmp_path):
+        """A crashed append (vector without key) is discarded on the next write."""
+        with open(cache.vectors_path, "ab") as f:
+            f.write(b"\x00" * 12)
+
+        cache.embed(["recital"], FakeEmbedder())
+        reopened = EmbeddingCache(tmp_path, model="test-model", dimensions=3)
+
+        assert len(reopened) == 1
+        assert reopened.get_many(["recital"]) == [[7.0, 1.0, 0.5]]
+
+    def test_size_bound(self, tmp_path):
+        """A full cache still returns new embeddings but stops storing them."""
+        bounded = EmbeddingCache(tmp_path, model="test-model", dimensions=3, max_bytes=2 * 12)
+        embedder = FakeEmbedder()
+
+        vectors = bounded.embed(["a", "bb", "ccc"], embedder)
+        again = bounded.embed(["a", "ccc"], embedder)
+
+        assert vectors == [[1.0, 1.0, 0.5], [2.0, 1.0, 0.5], [3.0, 1.0, 0.5]]
+        assert again == [vectors[0], vectors[2]]
+        assert embedder.sent == ["a", "bb", "ccc", "ccc"]
+        assert len(bounded) == 2
+        assert bounded.vectors_path.stat().st_size == 2 * 12
+
+
+# =============================================================================
+# CONFIGURATION
+# =============================================================================
+
+class TestCacheConfiguration:
+    """Where the cache lives and who uses it."""
+
+    def test_default_directory_is_per_user(self, monkeypatch):
+        import importlib
+        import shared.config as config
+
+        monkeypatch.delenv("AML_EMBEDDING_CACHE_DIR", raising=False)
+        monkeypatch.setenv("XDG_CACHE_HOME", "/var/cache/someone")
+        try:
+            assert importlib.reload(config).EMBEDDING_CACHE_DIR == "/var/cache/someone/aml-tribunal/embeddings"
+        finally:
+            monkeypatch.undo()
+            importlib.reload(config)
+
+    def test_runtime_queries_skip_cache_unless_enabled(self, monkeypatch, tmp_path):
+        from types import SimpleNamespace
+        from shared import clients
+
+        def create(model, input, dimensions):
+            return SimpleNamespace(data=[SimpleNamespace(embedding=[1.0, 0.0, 0.0]) for _ in input])
+
+        api = clients.APIClients()
+        monkeypatch.setattr(api, "_openai", SimpleNamespace(embeddings=SimpleNamespace(create=create)))
+        cache = EmbeddingCache(tmp_path, model="test-model", dimensions=3)
+        monkeypatch.setattr(clients, "get_embedding_cache", lambda model, dimensions: cache)
+
+        monkeypatch.setattr(clients, "EMBEDDING_CACHE_RUNTIME", False)
+        api.get_embeddings(["query"], model="test-model", dimensions=3)
+        assert len(cache) == 0
+
+        monkeypatch.setattr(clients, "EMBEDDING_CACHE_RUNTIME", True)
+        api.get_embeddings(["query"], model="test-model", dimensions=3)
+        assert len(cache) == 1
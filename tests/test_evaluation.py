@@ -0,0 +1,74 @@
+"""
+Test Suite for Score Evaluation
+
+Checks curves, AUC and threshold sweeps against scikit-learn and a
+brute-force confusion matrix.
+"""
+
+import numpy as np
+import pytest
+
+from shared.evaluation import (
+    score_curve,
+    roc_auc,
+    average_precision,
+    threshold_sweep,
+    precision_at_k,
+    recall_at_budget,
+)
+from shared.models import EvaluationMetrics
+
+
+@pytest.fixture
+def scored():
+    """Rounded scores (many ties) with a weak signal on ~5% positives."""
+    rng = np.random.default_rng(3)
+    labels = rng.random(2000) < 0.05
+    scores = np.round(rng.normal(size=2000) + labels * 1.0, 1)
+    return scores, labels
+
+
+class TestCurves:
+    """Threshold-free metrics."""
+
+    def test_matches_sklearn(self, scored):
+        metrics = pytest.importorskip("sklearn.metrics")
+        scores, labels = scored
+
+        assert roc_auc(scores, labels) == pytest.approx(metrics.roc_auc_score(labels, scores))
+        assert average_precision(scores, labels) == pytest.approx(
+            metrics.average_precision_score(labels, scores)
+        )
+
+    def test_curve_counts(self):
+        curve = score_curve([0.9, 0.1, 0.5, 0.5], [True, False, True, False])
+
+        assert curve.thresholds.tolist() == [0.9, 0.5, 0.1]
+        assert curve.tp.tolist() == [1, 2, 2]
+        assert curve.fp.tolist() == [0, 1, 2]
+
+
+class TestThresholds:
+    """Sweeps and alert budgets."""
+
+    def test_sweep_matches_brute_force(self, scored):
+        scores, labels = scored
+        thresholds = [-1.0, 0.0, 0.5, 1.0, 1.5, 10.0]
+
+        for threshold, metrics in zip(thresholds, threshold_sweep(scores, labels, thresholds)):
+            flagged = scores > threshold
+            assert metrics == EvaluationMetrics(
+                true_positives=int((flagged & labels).sum()),
+                false_positives=int((flagged & ~labels).sum()),
+                true_negatives=int((~flagged & ~labels).sum()),
+                false_negatives=int((~flagged & labels).sum()),
+            )
+        assert EvaluationMetrics.from_scores(scores, labels, 0.5) == threshold_sweep(scores, labels, [0.5])[0]
+
+    def test_precision_at_k_and_budget(self):
+        scores = [0.9, 0.8, 0.7, 0.2, 0.1]
+        labels = [True, False, True, False, True]
+
+        assert precision_at_k(scores, labels, 2) == 0.5
+        assert recall_at_budget(scores, labels, 3) == pytest.approx(2 / 3)
+        assert recall_at_budget(scores, labels, 0.4) == pytest.approx(1 / 3)
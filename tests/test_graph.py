@@ -0,0 +1,143 @@
+"""
+Test Suite for the Transaction Graph Index
+
+Tests cycle, fan-out/fan-in and pass-through queries, incremental updates
+against a bulk build, and graph signals in typology detection.
+"""
+
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from shared.batch import TransactionBatch
+from shared.graph import TransactionGraph, GRAPH_WINDOW
+from engines.expert.typologies import detect_layering, detect_shell_company
+
+from tests.test_expert import make_tribunal_input
+
+
+START = datetime(2022, 9, 1)
+
+
+def make_doc(sender: str, receiver: str, amount: float, minutes: float) -> dict:
+    return {
+        "sender": {"account_id": sender, "bank_id": "1"},
+        "receiver": {"account_id": receiver, "bank_id": "2"},
+        "amount": {"sent": amount, "received": amount},
+        "payment_format": "Wire",
+        "timestamp": START + timedelta(minutes=minutes),
+    }
+
+
+@pytest.fixture
+def ring():
+    """A -> B -> C -> A in time order, plus a late B -> D and an early D -> A."""
+    return TransactionGraph.from_documents([
+        make_doc("D", "A", 500.0, 0),
+        make_doc("A", "B", 1000.0, 10),
+        make_doc("B", "C", 990.0, 20),
+        make_doc("C", "A", 980.0, 30),
+        make_doc("B", "D", 100.0, 40),
+    ])
+
+
+class TestGraphQueries:
+    """Time-respecting graph queries."""
+
+    def test_cycle_found(self, ring):
+        assert ring.find_cycles("A") == [["A", "B", "C", "A"]]
+        assert ring.find_cycles("A", max_depth=2) == []
+
+    def test_cycles_respect_time(self):
+        # C -> A happens before A -> B, so money cannot have gone round
+        graph = TransactionGraph.from_documents([
+            make_doc("C", "A", 980.0, 0),
+            make_doc("A", "B", 1000.0, 10),
+            make_doc("B", "C", 990.0, 20),
+        ])
+        assert graph.find_cycles("A") == []
+
+    def test_fan_out_and_fan_in(self, ring):
+        # Window ends at A's latest transaction, before B -> D
+        assert ring.fan_out("A", hops=2) == [1, 1]   # B, then C
+        assert ring.fan_out("A", hops=2, now=START + timedelta(hours=1)) == [1, 2]
+        assert ring.fan_in("A", hops=2) == [2, 1]    # C and D, then B
+
+        # Outside the window nothing is reachable
+        later = START + timedelta(seconds=2 * GRAPH_WINDOW)
+        assert ring.fan_out("A", now=later) == [0, 0]
+
+    def test_graph_features(self, ring):
+        features = ring.graph_features("A")
+        assert features.cycle_count == 1
+        assert features.shortest_cycle == 3
+        assert features.pass_through_ratio == pytest.approx(1000.0 / 1480.0)
+        assert features.in_degree == 2 and features.out_degree == 1
+        assert ring.graph_features("unknown").cycle_count == 0
+
+    def test_self_transfers_ignored(self):
+        graph = TransactionGraph.from_documents([
+            make_doc("S", "S", 500.0, minutes=i) for i in range(3)
+        ])
+        features = graph.graph_features("S")
+
+        assert features.pass_through_ratio is None
+        assert features.in_degree == features.out_degree == 0
+        assert features.cycle_count == 0
+
+
+class TestIncrementalUpdates:
+    """Delta buffer and compaction."""
+
+    def test_retention_evicts_old_edges(self):
+        graph = TransactionGraph(retention=GRAPH_WINDOW)
+        for txn in TransactionBatch.from_documents([
+            make_doc("A", "B", 100.0, minutes=0),
+            make_doc("B", "C", 100.0, minutes=10),
+            make_doc("C", "D", 100.0, minutes=GRAPH_WINDOW // 60 + 5),
+        ]).to_transactions():
+            graph.add_transaction(txn)
+
+        assert graph.num_edges == 3
+        graph.compact()
+        assert graph.num_edges == 2
+        assert graph.fan_out("A", now=START + timedelta(minutes=10)) == [0, 0]
+
+    def test_incremental_matches_bulk(self):
+        rng = random.Random(3)
+        accounts = [f"A{i}" for i in range(30)]
+        docs = [make_doc(*rng.sample(accounts, 2), rng.uniform(10, 5000), minutes=i * 7)
+                for i in range(400)]
+
+        bulk = TransactionGraph.from_documents(docs)
+        incremental = TransactionGraph.from_documents(docs[:200])
+        for txn in TransactionBatch.from_documents(docs[200:]).to_transactions():
+            incremental.add_transaction(txn)
+
+        for account in accounts:
+            assert incremental.graph_features(account) == bulk.graph_features(account)
+
+        incremental.compact()
+        assert incremental.num_edges == bulk.num_edges == 400
+        for account in accounts:
+            assert incremental.find_cycles(account) == bulk.find_cycles(account)
+
+
+class TestGraphTypologies:
+    """Graph features in typology rules."""
+
+    def test_circular_flows_raise_layering(self, ring):
+        plain = make_tribunal_input(amount=5000, statistical_score=6.5, narrative_score=0.2)
+        with_graph = plain.model_copy(update={"graph_features": ring.graph_features("A")})
+
+        assert detect_layering(plain) is None
+        assert "circular_flows" in detect_layering(with_graph).signals_matched
+
+    def test_pass_through_raises_shell_company(self, ring):
+        # C received 990 and passed on 980
+        plain = make_tribunal_input(amount=5000, statistical_score=6.0, narrative_score=0.5)
+        with_graph = plain.model_copy(update={"graph_features": ring.graph_features("C")})
+
+        assert detect_shell_company(plain) is None
+        assert "in_approx_out" in detect_shell_company(with_graph).signals_matched
@@ -0,0 +1,182 @@
+"""
+Test Suite for CSV Ingestion
+
+Checks scripts/aml_ingest.py against the per-row behaviour it replaced,
+and that resume state stays with the file it came from.
+"""
+
+import hashlib
+import importlib.util
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+
+SCRIPT = Path(__file__).resolve().parent.parent / "scripts" / "aml_ingest.py"
+
+COLUMNS = ["Timestamp", "From Bank", "Account", "To Bank", "Account.1", "Amount Received",
+           "Receiving Currency", "Amount Paid", "Payment Currency", "Payment Format", "Is Laundering"]
+
+
+# =============================================================================
+# FIXTURES
+# =============================================================================
+
+@pytest.fixture
+def ingest(tmp_path, monkeypatch):
+    """The ingestion script, loaded as a module (its log file goes to tmp_path)."""
+    pytest.importorskip("pymongo")
+    pytest.importorskip("certifi")
+    pytest.importorskip("tqdm")
+    monkeypatch.chdir(tmp_path)
+    spec = importlib.util.spec_from_file_location("aml_ingest", SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def baseline_txn_id(row_index: int, timestamp: str, sender: str, receiver: str) -> str:
+    """Frozen copy of the original per-row generate_txn_id."""
+    unique_str = f"{row_index}_{timestamp}_{sender}_{receiver}"
+    hash_suffix = hashlib.md5(unique_str.encode()).hexdigest()[:8]
+    return f"TXN_{row_index:010d}_{hash_suffix}"
+
+
+@pytest.fixture
+def db():
+    mongomock = pytest.importorskip("mongomock")
+    return mongomock.MongoClient()["aml_db"]
+
+
+def write_csv(path: Path, rows: int, day: int = 1) -> str:
+    make_chunk([f"2022/09/{day:02d} {i % 24:02d}:00" for i in range(rows)]).to_csv(path, index=False)
+    return str(path)
+
+
+def make_chunk(timestamps: list) -> pd.DataFrame:
+    rows = [
+        [ts, "010", f"8000{i:05X}", "020", f"8100{i:05X}", 100.0 * (i + 1),
+         "US Dollar", 100.0 * (i + 1), "US Dollar", "ACH", 0]
+        for i, ts in enumerate(timestamps)
+    ]
+    return pd.DataFrame(rows, columns=COLUMNS)
+
+
+# =============================================================================
+# TRANSACTION IDS
+# =============================================================================
+
+class TestTransactionIds:
+    """Deterministic txn_ids must not depend on how rows are chunked."""
+
+    @pytest.mark.parametrize("timestamps", [
+        ["2022/09/01 00:00", "2022/09/02 00:00"],  # all midnight
+        ["2022/09/01 00:00", "2022/09/01 13:45"],
+    ])
+    def test_matches_baseline(self, ingest, timestamps):
+        chunk = make_chunk(timestamps)
+        documents = ingest.transform_chunk(chunk, 1000, "batch_000000")
+
+        expected = [
+            baseline_txn_id(1000 + i, str(pd.to_datetime(row["Timestamp"])),
+                            row["Account"], row["Account.1"])
+            for i, row in chunk.iterrows()
+        ]
+        assert [doc["txn_id"] for doc in documents] == expected
+
+
+# =============================================================================
+# RESUME
+# =============================================================================
+
+class TestResume:
+    """Resume points are kept per source file."""
+
+    def test_resume_ignores_other_files(self, ingest, db, tmp_path):
+        first = write_csv(tmp_path / "first.csv", 10)
+        second = write_csv(tmp_path / "second.csv", 12)
+        offset = ingest.skip_csv_rows(first, 5)
+
+        ingest.log_batch(db, "b0", 0, {}, "completed", start_row=0, end_row=4,
+                         end_offset=offset, source=ingest.source_key(first))
+
+        resumed = ingest.get_resume_point(db, first)
+        assert (resumed.batch_number, resumed.row_index, resumed.offset) == (1, 5, offset)
+        assert ingest.get_resume_point(db, second) == ingest.ResumePoint()
+
+    def test_resume_survives_move_and_append(self, ingest, db, tmp_path, monkeypatch):
+        monkeypatch.setattr(ingest, "SOURCE_KEY_BYTES", 300)
+        path = write_csv(tmp_path / "trans.csv", 10)
+        offset = ingest.skip_csv_rows(path, 5)
+        ingest.log_batch(db, "b0", 0, {}, "completed", start_row=0, end_row=4,
+                         end_offset=offset, source=ingest.source_key(path))
+
+        moved = tmp_path / "downloads" / "HI-Small_Trans.csv"
+        moved.parent.mkdir()
+        Path(path).rename(moved)
+        with open(moved, "a") as f:
+            make_chunk(["2022/09/03 00:00"] * 3).to_csv(f, header=False, index=False)
+
+        resumed = ingest.get_resume_point(db, str(moved))
+        assert (resumed.batch_number, resumed.row_index, resumed.offset) == (1, 5, offset)
+
+    def test_misaligned_offset_resumes_by_row(self, ingest, db, tmp_path):
+        path = write_csv(tmp_path / "trans.csv", 10)
+        _, header_end = ingest.read_csv_header(path)
+        ingest.log_batch(db, "b0", 0, {}, "completed", start_row=0, end_row=4,
+                         end_offset=header_end + 3, source=ingest.source_key(path))
+
+        assert ingest.get_resume_point(db, path).offset == ingest.skip_csv_rows(path, 5)
+
+    def test_batches_unique_across_files(self, ingest, db, tmp_path, monkeypatch):
+        monkeypatch.setattr(ingest, "get_mongo_client", lambda **_: db.client)
+        monkeypatch.setattr(db.client, "close", lambda: None)
+        first = write_csv(tmp_path / "first.csv", 10)
+        second = write_csv(tmp_path / "second.csv", 12, day=2)
+
+        for path in (first, second):
+            ingest.ingest_data(path, batch_size=4, resume=False, skip_entities=True, writers=2, fresh=True)
+
+        log = db[ingest.INGESTION_LOG_COLLECTION]
+        assert log.count_documents({}) == 3 + 3
+        assert log.count_documents({"source": ingest.source_key(second), "entities_extracted": False}) == 3
+
+    def test_relogged_batch_pending_only_with_new_rows(self, ingest, db):
+        log = db[ingest.INGESTION_LOG_COLLECTION]
+        ingest.log_batch(db, "b0", 0, {"inserted": 4}, "completed")
+        log.update_one({"_id": "b0"}, {"$set": {"entities_extracted": True}})
+
+        ingest.log_batch(db, "b0", 0, {"inserted": 0, "skipped": 4}, "completed")
+        assert log.find_one({"_id": "b0"})["entities_extracted"] is True
+
+        ingest.log_batch(db, "b0", 0, {"inserted": 1, "skipped": 3}, "completed")
+        assert log.find_one({"_id": "b0"})["entities_extracted"] is False
+
+
+# =============================================================================
+# PARQUET STAGING
+# =============================================================================
+
+class TestStaging:
+    """Re-staging the same data replaces its batch files."""
+
+    def test_restaging_renamed_file(self, ingest, tmp_path, monkeypatch):
+        pytest.importorskip("pyarrow")
+        mongomock = pytest.importorskip("mongomock")
+        from shared.columnar import read_transactions
+
+        # Each run loads into an empty database, sharing one staging dataset
+        monkeypatch.setattr(ingest, "get_mongo_client", lambda **_: mongomock.MongoClient())
+        staging = tmp_path / "staging"
+        path = write_csv(tmp_path / "trans.csv", 10)
+
+        ingest.ingest_data(path, batch_size=4, resume=False, skip_entities=True,
+                           writers=2, fresh=True, parquet_dir=str(staging))
+        renamed = Path(path).rename(tmp_path / "HI-Small_Trans.csv")
+        ingest.ingest_data(str(renamed), batch_size=4, resume=False, skip_entities=True,
+                           writers=2, fresh=True, parquet_dir=str(staging))
+
+        staged = read_transactions(staging, columns=["txn_id"])
+        assert staged.num_rows == 10
+        assert len(set(staged["txn_id"].to_pylist())) == 10
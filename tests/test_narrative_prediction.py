@@ -0,0 +1,121 @@
+"""
+Test Suite for Vectorized Narrative Prediction
+
+Checks engines.narrative.prediction against the per-account reference
+implementation in scripts/narrative_prediction_experiment.py.
+"""
+
+import importlib.util
+import random
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from shared.batch import TransactionBatch
+from engines.narrative.prediction import score_batch, select_accounts
+
+
+SCRIPT = Path(__file__).resolve().parent.parent / "scripts" / "narrative_prediction_experiment.py"
+
+
+# =============================================================================
+# FIXTURES
+# =============================================================================
+
+@pytest.fixture(scope="module")
+def experiment():
+    """The experiment script, loaded as a module (reference implementation)."""
+    pytest.importorskip("pymongo")
+    spec = importlib.util.spec_from_file_location("narrative_prediction_experiment", SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def make_documents(seed: int = 7) -> list:
+    """Random histories: varied lengths, repeat counterparties, zero amounts, equal gaps."""
+    rng = random.Random(seed)
+    documents = []
+    for a in range(12):
+        start = datetime(2022, 9, 1) + timedelta(hours=a)
+        minutes = 0
+        for i in range(rng.choice([4, 14, 15, 16, 22, 37])):
+            minutes += rng.choice([0, 30, 30, 90, 600, 2880])
+            amount = rng.choice([0.0, 25.0, 25.0, 140.5, 9900.0, rng.uniform(1, 5000)])
+            documents.append({
+                "txn_id": f"T{a}_{i}",
+                "timestamp": start + timedelta(minutes=minutes, seconds=i),
+                "sender": {"account_id": f"A{a}", "bank_id": "011"},
+                "receiver": {"account_id": f"R{rng.randint(0, 2 + a % 6)}", "bank_id": "022"},
+                "amount": {"sent": amount, "received": amount or 10.0},
+                "payment_format": rng.choice(["Wire", "ACH", "ACH", "Cheque"]),
+                "is_laundering": rng.random() < 0.1,
+            })
+    rng.shuffle(documents)
+    return documents
+
+
+def reference_scores(experiment, documents: list) -> dict:
+    """Per-account loop of the original run_experiment, keyed by txn_id."""
+    builder = experiment.NarrativeBuilder()
+    predictor = experiment.NarrativePredictor()
+    histories = {}
+    for doc in sorted(documents, key=lambda d: (d["sender"]["account_id"], d["timestamp"])):
+        histories.setdefault(doc["sender"]["account_id"], []).append(doc)
+
+    results = {}
+    for transactions in histories.values():
+        split_idx = int(len(transactions) * experiment.TRAIN_RATIO)
+        train_txns, test_txns = transactions[:split_idx], transactions[split_idx:]
+        if (len(transactions) < experiment.MIN_HISTORY_FOR_NARRATIVE + experiment.MIN_TEST_TRANSACTIONS
+                or len(train_txns) < experiment.MIN_HISTORY_FOR_NARRATIVE
+                or len(test_txns) < experiment.MIN_TEST_TRANSACTIONS):
+            continue
+
+        narrative = builder.build_narrative(train_txns)
+        prev_timestamp = builder.extract_timestamp(train_txns[-1])
+        for txn in test_txns:
+            prediction = predictor.predict_next(narrative)
+            results[txn["txn_id"]] = predictor.score_transaction(prediction, narrative, txn, prev_timestamp)
+            prev_timestamp = builder.extract_timestamp(txn)
+            narrative.known_counterparties.add(builder.extract_counterparty(txn))
+    return results
+
+
+# =============================================================================
+# PARITY TESTS
+# =============================================================================
+
+class TestScoreBatch:
+    """Vectorized scores match the reference implementation row for row."""
+
+    def test_matches_reference(self, experiment):
+        documents = make_documents()
+        expected = reference_scores(experiment, documents)
+        batch = TransactionBatch.from_documents(documents)
+
+        scores = score_batch(batch)
+        txn_ids = batch.txn_ids[scores.rows].tolist()
+
+        assert sorted(txn_ids) == sorted(expected)
+        for field in ("amount_z_score", "interval_z_score", "counterparty_error",
+                      "format_error", "total_error", "actual_interval"):
+            reference = [getattr(expected[t], field) for t in txn_ids]
+            np.testing.assert_allclose(getattr(scores, field), reference, rtol=1e-9, atol=1e-12)
+        assert scores.actual_known_counterparty.tolist() == [expected[t].actual_known_counterparty for t in txn_ids]
+        assert scores.is_laundering.tolist() == [expected[t].is_laundering for t in txn_ids]
+
+    def test_select_accounts(self):
+        """Laundering senders first, then clean senders with enough history."""
+        batch = TransactionBatch.from_documents(make_documents())
+        counts = np.bincount(batch.sender_account)
+        launders = np.bincount(batch.sender_account[batch.is_laundering], minlength=len(counts))
+
+        accounts = select_accounts(batch)
+        split = int(launders[accounts].astype(bool).sum())
+
+        assert (launders[accounts[:split]] > 0).all()
+        assert (launders[accounts[split:]] == 0).all() and (counts[accounts[split:]] >= 15).all()
+        assert len(select_accounts(batch, max_accounts=2)) <= 2
@@ -0,0 +1,74 @@
+"""
+Test Suite for Pipeline Startup
+
+Tests that constructing the pipeline stays cheap: no LLM SDKs, no MongoDB
+client and no network until Layer 3 is actually needed.
+"""
+
+import subprocess
+import sys
+from pathlib import Path
+
+from orchestrator.pipeline import Pipeline
+
+from tests.test_windows import make_txn
+
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+
+# =============================================================================
+# STARTUP TESTS
+# =============================================================================
+
+class TestLazyStartup:
+    """Tests for lazy initialization of Layer 3 dependencies."""
+
+    def test_construction_skips_heavy_imports(self):
+        """Pipeline() and get_db() load neither the SDKs nor pymongo."""
+        script = (
+            "import sys\n"
+            "from orchestrator.pipeline import Pipeline\n"
+            "from shared.db import get_db\n"
+            "Pipeline()\n"
+            "assert not get_db().connected\n"
+            "print(sorted(m for m in ('anthropic', 'openai', 'pymongo') if m in sys.modules))\n"
+        )
+        result = subprocess.run(
+            [sys.executable, "-c", script],
+            cwd=REPO_ROOT, capture_output=True, text=True, check=True,
+        )
+
+        assert result.stdout.strip() == "[]"
+
+    def test_expert_created_on_first_use(self):
+        """The Expert Agent is only built when Layer 3 is reached."""
+        pipeline = Pipeline()
+
+        assert pipeline._expert is None
+        assert pipeline.expert is pipeline.expert
+
+    def test_ready_without_expert(self):
+        """Layer 1/2-only workers are ready without any services."""
+        assert Pipeline().ready(expert=False)
+
+
+# =============================================================================
+# STREAM STATE TESTS
+# =============================================================================
+
+class TestStreamState:
+    """Tests for per-stream state kept by a long-running pipeline."""
+
+    def test_windows_pruned_on_stream_time(self):
+        """Idle accounts' windows are dropped as stream time advances."""
+        pipeline = Pipeline()
+        first = make_txn("S", "R", 100.0, minutes=0)
+        pipeline.windows.observe(first)
+        pipeline._prune(first)
+        assert len(pipeline.windows) == 2
+
+        later = make_txn("T", "U", 100.0, minutes=8 * 24 * 60)
+        pipeline.windows.observe(later)
+        pipeline._prune(later)
+        assert len(pipeline.windows) == 2  # Only T and U remain
@@ -0,0 +1,269 @@
+"""
+Test Suite for the Profile Generator
+
+Tests behavioral fingerprints, the shared profile template cache, and
+checkpointed (resumable) profile generation.
+"""
+
+import importlib.util
+import json
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+
+SCRIPT = Path(__file__).resolve().parent.parent / "scripts" / "profile_generator.py"
+
+
+# =============================================================================
+# FIXTURES
+# =============================================================================
+
+@pytest.fixture(scope="module")
+def generator():
+    """The generator script, loaded as a module."""
+    pytest.importorskip("pymongo")
+    pytest.importorskip("certifi")
+    pytest.importorskip("openai")
+    spec = importlib.util.spec_from_file_location("profile_generator", SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def make_history(amount: float, currency: str = "US Dollar", count: int = 10) -> list:
+    """`count` transactions of one amount, a day apart, to two counterparties."""
+    return [
+        {
+            "timestamp": datetime(2022, 9, 1) + timedelta(days=i),
+            "sender": {"account_id": "S1", "bank_id": "001"},
+            "receiver": {"account_id": f"R{i % 2}", "bank_id": "002"},
+            "amount": {"sent": amount, "received": amount,
+                       "currency_sent": currency, "currency_received": currency},
+            "payment_format": "ACH",
+        }
+        for i in range(count)
+    ]
+
+
+class FakeOpenAI:
+    """Chat client returning a fixed profile; counts (slow) calls."""
+
+    def __init__(self, delay: float = 0.05):
+        self.calls = 0
+        self._delay = delay
+        self._lock = threading.Lock()
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, **kwargs):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self._delay)
+        content = '{"customer_type": "individual", "likely_occupation_or_industry": "retail"}'
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+class FakeTemplates:
+    """profile_templates collection: find() and an atomic upsert with $setOnInsert."""
+
+    def __init__(self, docs=()):
+        self.docs = {doc["_id"]: doc for doc in docs}
+        self._lock = threading.Lock()
+
+    def find(self, query=None, projection=None):
+        return list(self.docs.values())
+
+    def find_one_and_update(self, query, update, upsert=False, return_document=None):
+        with self._lock:
+            doc = self.docs.get(query["_id"])
+            if doc is None and upsert:
+                doc = self.docs[query["_id"]] = {"_id": query["_id"], **update["$setOnInsert"]}
+            return doc
+
+
+class FakeAccounts:
+    """accounts collection: bulk_write (optionally failing) and an $in find()."""
+
+    def __init__(self, fail_writes: int = 0):
+        self.profiled = set()
+        self.fail_writes = fail_writes
+
+    def bulk_write(self, operations, ordered=True):
+        if self.fail_writes:
+            self.fail_writes -= 1
+            raise RuntimeError("write failed")
+        self.profiled.update(op._filter["account_id"] for op in operations)
+
+    def find(self, query, projection=None):
+        return [{"account_id": a} for a in query["account_id"]["$in"] if a in self.profiled]
+
+
+def read_checkpoint(path: Path) -> list:
+    return [(e["account_id"], e["status"]) for e in map(json.loads, path.read_text().splitlines())]
+
+
+# =============================================================================
+# FINGERPRINTS
+# =============================================================================
+
+class TestFingerprint:
+    """Quantized behavior that decides which accounts share a profile."""
+
+    def key(self, generator, history: list) -> str:
+        return generator.fingerprint_key(
+            generator.behavioral_fingerprint(generator.analyze_transactions(history))
+        )
+
+    def test_neighbouring_amounts_share_a_band(self, generator):
+        # Two bands per decade: 1,000-3,162 is one band
+        assert self.key(generator, make_history(1100.0)) == self.key(generator, make_history(1300.0))
+        assert self.key(generator, make_history(1100.0)) == self.key(generator, make_history(3100.0))
+
+    def test_band_boundary(self, generator):
+        assert self.key(generator, make_history(3100.0)) != self.key(generator, make_history(3300.0))
+        assert generator._log_band(0.5, 2, 10) == 0
+
+    def test_currencies_do_not_share_a_key(self, generator):
+        dollars = generator.behavioral_fingerprint(generator.analyze_transactions(make_history(1100.0)))
+        euros = generator.behavioral_fingerprint(
+            generator.analyze_transactions(make_history(1100.0, currency="Euro"))
+        )
+
+        assert dollars["amount_band"] == euros["amount_band"]
+        assert generator.fingerprint_key(dollars) != generator.fingerprint_key(euros)
+
+
+# =============================================================================
+# TEMPLATE CACHE
+# =============================================================================
+
+class TestTemplateCache:
+    """One LLM call per novel fingerprint, shared across workers and runs."""
+
+    def test_concurrent_callers_make_one_call(self, generator):
+        client = FakeOpenAI()
+        templates = generator.ProfileTemplateCache(FakeTemplates())
+        barrier = threading.Barrier(8)
+        profiles = [None] * 8
+
+        def build(i):
+            history = make_history(1100.0 + 10 * i)
+            barrier.wait()
+            profiles[i] = generator.build_profile(client, f"A{i}", history, False, 0, templates)
+
+        threads = [threading.Thread(target=build, args=(i,)) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert client.calls == 1
+        assert (templates.misses, templates.hits) == (1, 7)
+        assert len({p["_template_id"] for p in profiles}) == 1
+        # Each account keeps its own statistics on top of the shared profile
+        assert profiles[3]["_behavioral_stats"]["avg_amount"] == 1130.0
+
+    def test_stored_templates_reused_across_runs(self, generator):
+        client = FakeOpenAI(delay=0)
+        collection = FakeTemplates()
+        first = generator.ProfileTemplateCache(collection)
+        generator.build_profile(client, "A1", make_history(1100.0), False, 0, first)
+
+        second = generator.ProfileTemplateCache(collection)
+        profile = generator.build_profile(client, "A2", make_history(1200.0), False, 0, second)
+
+        assert client.calls == 1
+        assert (second.misses, second.hits) == (0, 1)
+        assert collection.docs[profile["_template_id"]]["source_account"] == "A1"
+
+    def test_first_stored_template_wins(self, generator):
+        fingerprint = generator.behavioral_fingerprint(generator.analyze_transactions(make_history(1100.0)))
+        key = generator.fingerprint_key(fingerprint)
+        collection = FakeTemplates()
+        templates = generator.ProfileTemplateCache(collection)
+
+        # Another process stores the template after this cache was loaded
+        collection.docs[key] = {"_id": key, "profile": {"customer_type": "business"}}
+        _, profile = templates.get_or_create(fingerprint, lambda: {"customer_type": "individual"}, "A1")
+
+        assert profile == {"customer_type": "business"}
+
+    def test_failed_generation_is_retried(self, generator):
+        fingerprint = {"currency": "US Dollar", "amount_band": 7}
+        templates = generator.ProfileTemplateCache(FakeTemplates())
+
+        def fail():
+            raise RuntimeError("rate limited")
+
+        with pytest.raises(RuntimeError):
+            templates.get_or_create(fingerprint, fail, "A1")
+        _, profile = templates.get_or_create(fingerprint, lambda: {"customer_type": "individual"}, "A2")
+
+        assert profile == {"customer_type": "individual"}
+        assert templates.misses == 1
+
+
+# =============================================================================
+# CHECKPOINTS
+# =============================================================================
+
+class TestCheckpoints:
+    """Resumable generation: the checkpoint only records what MongoDB holds."""
+
+    def test_checkpoint_written_after_bulk_write(self, generator, tmp_path):
+        path = tmp_path / "checkpoint.jsonl"
+        db = SimpleNamespace(accounts=FakeAccounts(fail_writes=1))
+        writer = generator.ProfileWriter(db, str(path), batch_size=2)
+
+        writer.add("A1", {"customer_type": "individual"})
+        writer.record("A2", "skipped")
+        assert not path.exists()
+
+        with pytest.raises(RuntimeError):
+            writer.add("A3", {"customer_type": "individual"})
+        assert not path.exists()
+
+        # The failed batch stays queued and is checkpointed once it is written
+        writer.flush()
+        assert db.accounts.profiled == {"A1", "A3"}
+        assert read_checkpoint(path) == [("A1", "generated"), ("A2", "skipped"), ("A3", "generated")]
+        assert writer.written == 2
+
+    def test_restart_skips_finished_accounts(self, generator, tmp_path, monkeypatch):
+        path = tmp_path / "checkpoint.jsonl"
+        path.write_text(
+            '{"account_id": "A1", "status": "generated"}\n'
+            '{"account_id": "A2", "status": "skipped"}\n'
+            '{"account_id": "A3", "status": "error"}\n'
+            '{"account_id": "A4", "sta'  # Interrupted mid-line
+        )
+        db = SimpleNamespace(accounts=FakeAccounts())
+        db.accounts.profiled.add("A1")
+        built = []
+
+        def fake_jobs(db, accounts):
+            for account_id in accounts:
+                yield account_id, make_history(100.0), 0
+
+        def fake_build(openai_client, account_id, *args):
+            built.append(account_id)
+            return {"customer_type": "individual"}
+
+        monkeypatch.setattr(generator, "iter_profile_jobs", fake_jobs)
+        monkeypatch.setattr(generator, "build_profile", fake_build)
+
+        sample = {"clean": ["A1", "A2", "A3", "A4"], "laundering": ["A5"]}
+        written = generator.generate_profiles_for_sample(
+            db, None, sample, workers=2, checkpoint_path=str(path), use_templates=False
+        )
+
+        assert sorted(built) == ["A3", "A4", "A5"]
+        assert written == 3
+        assert db.accounts.profiled == {"A1", "A3", "A4", "A5"}
+        assert generator.load_checkpoint(str(path)) == {
+            "A1": "generated", "A2": "skipped", "A3": "generated", "A4": "generated", "A5": "generated",
+        }
@@ -0,0 +1,260 @@
+"""
+Contract Tests for Storage Backends
+
+Every backend must pass the same tests. The local backend always runs;
+the MongoDB backend runs only when AML_TEST_MONGODB_URI points at a
+disposable database (vector search additionally needs an Atlas
+`vector_index` on the test collection).
+"""
+
+import os
+import sqlite3
+import uuid
+import pytest
+from datetime import datetime, timedelta, timezone
+
+from shared.storage import LocalStorage, MongoStorage, get_storage
+
+
+TEST_MONGODB_URI = os.environ.get("AML_TEST_MONGODB_URI")
+
+
+# =============================================================================
+# FIXTURES
+# =============================================================================
+
+@pytest.fixture(params=["local", "mongo"])
+def storage(request):
+    """Yield a fresh, empty backend of each kind."""
+    if request.param == "local":
+        backend = LocalStorage(":memory:")
+        yield backend
+        backend.close()
+        return
+
+    if not TEST_MONGODB_URI:
+        pytest.skip("AML_TEST_MONGODB_URI not set")
+
+    from pymongo import MongoClient
+
+    client = MongoClient(TEST_MONGODB_URI)
+    name = f"aml_contract_{uuid.uuid4().hex[:8]}"
+    yield MongoStorage(client[name])
+    client.drop_database(name)
+    client.close()
+
+
+def make_document(txn_id: str, sender: str, minutes: int, is_laundering: bool = False) -> dict:
+    """Create a transaction document in the transactions collection schema."""
+    return {
+        "txn_id": txn_id,
+        "timestamp": datetime(2022, 9, 1) + timedelta(minutes=minutes),
+        "sender": {"account_id": sender, "bank_id": "011"},
+        "receiver": {"account_id": "R1", "bank_id": "022"},
+        "amount": {"sent": 100.0 + minutes, "received": 100.0 + minutes,
+                   "currency_sent": "US Dollar", "currency_received": "US Dollar"},
+        "payment_format": "Wire",
+        "is_laundering": is_laundering,
+    }
+
+
+def seed_transactions(storage) -> None:
+    """A1 has three transactions inserted out of order, A2 has one."""
+    storage.insert_transactions([
+        make_document("T3", "A1", 30),
+        make_document("T1", "A1", 10),
+        make_document("T2", "A1", 20, is_laundering=True),
+        make_document("T4", "A2", 5),
+    ])
+
+
+# =============================================================================
+# TRANSACTION CONTRACT
+# =============================================================================
+
+class TestTransactions:
+    """Transaction storage and bulk history access."""
+
+    def test_insert_is_idempotent(self, storage):
+        """Re-inserting the same txn_id does not duplicate it."""
+        seed_transactions(storage)
+        inserted = storage.insert_transactions([make_document("T1", "A1", 10)])
+
+        assert inserted == 0
+        assert storage.count_account_transactions(["A1"]) == {"A1": 3}
+
+    def test_histories_are_chronological(self, storage):
+        """Histories come back sorted by timestamp, empty for unknown accounts."""
+        seed_transactions(storage)
+        histories = storage.fetch_account_histories(["A1", "A2", "missing"])
+
+        assert [t["txn_id"] for t in histories["A1"]] == ["T1", "T2", "T3"]
+        assert [t["txn_id"] for t in histories["A2"]] == ["T4"]
+        assert histories["missing"] == []
+        assert histories["A1"][0]["timestamp"] == datetime(2022, 9, 1, 0, 10)
+
+    def test_aware_timestamps_sort_in_utc(self, storage):
+        """Timezone-aware timestamps are ordered by their UTC instant."""
+        seed_transactions(storage)
+        early = make_document("T0", "A1", 0)
+        early["timestamp"] = datetime(2022, 9, 1, 1, 0, tzinfo=timezone(timedelta(hours=2)))
+        storage.insert_transactions([early])
+
+        history = storage.fetch_account_histories(["A1"])["A1"]
+        assert [t["txn_id"] for t in history] == ["T0", "T1", "T2", "T3"]
+
+    def test_label_filter_and_limit(self, storage):
+        """Label filters and per-account limits apply per account."""
+        seed_transactions(storage)
+
+        clean = storage.fetch_account_histories(["A1"], is_laundering=False)
+        first = storage.fetch_account_histories(["A1", "A2"], limit_per_account=1)
+        laundering = storage.count_account_transactions(["A1", "A2"], is_laundering=True)
+
+        assert [t["txn_id"] for t in clean["A1"]] == ["T1", "T3"]
+        assert [t["txn_id"] for t in first["A1"]] == ["T1"]
+        assert [t["txn_id"] for t in first["A2"]] == ["T4"]
+        assert laundering == {"A1": 1, "A2": 0}
+
+    def test_many_accounts(self, storage):
+        """Account lists beyond SQLite's bound-parameter limit are chunked."""
+        seed_transactions(storage)
+        limit = sqlite3.connect(":memory:").getlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER)
+        account_ids = [f"X{i}" for i in range(limit + 1)] + ["A1", "A2"]
+
+        counts = storage.count_account_transactions(account_ids)
+        histories = storage.fetch_account_histories(account_ids, is_laundering=False, limit_per_account=1)
+
+        assert len(counts) == len(account_ids)
+        assert (counts["A1"], counts["A2"], counts["X0"]) == (3, 1, 0)
+        assert [t["txn_id"] for t in histories["A1"]] == ["T1"]
+        assert [t["txn_id"] for t in histories["A2"]] == ["T4"]
+
+
+# =============================================================================
+# ACCOUNT & BASELINE CONTRACT
+# =============================================================================
+
+class TestAccountsAndBaselines:
+    """Account documents and peer group baselines."""
+
+    def test_upsert_account_merges_fields(self, storage):
+        """Upserts set fields without dropping existing ones."""
+        storage.upsert_account("A1", {"bank_id": "011"})
+        storage.upsert_account("A1", {"profile_generated": True})
+
+        account = storage.get_account("A1")
+        assert account["bank_id"] == "011"
+        assert account["profile_generated"] is True
+        assert storage.get_account("missing") is None
+
+    def test_baselines_round_trip(self, storage):
+        """Saved baselines load back keyed by cluster_id, replacing old ones."""
+        storage.save_baselines([{"cluster_id": 1, "mean": 10.0}, {"cluster_id": 2, "mean": 20.0}])
+        storage.save_baselines([{"cluster_id": 1, "mean": 11.0}])
+
+        baselines = storage.load_baselines()
+        assert baselines[1]["mean"] == 11.0
+        assert baselines[2]["mean"] == 20.0
+
+
+# =============================================================================
+# VECTOR SEARCH CONTRACT
+# =============================================================================
+
+class TestVectorSearch:
+    """Embedding storage and nearest-neighbour search."""
+
+    @pytest.fixture(autouse=True)
+    def seed(self, storage):
+        storage.upsert_embeddings([
+            {"_id": "a", "text": "structuring", "embedding": [1.0, 0.0, 0.0],
+             "metadata": {"source": "FATF", "filename": "a.pdf"}},
+            {"_id": "b", "text": "smurfing", "embedding": [0.8, 0.6, 0.0],
+             "metadata": {"source": "EU", "filename": "b.pdf"}},
+            {"_id": "c", "text": "layering", "embedding": [0.0, 0.0, 1.0],
+             "metadata": {"source": "FATF", "filename": "c.pdf"}},
+        ])
+
+    def test_ranked_by_cosine(self, storage):
+        """Closest chunks come first with Atlas-style scores."""
+        results = storage.vector_search([1.0, 0.1, 0.0], limit=2)
+
+        assert [r["text"] for r in results] == ["structuring", "smurfing"]
+        assert 0.5 < results[1]["score"] < results[0]["score"] <= 1.0
+
+    def test_source_filter(self, storage):
+        """Source filters restrict candidates before ranking."""
+        results = storage.vector_search([1.0, 0.1, 0.0], limit=5, source_filter="FATF")
+
+        assert [r["text"] for r in results] == ["structuring", "layering"]
+        assert all(r["metadata"]["source"] == "FATF" for r in results)
+
+    def test_source_filter_matches_collapsed_sources(self, storage):
+        """A collapsed near-duplicate is found under every source it lists."""
+        sources = [
+            {"source": "FATF", "filename": "d.pdf", "file_path": "fatf/d.pdf"},
+            {"source": "Basel", "filename": "e.pdf", "file_path": "basel/e.pdf"},
+        ]
+        storage.upsert_embeddings([
+            {"_id": "d", "text": "cuckoo smurfing", "embedding": [0.0, 1.0, 0.0],
+             "metadata": {"source": "FATF", "filename": "d.pdf", "file_path": "fatf/d.pdf"},
+             "sources": sources},
+        ])
+
+        results = storage.vector_search([0.0, 1.0, 0.0], limit=5, source_filter="Basel")
+
+        assert [r["text"] for r in results] == ["cuckoo smurfing"]
+        assert results[0]["sources"] == sources
+
+
+# =============================================================================
+# FACTORY
+# =============================================================================
+
+class TestFactory:
+    """Backend selection."""
+
+    def test_named_backend(self, monkeypatch):
+        monkeypatch.setattr("shared.storage.LOCAL_STORAGE_PATH", ":memory:")
+        assert isinstance(get_storage("local"), LocalStorage)
+
+    def test_unknown_backend(self):
+        with pytest.raises(ValueError):
+            get_storage("cassandra")
+
+    def test_async_rag_uses_configured_backend(self, monkeypatch):
+        """vector_search_async searches the local backend without MongoDB."""
+        import asyncio
+        from types import SimpleNamespace
+        from engines.expert import rag
+
+        local = LocalStorage(":memory:")
+        local.upsert_embeddings([
+            {"_id": "a", "text": "structuring", "embedding": [1.0, 0.0],
+             "metadata": {"source": "FATF", "filename": "a.pdf"}},
+        ])
+        monkeypatch.setattr(rag, "get_storage", lambda: local)
+        monkeypatch.setattr(rag, "get_clients", lambda: SimpleNamespace(get_embedding=lambda q: [1.0, 0.0]))
+
+        results = asyncio.run(rag.vector_search_async("structuring", limit=1))
+        assert [r["text"] for r in results] == ["structuring"]
+
+    def test_typology_guidance_sync_and_async_match(self, monkeypatch):
+        """Both guidance searches deduplicate and format results the same way."""
+        import asyncio
+        from types import SimpleNamespace
+        from engines.expert import rag
+
+        local = LocalStorage(":memory:")
+        local.upsert_embeddings([
+            {"_id": str(i), "text": f"passage {i % 2}", "embedding": [1.0, i / 10],
+             "metadata": {"source": "FATF", "filename": f"{i}.pdf"}}
+            for i in range(4)
+        ])
+        monkeypatch.setattr(rag, "get_storage", lambda: local)
+        monkeypatch.setattr(rag, "get_clients", lambda: SimpleNamespace(get_embedding=lambda q: [1.0, 0.0]))
+
+        sync = rag.search_typology_guidance("Structuring")
+        assert sync == asyncio.run(rag.search_typology_guidance_async("Structuring"))
+        assert sync.count("SOURCE ") == 2
@@ -0,0 +1,201 @@
+"""
+Test Suite for Typology Rules
+
+Tests the data-driven, vectorized typology evaluator and its hot reload,
+and its parity with the hand-written detectors it replaced.
+"""
+
+import json
+import os
+import random
+
+import numpy as np
+import pytest
+
+from engines.expert.rules import DEFAULT_RULES, TypologyRuleEngine, parse_rules, CompiledRules, extract_features
+from engines.expert.typologies import detect_all_typologies, detect_typologies_batch
+
+from tests.test_expert import make_tribunal_input
+
+
+# =============================================================================
+# BASELINE DETECTORS
+# =============================================================================
+
+def baseline_typologies(x):
+    """
+    Frozen copy of the hand-written detect_* logic the rules replaced.
+
+    Returns:
+        [(name, confidence, signals)] sorted by confidence, highest first
+    """
+    amount = x.transaction.amount_sent
+    stats = x.account_history.stats
+    ratio = (stats.total_sent / stats.total_received
+             if stats.total_sent > 0 and stats.total_received > 0 else None)
+
+    def check(*conditions):
+        signals, confidence = [], 0.0
+        for name, weight, hit in conditions:
+            if hit:
+                signals.append(name)
+                confidence += weight
+        return signals, confidence
+
+    detectors = [
+        ("Structuring", 0.4, check(
+            ("amount_near_10k_threshold", 0.4, 9000 <= amount < 10000),
+            ("amount_near_3k_threshold", 0.3, 2700 <= amount < 3000),
+            ("high_statistical_anomaly", 0.2, x.statistical_score > 5.0),
+            ("low_narrative_coherence", 0.2, x.narrative_score < 0.4),
+            ("round_number_amount", 0.1, amount % 100 == 0 and amount > 1000),
+            ("high_transaction_frequency", 0.15, stats.transaction_frequency_per_day > 3),
+        )),
+        ("Smurfing", 0.4, check(
+            ("small_amount_high_frequency", 0.35, amount < 5000 and stats.transaction_frequency_per_day > 2),
+            ("many_counterparties", 0.25, stats.unique_counterparties > 20),
+            ("statistical_anomaly", 0.15, x.statistical_score > 4.0),
+            ("narrative_break", 0.15, x.narrative_score < 0.5),
+            ("balanced_in_out", 0.1, ratio is not None and 0.8 <= ratio <= 1.2),
+        )),
+        ("Layering", 0.5, check(
+            ("very_high_frequency", 0.3, stats.transaction_frequency_per_day > 5),
+            ("high_transaction_count", 0.2, stats.total_transactions > 100),
+            ("in_equals_out", 0.25, ratio is not None and 0.9 <= ratio <= 1.1),
+            ("high_statistical_anomaly", 0.15, x.statistical_score > 6.0),
+            ("very_low_coherence", 0.2, x.narrative_score < 0.3),
+        )),
+        ("Shell Company Activity", 0.4, check(
+            ("exact_passthrough", 0.35, ratio is not None and 0.95 <= ratio <= 1.05),
+            ("limited_counterparties", 0.2, stats.unique_counterparties < 5 and stats.total_transactions > 20),
+            ("high_value_low_frequency", 0.25,
+             stats.avg_transaction_amount > 50000 and stats.transaction_frequency_per_day < 1),
+            ("statistical_anomaly", 0.15, x.statistical_score > 5.0),
+        )),
+        ("Trade-Based Money Laundering", 0.5, check(
+            ("high_value_transaction", 0.2, amount > 100000),
+            ("high_amount_variance", 0.25, stats.std_transaction_amount > stats.avg_transaction_amount),
+            ("wire_transfer", 0.1, x.transaction.payment_format == "Wire"),
+            ("extreme_statistical_anomaly", 0.25, x.statistical_score > 7.0),
+            ("narrative_break", 0.2, x.narrative_score < 0.4),
+        )),
+    ]
+
+    matches = [
+        (name, min(confidence, 1.0), signals)
+        for name, threshold, (signals, confidence) in detectors
+        if confidence >= threshold and signals
+    ]
+    matches.sort(key=lambda m: m[1], reverse=True)
+    return matches
+
+
+def random_inputs(n: int, seed: int = 0):
+    """Inputs concentrated on the rule thresholds."""
+    rng = random.Random(seed)
+    inputs = []
+    for _ in range(n):
+        x = make_tribunal_input(
+            amount=rng.choice([9500, 2800, 5000.0, 1200, 150000, 10000, 9000, 3000, 2700,
+                               rng.uniform(0, 200000)]),
+            statistical_score=rng.choice([4.0, 5.0, 6.0, 7.0, rng.uniform(0, 10)]),
+            narrative_score=rng.choice([0.3, 0.4, 0.5, rng.random()]),
+            frequency_per_day=rng.choice([0.5, 1, 2, 3, 5, 6, rng.uniform(0, 8)]),
+            unique_counterparties=rng.choice([3, 4, 5, 20, 21, 30]),
+            total_sent=rng.choice([0, 100, 800, 900, 950, 1000, 1050, 1100, 1200, 1201]),
+            total_received=rng.choice([0, 1000]),
+        )
+        stats = x.account_history.stats
+        stats.total_transactions = rng.choice([10, 20, 21, 100, 101])
+        stats.avg_transaction_amount = rng.choice([100, 1000, 50000, 60000])
+        stats.std_transaction_amount = rng.choice([50, 100, 1000, 70000])
+        x.transaction.payment_format = rng.choice(["Wire", "ACH", "Cash"])
+        inputs.append(x)
+    return inputs
+
+
+@pytest.fixture
+def batch():
+    return [
+        make_tribunal_input(amount=9500, statistical_score=6.0, narrative_score=0.3),
+        make_tribunal_input(amount=5000, statistical_score=1.0, narrative_score=0.9),
+        make_tribunal_input(amount=500, frequency_per_day=6.0, unique_counterparties=25,
+                            total_sent=100000, total_received=100000, statistical_score=7.0),
+    ]
+
+
+class TestVectorizedRules:
+    """Batch evaluation."""
+
+    def test_default_rules_match_baseline_detectors(self):
+        inputs = random_inputs(3000)
+        results = detect_typologies_batch(inputs)
+
+        for x, matches in zip(inputs, results):
+            actual = [(m.name, m.confidence, m.signals_matched) for m in matches]
+            assert actual == baseline_typologies(x)
+
+    def test_matrix_matches_single_detection(self, batch):
+        scores = TypologyRuleEngine().score(batch)
+
+        assert scores.confidence.shape == (3, len(DEFAULT_RULES))
+        for row, item in enumerate(batch):
+            expected = {m.name: m.confidence for m in detect_all_typologies(item)}
+            actual = {
+                scores.names[t]: scores.confidence[row, t]
+                for t in np.flatnonzero(scores.matched[row])
+            }
+            assert actual == expected
+        assert scores.column("structuring")[0] == pytest.approx(0.9)
+        assert not scores.matched[1].any()
+
+    def test_batch_detection_sorted(self, batch):
+        results = detect_typologies_batch(batch)
+
+        assert [m.name for m in results[0]][0] == "Structuring"
+        for matches in results:
+            confidences = [m.confidence for m in matches]
+            assert confidences == sorted(confidences, reverse=True)
+
+    def test_absent_features_never_fire(self, batch):
+        rules = CompiledRules(parse_rules([{
+            "typology": "x", "min_confidence": 0.1,
+            "signals": [{"name": "s", "weight": 1, "when": [["cycle_count", "!=", 0]]}],
+        }]))
+
+        assert not rules.evaluate(extract_features(batch)).matched.any()
+
+    def test_invalid_rules_rejected(self):
+        rules = [{"typology": "x", "min_confidence": 0.1,
+                  "signals": [{"name": "s", "weight": 1, "when": [["no_such_feature", ">", 1]]}]}]
+
+        with pytest.raises(ValueError):
+            CompiledRules(parse_rules(rules))
+
+
+class TestHotReload:
+    """Rules file reloading."""
+
+    def test_reload_on_change(self, tmp_path, batch):
+        path = tmp_path / "rules.json"
+        engine = TypologyRuleEngine(path)
+        assert len(engine.rules.rules) == len(DEFAULT_RULES)
+
+        path.write_text(json.dumps([{
+            "typology": "large_amount",
+            "name": "Large Amount",
+            "min_confidence": 0.5,
+            "signals": [{"name": "over_9k", "weight": 0.5, "when": [["amount", ">", 9000]]}],
+        }]))
+        scores = engine.score(batch)
+        assert scores.typologies == ["large_amount"]
+        assert scores.matched[:, 0].tolist() == [True, False, False]
+
+        # A broken edit keeps the last good rules
+        path.write_text("{not json")
+        os.utime(path, ns=(0, path.stat().st_mtime_ns + 1_000_000))
+        assert engine.score(batch).typologies == ["large_amount"]
+
+        # Removing the file restores the defaults
+        path.unlink()
+        assert len(engine.score(batch).typologies) == len(DEFAULT_RULES)
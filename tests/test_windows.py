@@ -0,0 +1,131 @@
+"""
+Test Suite for Rolling-Window Aggregates
+
+Checks the incrementally maintained windows against a brute-force rescan
+and their use in typology detection.
+"""
+
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from shared.models import Transaction, TransactionParty, TransactionAmount
+from engines.statistical.windows import WindowEngine, WINDOWS, SUB_THRESHOLD_RANGE
+from engines.expert.typologies import detect_structuring
+
+from tests.test_expert import make_tribunal_input
+
+
+START = datetime(2022, 9, 1)
+
+
+def make_txn(sender: str, receiver: str, amount: float, minutes: float) -> Transaction:
+    return Transaction(
+        sender=TransactionParty(account_id=sender, bank_id="1"),
+        receiver=TransactionParty(account_id=receiver, bank_id="2"),
+        amount=TransactionAmount(sent=amount, received=amount),
+        payment_format="ACH",
+        timestamp=START + timedelta(minutes=minutes),
+    )
+
+
+def brute_force(history, account, now):
+    """Window features of `account` by rescanning every transaction."""
+    result = {}
+    for label, length in WINDOWS.items():
+        recent = [t for t in history if now - length < t.timestamp.timestamp() <= now]
+        out = [t for t in recent if t.sender.account_id == account]
+        inc = [t for t in recent if t.receiver.account_id == account and t.sender.account_id != account]
+        sub = [t.amount.sent for t in out if SUB_THRESHOLD_RANGE[0] <= t.amount.sent < SUB_THRESHOLD_RANGE[1]]
+        result[f"txn_count_{label}"] = len(out) + len(inc)
+        result[f"sub_threshold_count_{label}"] = len(sub)
+        result[f"sub_threshold_sum_{label}"] = sum(sub)
+        result[f"sent_{label}"] = sum(t.amount.sent for t in out)
+        result[f"received_{label}"] = sum(t.amount.received for t in inc)
+        result[f"distinct_counterparties_{label}"] = len(
+            ({t.receiver.account_id for t in out} | {t.sender.account_id for t in inc}) - {account}
+        )
+    return result
+
+
+class TestWindowEngine:
+    """Incremental window maintenance."""
+
+    def test_matches_brute_force(self):
+        rng = random.Random(7)
+        accounts = [f"A{i}" for i in range(6)]
+        engine = WindowEngine()
+        history = []
+        minutes = 0.0
+
+        for _ in range(600):
+            minutes += rng.expovariate(1 / 90)
+            sender = rng.choice(accounts)
+            receiver = sender if rng.random() < 0.15 else rng.choice(accounts)  # Self-transfers
+            amount = rng.choice([9500.0, 9999.0, 10000.0, rng.uniform(10, 20000)])
+            txn = make_txn(sender, receiver, amount, minutes)
+            history.append(txn)
+
+            features = engine.observe(txn).model_dump()
+            expected = brute_force(history, sender, txn.timestamp.timestamp())
+            for name, value in expected.items():
+                assert features[name] == pytest.approx(value), name
+
+    def test_expiry_and_prune(self):
+        engine = WindowEngine()
+        for i in range(3):
+            engine.observe(make_txn("S", f"R{i}", 9500.0, minutes=i))
+
+        features = engine.features("S")
+        assert features.sub_threshold_count_24h == 3
+        assert features.distinct_counterparties_24h == 3
+        assert features.in_out_ratio_24h is None
+
+        later = engine.features("S", now=START + timedelta(days=2))
+        assert later.sub_threshold_count_24h == 0
+        assert later.sub_threshold_count_7d == 3
+
+        assert engine.prune(START + timedelta(days=8)) == 4
+        assert len(engine) == 0
+
+    def test_self_transfers_count_once(self):
+        engine = WindowEngine()
+        for i in range(3):
+            features = engine.observe(make_txn("S", "S", 500.0, minutes=i))
+
+        assert features.txn_count_24h == 3
+        assert features.distinct_counterparties_24h == 0
+        assert features.sent_7d == 1500.0 and features.received_7d == 0.0
+        assert features.in_out_ratio_7d is None
+
+
+    def test_seed_from_history(self):
+        history = [make_txn("S", f"R{i}", 9500.0, minutes=i) for i in range(3)]
+        history.append(make_txn("X", "S", 1000.0, minutes=3))
+        txn = make_txn("S", "R9", 9600.0, minutes=10)
+
+        engine = WindowEngine()
+        engine.update(history[-1])  # Already seen as a receiver
+        assert engine.seed("S", history)
+        assert not engine.seed("S", history)
+
+        features = engine.observe(txn).model_dump()
+        expected = brute_force(history + [txn], "S", txn.timestamp.timestamp())
+        for name, value in expected.items():
+            assert features[name] == pytest.approx(value), name
+
+
+class TestWindowTypologies:
+    """Window features in typology rules."""
+
+    def test_repeated_sub_threshold_raises_structuring(self):
+        engine = WindowEngine()
+        for i in range(4):
+            features = engine.observe(make_txn("TEST001", f"R{i}", 9500.0, minutes=10 * i))
+
+        plain = make_tribunal_input(amount=9500, statistical_score=1.0, narrative_score=0.9)
+        windowed = plain.model_copy(update={"window_features": features})
+
+        assert "repeated_sub_threshold_24h" in detect_structuring(windowed).signals_matched
+        assert detect_structuring(windowed).confidence > detect_structuring(plain).confidence